@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+ Service configuration validation benchmarks
+
+ Compares the precompiled `ServiceConfiguration` validator against the
+ voluptuous schema validation on batches of configurations.
+"""
+from voluptuous.humanize import validate_with_humanized_errors
+
+from nssm import ServiceConfiguration
+from nssm.deadline import _clock
+
+from .service import CONFIGURATION
+
+# Configurations validated per service, to get measurable times on small
+# batches
+SCALE = 5
+
+
+def _manifest(size):
+    return [dict(CONFIGURATION,
+                 path="C:\\Services\\service{:05d}.exe".format(i),
+                 display_name="Service {:05d}".format(i))
+            for i in range(size)]
+
+
+def _validate_voluptuous(manifest):
+    schema = ServiceConfiguration.VALIDATION_SCHEMA
+    for config in manifest:
+        validate_with_humanized_errors(config, schema)
+
+
+def _validate_compiled(manifest):
+    for config in manifest:
+        ServiceConfiguration.validate(config)
+
+
+def _construct(manifest):
+    for config in manifest:
+        ServiceConfiguration(**config)
+
+
+def _timeit(func, manifest):
+    start = _clock()
+    func(manifest)
+    return _clock() - start
+
+
+def run(sizes):
+    """
+    Run the configuration validation benchmarks
+
+    :param sizes: Number of services
+    :type sizes: :class:`list` [ :class:`int` ]
+    :return: Benchmark results
+    :rtype: :class:`list` [ :class:`dict` ]
+    """
+    results = []
+    for size in sizes:
+        manifest = _manifest(size * SCALE)
+
+        voluptuous = _timeit(_validate_voluptuous, manifest)
+        compiled = _timeit(_validate_compiled, manifest)
+        construct = _timeit(_construct, manifest)
+
+        results.append({
+            "benchmark": "configuration.validate.voluptuous",
+            "services": size * SCALE,
+            "seconds": voluptuous,
+        })
+        results.append({
+            "benchmark": "configuration.validate.compiled",
+            "services": size * SCALE,
+            "seconds": compiled,
+            "speedup": voluptuous / compiled if compiled else None,
+        })
+        results.append({
+            "benchmark": "configuration.construct",
+            "services": size * SCALE,
+            "seconds": construct,
+        })
+
+    return results
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+ Import time benchmarks
+
+ Measures the package import time in a fresh interpreter, and checks it
+ against its budget. Plain `import nssm` must not load the heavy
+ dependencies, which are only needed once a public name is used.
+"""
+import os
+import sys
+import json
+import subprocess
+
+# Number of measurements, the best one is reported
+REPEAT = 5
+
+# Import statements and their time budget, in seconds
+IMPORTS = [
+    ("import nssm", 0.010),
+    ("from nssm import Service", None),
+    ("from nssm import ServiceCliCommand", None),
+]
+
+# Modules that plain `import nssm` must not load
+LAZY_MODULES = ["voluptuous", "argparse", "concurrent.futures",
+                "subprocess", "nssm.service", "nssm.configuration",
+                "nssm.cli", "nssm.wrapper"]
+
+_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def _measure(statement):
+    """
+    Import in a fresh interpreter
+
+    :return: Import time in seconds, and loaded modules
+    :rtype: :class:`tuple` [ :class:`float`, :class:`list` ]
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+
+    out = subprocess.check_output(
+        [sys.executable, "-c", _SCRIPT.format(statement=statement)],
+        env=env, universal_newlines=True
+    )
+    result = json.loads(out)
+    return result["seconds"], result["modules"]
+
+
+def run(sizes):
+    """
+    Run the import time benchmarks
+
+    :param sizes: Number of services (unused)
+    :type sizes: :class:`list` [ :class:`int` ]
+    :return: Benchmark results
+    :rtype: :class:`list` [ :class:`dict` ]
+    """
+    results = []
+    for statement, budget in IMPORTS:
+        measurements = [_measure(statement) for _ in range(REPEAT)]
+        seconds = min(m[0] for m in measurements)
+        modules = measurements[0][1]
+
+        result = {
+            "benchmark": "import." + statement.replace(" ", "_"),
+            "seconds": seconds,
+            "budget": budget,
+            "failed": budget is not None and seconds > budget,
+        }
+
+        if statement == "import nssm":
+            loaded = [m for m in LAZY_MODULES if m in modules]
+            result["eager_modules"] = loaded
+            result["failed"] = result["failed"] or bool(loaded)
+
+        results.append(result)
+
+    return results
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+ Service configuration memory benchmarks
+
+ Measures the per-instance memory footprint of
+ :class:`nssm.ServiceConfiguration` on large fleets, built either as full
+ configurations or as overlays of a shared template, and the time to pretty
+ print them.
+"""
+import io
+import sys
+import tracemalloc
+
+from nssm import ServiceConfiguration
+from nssm.deadline import _clock
+
+from .configuration import _manifest
+from .service import CONFIGURATION
+
+# Configurations held in memory per service, to get measurable footprints on
+# small batches
+SCALE = 10
+
+
+def _full(manifest):
+    return [ServiceConfiguration(**c) for c in manifest]
+
+
+def _derived(manifest):
+    template = ServiceConfiguration(**CONFIGURATION)
+    return [template.derive(path=c["path"], display_name=c["display_name"])
+            for c in manifest]
+
+
+def _footprint(build, manifest):
+    """
+    :return: Configurations, the memory allocated while building them (in
+             bytes) and the build time (in seconds)
+    :rtype: :class:`tuple` [ :class:`list`, :class:`int`, :class:`float` ]
+    """
+    start = _clock()
+    configurations = build(manifest)
+    seconds = _clock() - start
+
+    tracemalloc.start()
+    try:
+        retained = build(manifest)  # noqa: F841
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return configurations, allocated, seconds
+
+
+def _instance_size(obj):
+    """
+    :return: Size of the object itself, including its attributes dictionary
+             but not the configuration parameters, in bytes
+    :rtype: :class:`int`
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def run(sizes):
+    """
+    Run the configuration memory benchmarks
+
+    :param sizes: Number of services
+    :type sizes: :class:`list` [ :class:`int` ]
+    :return: Benchmark results
+    :rtype: :class:`list` [ :class:`dict` ]
+    """
+    results = []
+    for size in sizes:
+        manifest = _manifest(size * SCALE)
+        configurations, allocated, seconds = _footprint(_full, manifest)
+        results.append({
+            "benchmark": "memory.configuration",
+            "services": size * SCALE,
+            "seconds": seconds,
+            "peak_memory": allocated,
+            "instance_bytes": _instance_size(configurations[0]),
+            "bytes_per_service": allocated // len(configurations),
+        })
+
+        derived, allocated, seconds = _footprint(_derived, manifest)
+        results.append({
+            "benchmark": "memory.configuration.derived",
+            "services": size * SCALE,
+            "seconds": seconds,
+            "peak_memory": allocated,
+            "bytes_per_service": allocated // len(derived),
+        })
+
+        stream = io.StringIO()
+        start = _clock()
+        for configuration in configurations:
+            configuration.pretty_print(stream)
+        results.append({
+            "benchmark": "memory.configuration.pretty_print",
+            "services": size * SCALE,
+            "seconds": _clock() - start,
+        })
+
+    return results
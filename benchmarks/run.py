@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+ Benchmarks runner
+
+ Runs the benchmark modules and writes their results to a JSON file, so the
+ results of different releases can be compared.
+"""
+from __future__ import print_function
+
+import sys
+import json
+import platform
+import importlib
+from argparse import ArgumentParser
+
+from nssm import metadata
+
+# Benchmark modules, each one providing a `run(sizes)` function returning a
+# list of results
+BENCHMARKS = [
+    "benchmarks.imports",
+    "benchmarks.configuration",
+    "benchmarks.memory",
+    "benchmarks.service",
+]
+
+# Number of services
+SIZES = [1, 10, 100, 1000]
+
+# Relative wall time increase reported as a regression
+REGRESSION_THRESHOLD = 0.2
+
+# Wall time increase (in seconds) below which differences are noise
+REGRESSION_MIN_SECONDS = 0.001
+
+
+def _format(result):
+    line = "{benchmark:<40} {services:>6} {spawns:>8} {seconds:>10.4f}s"
+    line = line.format(**dict({"services": "", "spawns": ""}, **result))
+
+    if result.get("peak_memory") is not None:
+        line += " {:>12}B".format(result["peak_memory"])
+    if result.get("failed"):
+        line += " FAILED"
+    return line
+
+
+def _key(result):
+    return result["benchmark"], result.get("services")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the benchmark results against a baseline
+
+    :param results: Benchmark results
+    :type results: :class:`list` [ :class:`dict` ]
+    :param baseline: Baseline benchmark results
+    :type baseline: :class:`list` [ :class:`dict` ]
+    :param threshold: Relative wall time increase reported as a regression
+    :type threshold: :class:`float`
+    :return: Regression messages
+    :rtype: :class:`list` [ :class:`str` ]
+    """
+    baseline = dict((_key(r), r) for r in baseline)
+
+    regressions = []
+    for result in results:
+        base = baseline.get(_key(result))
+        if base is None:
+            continue
+
+        if result.get("spawns", 0) > base.get("spawns", 0):
+            msg = "{benchmark} ({services}): spawns {old} -> {new}"
+            regressions.append(msg.format(old=base["spawns"],
+                                          new=result["spawns"], **result))
+
+        increase = result["seconds"] - base.get("seconds", 0)
+        if increase > max(base.get("seconds", 0) * threshold,
+                          REGRESSION_MIN_SECONDS):
+            msg = "{benchmark} ({services}): {old:.4f}s -> {new:.4f}s"
+            regressions.append(msg.format(old=base["seconds"],
+                                          new=result["seconds"], **result))
+
+    return regressions
+
+
+def main(argv=None):
+    """
+    Run the benchmarks
+
+    :param argv: Command line arguments
+    :type argv: :class:`list` [ :class:`str` ]
+    :return: Exit code
+    :rtype: :class:`int`
+    """
+    parser = ArgumentParser(prog="paver bench")
+    parser.add_argument("-o", "--output",
+                        default="bench-{}.json".format(metadata.version),
+                        help="Results file (default: %(default)s)")
+    parser.add_argument("-s", "--sizes",
+                        default=",".join(str(s) for s in SIZES),
+                        help="Comma separated number of services "
+                             "(default: %(default)s)")
+    parser.add_argument("-k", "--filter", default=None,
+                        help="Only run the benchmark modules containing "
+                             "this string")
+    parser.add_argument("-c", "--compare", default=None,
+                        help="Baseline results file to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results = []
+    for name in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+
+        module = importlib.import_module(name)
+        for result in module.run(sizes):
+            print(_format(result))
+            results.append(result)
+
+    report = {
+        "package": metadata.package,
+        "version": metadata.version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("Results written to {}".format(args.output))
+
+    # Failed checks (e.g. exceeded budgets)
+    failures = [r for r in results if r.get("failed")]
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"])
+        for regression in regressions:
+            print("REGRESSION: " + regression, file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
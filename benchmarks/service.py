@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+ Service operations benchmarks
+
+ Measures the number of `nssm` processes, the wall time and the peak memory
+ of every public :class:`nssm.Service` operation, run against the in-memory
+ NSSM stand-in.
+"""
+import tracemalloc
+
+from nssm import Service, ServiceConfiguration, ServiceGroup, Wrapper
+from nssm.deadline import _clock
+from nssm.fake import FakeNssm
+from nssm.reconcile import Reconciler, ManifestEntry, RUNNING
+
+# Typical service configuration
+CONFIGURATION = {
+    "startup_dir": "C:\\Services",
+    "arguments": "--config C:\\Services\\config.ini",
+    "description": "Benchmark service",
+    "startup": "DELAYED",
+    "user_account": "LocalSystem",
+    "process_priority": "NORMAL",
+    "console_window": True,
+    "terminate_process": False,
+    "stop_console": 1500,
+    "stop_window": 1500,
+    "stop_threads": 1500,
+    "restart_throttling": 1500,
+    "restart_delay": 0,
+    "action_on_exit": {"Default": "Restart"},
+    "stderr": "C:\\Services\\logs\\stderr.log",
+    "rotate_files": True,
+    "rotate_online": True,
+    "rotation_size": 1048576,
+    "env": {"ENVIRONMENT": "benchmark"},
+}
+
+
+def _configure(service):
+    return service.configure(ServiceConfiguration(**CONFIGURATION))
+
+
+def _configure_diff(service):
+    return service.configure(ServiceConfiguration(**CONFIGURATION),
+                             diff=True)
+
+
+def _reconcile(group):
+    entries = [ManifestEntry(s.SERVICE_NAME, s.SERVICE_PATH, RUNNING,
+                             s.configuration) for s in group]
+    wrapper = group.services[0].WRAPPER
+    Reconciler(entries, wrapper=wrapper).apply().raise_for_errors()
+
+
+# Benchmarked operations, in execution order. Each operation is either run
+# over every service or over a group of all the services.
+OPERATIONS = [
+    ("install", lambda s: s.install()),
+    ("configure", _configure),
+    ("configure_diff", _configure_diff),
+    ("fetch_configuration", lambda s: s.fetch_configuration()),
+    ("status", lambda s: s.status()),
+    ("start", lambda s: s.start()),
+    ("pause", lambda s: s.pause()),
+    ("resume", lambda s: s.resume()),
+    ("rotate", lambda s: s.rotate()),
+    ("restart", lambda s: s.restart()),
+    ("stop", lambda s: s.stop()),
+    ("group.start", lambda g: g.start().raise_for_errors()),
+    ("group.status", lambda g: g.status().raise_for_errors()),
+    ("group.restart", lambda g: g.restart().raise_for_errors()),
+    ("group.rolling_restart", lambda g: g.rolling_restart(wave_size=0.25)),
+    ("group.stop", lambda g: g.stop().raise_for_errors()),
+    ("group.reconcile", _reconcile),
+    ("group.reconcile_noop", _reconcile),
+    ("remove", lambda s: s.remove()),
+    ("group.install", lambda g: g.install().raise_for_errors()),
+]
+
+
+def _scenario(size, trace):
+    """
+    Run all the operations over `size` services
+
+    :return: Measurements indexed by operation name
+    :rtype: :class:`dict`
+    """
+    fake = FakeNssm()
+    wrapper = Wrapper(fake)
+
+    services = [
+        Service("service{:05d}".format(i),
+                "C:\\Services\\service{:05d}.exe".format(i),
+                wrapper=wrapper, **CONFIGURATION)
+        for i in range(size)
+    ]
+    group = ServiceGroup(services)
+
+    measurements = {}
+    for name, operation in OPERATIONS:
+        fake.reset_counters()
+        if trace:
+            tracemalloc.start()
+
+        start = _clock()
+        if name.startswith("group."):
+            operation(group)
+        else:
+            for service in services:
+                operation(service)
+        seconds = _clock() - start
+
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        measurements[name] = (fake.spawns, seconds, peak)
+
+    return measurements
+
+
+def run(sizes):
+    """
+    Run the service operations benchmarks
+
+    The wall time is measured without memory tracing, which is done on a
+    second run of the same scenario.
+
+    :param sizes: Number of services
+    :type sizes: :class:`list` [ :class:`int` ]
+    :return: Benchmark results
+    :rtype: :class:`list` [ :class:`dict` ]
+    """
+    results = []
+    for size in sizes:
+        timed = _scenario(size, trace=False)
+        traced = _scenario(size, trace=True)
+
+        for name, _ in OPERATIONS:
+            spawns, seconds, _ = timed[name]
+            results.append({
+                "benchmark": "service." + name,
+                "services": size,
+                "spawns": spawns,
+                "seconds": seconds,
+                "peak_memory": traced[name][2],
+            })
+
+    return results
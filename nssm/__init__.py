@@ -13,13 +13,90 @@ __license__ = metadata.license
 __copyright__ = metadata.copyright
 
 
-from .service import Service, ServiceStatus
-from .configuration import ServiceConfiguration
-from .parameters import StartupType, PriorityLevel, ServiceType, ExitAction
-from .exceptions import *
+import sys
+import importlib
 
-# Service CLI base class
-from .cli import ServiceCliCommand
+# Public names and the module defining them. They are imported on first
+# access, so that `import nssm` stays cheap.
+_PUBLIC_NAMES = {
+    # Services
+    "Service": ".service",
+    "ServiceStatus": ".service",
+    "ServiceGroup": ".group",
+    "GroupResult": ".group",
+    "RollingRestart": ".rolling",
+    "BulkInstaller": ".bulk",
+    "DependencyGraph": ".dependencies",
+    "Reconciler": ".reconcile",
+    "StateStore": ".state",
+    "Watcher": ".watch",
+    "StateChange": ".watch",
+    "MetricsExporter": ".metrics",
 
-# NSSM executable path
-from .wrapper import executable
+    # Configuration
+    "ServiceConfiguration": ".configuration",
+    "StartupType": ".parameters",
+    "PriorityLevel": ".parameters",
+    "ServiceType": ".parameters",
+    "ExitAction": ".parameters",
+
+    # Exceptions
+    "NssmException": ".exceptions",
+    "CommandTimeoutException": ".exceptions",
+    "CommandCancelledException": ".exceptions",
+    "ServiceException": ".exceptions",
+    "ServiceDoesntExistException": ".exceptions",
+    "ServiceInstallException": ".exceptions",
+    "ServiceAlreadyInstalledException": ".exceptions",
+    "ServiceRemoveException": ".exceptions",
+    "ServiceStartException": ".exceptions",
+    "ServiceStopException": ".exceptions",
+    "ServiceResumeException": ".exceptions",
+    "ServicePauseException": ".exceptions",
+    "ServiceConfigurationException": ".exceptions",
+    "ServiceNotStartedException": ".exceptions",
+    "ServiceTimeoutException": ".exceptions",
+    "ServiceUnhealthyException": ".exceptions",
+    "ServiceDependencyException": ".exceptions",
+
+    # Service CLI base class
+    "ServiceCliCommand": ".cli",
+
+    # NSSM command wrapper and executors
+    "Wrapper": ".wrapper",
+    "CachedWrapper": ".cache",
+    "CoalescingWrapper": ".cache",
+    "CommandResult": ".executors",
+    "Executor": ".executors",
+    "SubprocessExecutor": ".executors",
+    "Deadline": ".deadline",
+    "CommandEvent": ".instrumentation",
+    "CommandStats": ".instrumentation",
+
+    # NSSM executable path
+    "executable": ".wrapper",
+}
+
+__all__ = sorted(_PUBLIC_NAMES)
+
+
+def __getattr__(name):
+    try:
+        module = _PUBLIC_NAMES[name]
+    except KeyError:
+        msg = "module {!r} has no attribute {!r}"
+        raise AttributeError(msg.format(__name__, name))
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_PUBLIC_NAMES))
+
+
+# Module __getattr__ (PEP 562) is only supported from Python 3.7 on
+if sys.version_info < (3, 7):
+    for _name in __all__:
+        __getattr__(_name)
@@ -1,24 +1,49 @@
+import copy
+from collections import ChainMap
+from collections.abc import ItemsView, ValuesView
 from enum import Enum
 
+# Values copied into a derived dictionary when read, as they can be changed
+# in place
+_MUTABLE_TYPES = (dict, list, set)
+
 
 class AbstractDict(object):
     """
     This is an abstract class which implements an dictionary like object with
     some additional features.
+
+    Instances only hold the underlying dictionary (no instance `__dict__`),
+    subclasses should declare `__slots__` too to keep them compact.
+
+    A derived dictionary (see :meth:`derive`) only holds its own entries and
+    resolves the rest through its base. Writes never reach the base: the
+    overridden entries are copied on write, and the mutable inherited values
+    (e.g. nested dictionaries) are copied on first read.
     """
+    __slots__ = ("dictionary",)
     __marker = object()
 
     def __init__(self):
         self.dictionary = {}
 
     def __getitem__(self, key):
-        return self.dictionary[self._keytransformer(key)]
+        key = self._keytransformer(key)
+        value = self.dictionary[key]
+        if isinstance(value, _MUTABLE_TYPES) and self.is_derived() and \
+                key not in self.dictionary.maps[0]:
+            value = self.dictionary.maps[0][key] = copy.deepcopy(value)
+        return value
 
     def __setitem__(self, key, value):
         self.dictionary[self._keytransformer(key)] = value
 
     def __delitem__(self, key):
-        del self.dictionary[self._keytransformer(key)]
+        key = self._keytransformer(key)
+        # An inherited entry (overridden or not) must not show through
+        if self.is_derived() and key in self.dictionary.parents:
+            self.detach()
+        del self.dictionary[key]
 
     def __iter__(self):
         return iter(self.dictionary)
@@ -27,10 +52,10 @@ class AbstractDict(object):
         return len(self.dictionary)
 
     def __str__(self):
-        return str(self.dictionary)
+        return str(dict(self.dictionary))
 
     def __repr__(self):
-        return str(self.dictionary)
+        return str(dict(self.dictionary))
 
     def update(self, d):
         self._recursive_update(self.dictionary, d)
@@ -50,10 +75,12 @@ class AbstractDict(object):
         return self.dictionary.keys()
 
     def items(self):
-        return [(key, self[key]) for key in self]
+        # Read through __getitem__, so the mutable inherited values are
+        # copied
+        return ItemsView(self)
 
     def values(self):
-        return [self[key] for key in self]
+        return ValuesView(self)
 
     def pop(self, key, default=__marker):
         try:
@@ -76,11 +103,48 @@ class AbstractDict(object):
         return key, value
 
     def clear(self):
-        try:
-            while True:
-                self.popitem()
-        except KeyError:
-            pass
+        if self.is_derived():
+            self.dictionary = {}
+        else:
+            self.dictionary.clear()
+
+    def derive(self, d=None):
+        """
+        Return a dictionary of the same class that overrides this one with
+        the given entries. The base is shared, not copied, and later changes
+        to it are seen through the derived dictionary.
+
+        :param d: Overriding entries
+        :return: the derived dictionary
+        """
+        derived = self.__class__.__new__(self.__class__)
+        derived.dictionary = ChainMap({}, self.dictionary)
+        if d:
+            derived.update(d)
+        return derived
+
+    def is_derived(self):
+        """
+        :return: whether entries are resolved through a base dictionary
+        """
+        return isinstance(self.dictionary, ChainMap)
+
+    def overrides(self):
+        """
+        :return: the entries held by this dictionary, not inherited from its
+                 base
+        """
+        if self.is_derived():
+            return self.dictionary.maps[0]
+        return self.dictionary
+
+    def detach(self):
+        """
+        Copy the inherited entries, so the dictionary no longer depends on
+        its base
+        """
+        if self.is_derived():
+            self.dictionary = dict(self.dictionary)
 
     def setdefault(self, key, default=None):
         try:
@@ -89,33 +153,46 @@ class AbstractDict(object):
             self[key] = default
         return default
 
-    def pretty_print(self):
-        return self._recursive_print(self.dictionary, 0)
+    def pretty_print(self, stream=None):
+        """
+        Human readable representation, one parameter per line and nested
+        dictionaries indented.
+
+        :param stream: File-like object the lines are written to, instead of
+                       being returned as a string
+        :return: the representation if no stream is given
+        """
+        lines = self._recursive_print(self.dictionary, 0)
+        if stream is None:
+            return "".join(lines)
+
+        for line in lines:
+            stream.write(line)
 
     def _recursive_update(self, d1, d2):
-        for k, v in sorted(d2.items()):
+        for k, v in d2.items():
             if k in d1.keys() and type(v) == dict:
+                if isinstance(d1, ChainMap) and k not in d1.maps[0]:
+                    d1[k] = copy.deepcopy(d1[k])  # Copy on write
                 self._recursive_update(d1[k], v)
             else:
                 d1[k] = v
 
     def _recursive_print(self, d, nesting):
-        result = ""
+        indent = " " * nesting
+        nested = []
 
-        for k, v in sorted(d.items()):
+        for k, v in sorted(d.items(), key=lambda item: str(item[0])):
             if type(v) == dict:
+                nested.append((k, v))
                 continue
 
-            result += " "*nesting + "%-30s" % (str(k),) + ": " + str(v) + "\n"
-
-        for k, v in sorted(d.items()):
-            if type(v) != dict:
-                continue
-
-            result += " "*nesting + "%s" % (str(k),) + "...\n"
-            result += self._recursive_print(d[k], nesting+4)
+            yield "%s%-30s: %s\n" % (indent, k, v)
 
-        return result
+        for k, v in nested:
+            yield "%s%s...\n" % (indent, k)
+            for line in self._recursive_print(v, nesting + 4):
+                yield line
 
     def _keytransformer(self, key):
         """When overridden permits manipulation of the key before accessing
@@ -140,16 +217,32 @@ class AbstractEnum(Enum):
         :return: the enum object
         """
         try:
-            return cls[val]
-        except KeyError:
-            try:
-                return cls(val)
-            except ValueError:
-                msg = '"{0}" not a valid enum value or name of {1}, possible' \
-                      ' names are {2} and possible values are {3}.'
-                raise ValueError(msg.format(val, cls.__name__,
-                                            ','.join(cls.get_names()),
-                                            str(cls.get_values())))
+            return cls.get_index()[val]
+        except (KeyError, TypeError):
+            msg = '"{0}" not a valid enum value or name of {1}, possible' \
+                  ' names are {2} and possible values are {3}.'
+            raise ValueError(msg.format(val, cls.__name__,
+                                        ','.join(cls.get_names()),
+                                        str(cls.get_values())))
+
+    @classmethod
+    def get_index(cls):
+        """
+        Returns the enum objects indexed by name, value and the enum object
+        itself. Names take precedence over values. The index is built once
+        per class.
+
+        :return: dict of enum objects
+        """
+        index = cls.__dict__.get("_coerce_index")
+        if index is None:
+            index = {}
+            for member in cls:
+                index[member] = member
+                index[member.value] = member
+            index.update(cls.__members__)
+            cls._coerce_index = index
+        return index
 
     @classmethod
     def get_names(cls):
@@ -159,10 +252,7 @@ class AbstractEnum(Enum):
 
         :return: list of all enum names
         """
-        names = []
-        for name, member in cls.__members__.items():
-            names.append(name)
-        return names
+        return list(cls.__members__)
 
     @classmethod
     def get_values(cls):
@@ -171,7 +261,4 @@ class AbstractEnum(Enum):
 
         :return: list of values
         """
-        values = []
-        for member in list(cls):
-            values.append(member.value)
-        return values
+        return [member.value for member in cls]
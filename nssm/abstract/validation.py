@@ -0,0 +1,176 @@
+"""
+ Precompiled validation for voluptuous schemas
+"""
+from voluptuous import Schema, Any, Coerce, Required, Optional, \
+                       ALLOW_EXTRA, REMOVE_EXTRA, PREVENT_EXTRA
+from voluptuous.schema_builder import UNDEFINED
+
+from .collections import AbstractEnum
+
+
+class InvalidData(Exception):
+    """
+    Raised by the compiled validators on invalid data. It carries no
+    details: the data should then be validated with the voluptuous schema to
+    build the error message.
+    """
+    pass
+
+
+def compile_schema(schema):
+    """
+    Compile a voluptuous schema into a plain Python validator
+
+    The compiled validator produces the same normalized output as the
+    schema for valid data, and raises :class:`.InvalidData` otherwise. Only
+    the subset of voluptuous used by this package is supported: mappings
+    with literal keys, types, literals, `Any`/`Or`, `Coerce` and nested
+    schemas.
+
+    :param schema: Voluptuous schema
+    :type schema: :class:`voluptuous.Schema`
+    :return: Compiled validator
+    :rtype: :class:`callable`
+    :raises NotImplementedError: If the schema is not supported
+    """
+    return _compile(schema.schema, schema.extra)
+
+
+def _invalid():
+    raise InvalidData()
+
+
+def _compile(node, extra=PREVENT_EXTRA):
+    if isinstance(node, Schema):
+        return _compile(node.schema, node.extra)
+
+    if isinstance(node, dict):
+        return _compile_mapping(node, extra)
+
+    if isinstance(node, Any):
+        return _compile_any([_compile(v) for v in node.validators])
+
+    if isinstance(node, Coerce):
+        return _compile_coerce(node.type)
+
+    if isinstance(node, type):
+        return _compile_type(node)
+
+    if isinstance(node, (str, int, float)) or node is None:
+        return _compile_literal(node)
+
+    msg = "Unsupported schema node: {!r}"
+    raise NotImplementedError(msg.format(node))
+
+
+def _compile_mapping(schema, extra):
+    validators = {}
+    required = []
+
+    for key, value in schema.items():
+        name = _mapping_key(key)
+        validators[name] = _compile(value)
+        if isinstance(key, Required):
+            required.append(name)
+
+    if extra not in (ALLOW_EXTRA, REMOVE_EXTRA):
+        extra = PREVENT_EXTRA
+
+    return _mapping_validator(validators, required, extra)
+
+
+def _mapping_key(key):
+    """
+    :return: Name of a mapping schema key (literal, `Required` or `Optional`)
+    :rtype: :class:`str`
+    :raises NotImplementedError: If the key is not supported
+    """
+    name = key
+    if type(key) in (Required, Optional):
+        name = key.schema
+        if key.default is not UNDEFINED:
+            name = None  # Default values are not supported
+
+    if not isinstance(name, str):
+        msg = "Unsupported schema key: {!r}"
+        raise NotImplementedError(msg.format(key))
+
+    return name
+
+
+def _mapping_validator(validators, required, extra):
+    def validate(data):
+        if not isinstance(data, dict):
+            _invalid()
+
+        out = {}
+        for key, value in data.items():
+            validator = validators.get(key)
+            if validator is not None:
+                out[key] = validator(value)
+            elif extra == ALLOW_EXTRA:
+                out[key] = value
+            elif extra == PREVENT_EXTRA:
+                _invalid()
+
+        for key in required:
+            if key not in out:
+                _invalid()
+
+        return out
+
+    return validate
+
+
+def _compile_any(validators):
+    def validate(data):
+        for validator in validators:
+            try:
+                return validator(data)
+            except InvalidData:
+                pass
+        _invalid()
+
+    return validate
+
+
+def _compile_coerce(coerce):
+    # Enumerations coercion: precomputed lookup by member, name and value
+    enum = getattr(coerce, "__self__", None)
+    if isinstance(enum, type) and issubclass(enum, AbstractEnum) and \
+            getattr(coerce, "__func__", None) is AbstractEnum.coerce.__func__:
+        lookup = enum.get_index()
+
+        def validate(data):
+            try:
+                return lookup[data]
+            except (KeyError, TypeError):
+                _invalid()
+
+        return validate
+
+    def validate(data):
+        try:
+            return coerce(data)
+        except (ValueError, TypeError):
+            _invalid()
+
+    return validate
+
+
+def _compile_type(cls):
+    def validate(data):
+        if not isinstance(data, cls):
+            _invalid()
+        return data
+
+    return validate
+
+
+def _compile_literal(literal):
+    def validate(data):
+        if data != literal:
+            _invalid()
+        return data
+
+    return validate
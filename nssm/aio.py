@@ -0,0 +1,668 @@
+"""
+ Asyncio interface for NSSM (Python 3.5+)
+"""
+import asyncio
+import logging
+
+from .deadline import Deadline, _clock
+from .wrapper import Wrapper, _defaultmethod
+from .executors import SubprocessExecutor, CommandResult
+from .service import Service, ServiceStatus, _PARAMETER_KEYS, \
+                     _status_set, _timeout_message, _encode_configuration, \
+                     _decode_configuration, _keyed_parameters, \
+                     _decode_values, _parse_dump, _configuration_commands, \
+                     _match, _list_unsupported
+from .configuration import ServiceConfiguration
+from .exceptions import NssmException, ServiceConfigurationException, \
+                        ServiceDoesntExistException, \
+                        ServiceTimeoutException, CommandTimeoutException, \
+                        CommandCancelledException, _unsupported_command
+
+log = logging.getLogger(__name__)
+
+
+class AsyncExecutor(object):
+    """
+    Asynchronous NSSM command executor interface. See :class:`.Executor`.
+    """
+
+    async def execute(self, args, deadline=None):
+        """
+        Execute a NSSM command
+
+        :param args: NSSM arguments (i.e. command, service name and command
+                     arguments)
+        :type args: :class:`list` [ :class:`str` ]
+        :param deadline: Command time limit and cancellation scope. The
+                         command process must be terminated once it is over.
+        :type deadline: :class:`.Deadline`
+        :return: Return code and raw console output of the command
+        :rtype: :class:`.CommandResult`
+        :raises CommandTimeoutException: If the deadline expires
+        :raises CommandCancelledException: If the deadline is cancelled
+        """
+        raise NotImplementedError
+
+
+class AsyncSubprocessExecutor(AsyncExecutor):
+    """
+    Executor running the NSSM binary in an asyncio subprocess
+
+    On Windows, the event loop must support subprocesses (i.e.
+    :class:`asyncio.ProactorEventLoop`, the default one since Python 3.8).
+    The process is killed (and reaped) once its deadline expires or is
+    cancelled, or the awaiting task is cancelled.
+    """
+
+    def __init__(self, executable=None):
+        """
+        :param executable: Path to the NSSM executable. The bundled one by
+                           default.
+        :type executable: :class:`str`
+        """
+        self._executable = executable
+
+    executable = SubprocessExecutor.executable
+
+    async def execute(self, args, deadline=None):
+        argv = [self.executable] + list(args)
+
+        service = args[1] if len(args) > 1 else None
+
+        start = _clock()
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+
+        def kill():
+            if process.returncode is None:
+                process.kill()
+
+        # Deadlines are cancelled from any thread
+        loop = asyncio.get_event_loop()
+
+        def cancel():
+            loop.call_soon_threadsafe(kill)
+
+        if deadline is not None:
+            deadline.on_cancel(cancel)
+        try:
+            timeout = deadline.timeout_for() if deadline is not None else None
+            out, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            raise CommandTimeoutException(service)
+        finally:
+            if deadline is not None:
+                deadline.remove_on_cancel(cancel)
+
+            # Never leave a running or unreaped process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if deadline is not None and deadline.cancelled:
+            raise CommandCancelledException(service)
+
+        return CommandResult(process.returncode, out, _clock() - start)
+
+
+class ThreadedExecutor(AsyncExecutor):
+    """
+    Asynchronous adapter of a blocking executor (e.g. :class:`.FakeNssm`),
+    run on the event loop default thread pool
+    """
+
+    def __init__(self, executor):
+        """
+        :param executor: Blocking NSSM command executor
+        :type executor: :class:`.Executor`
+        """
+        self.executor = executor
+
+    async def execute(self, args, deadline=None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.executor.execute, args,
+                                          deadline)
+
+
+class AsyncWrapper(Wrapper):
+    """
+    Non-blocking NSSM wrapper
+
+    Same as :class:`.Wrapper`, but the commands are coroutines, so many of
+    them can be in flight on a single event loop. The observers are
+    notified from the event loop thread.
+
+    Every command runs within the current :class:`.Deadline` of the event
+    loop thread (if any), and at most `TIMEOUT` seconds. The `nssm` process
+    is killed if the deadline is over, or if the awaiting task is
+    cancelled.
+    """
+
+    def __init__(self, executor=None, timeout=None):
+        """
+        :param executor: NSSM command executor. A blocking executor is run
+                         on the event loop thread pool. An asyncio subprocess
+                         running the bundled NSSM binary by default.
+        :type executor: :class:`.AsyncExecutor` or :class:`.Executor`
+        :param timeout: Time limit of every `nssm` command, in seconds
+        :type timeout: :class:`float`
+        """
+        if executor is None:
+            executor = AsyncSubprocessExecutor()
+        elif not isinstance(executor, AsyncExecutor):
+            executor = ThreadedExecutor(executor)
+
+        super(AsyncWrapper, self).__init__(executor, timeout)
+
+    @_defaultmethod
+    async def command(self, command, service_name, *args):
+        """
+        NSSM command. See :meth:`.Wrapper.command`. Called on the class, it
+        runs on the default asynchronous wrapper.
+
+        :return: Result of the command. It unpacks as a `(0, output)`
+                 tuple.
+        :rtype: :class:`.CommandResult`
+        :raises CommandTimeoutException: If the command doesn't finish in
+                                         time, or the deadline is over
+        """
+        cmd = [command] + list(args) if service_name is None else \
+            [command, service_name] + list(args)
+
+        # Print command string for debugging purpose
+        log.debug(" ".join(cmd))
+
+        # Run the command. The coroutines share the thread, so the deadline
+        # scope is not entered.
+        start = _clock()
+        deadline = Deadline(self.TIMEOUT)
+        try:
+            deadline.check(service_name)
+            result = await self.executor.execute(cmd, deadline)
+        except CommandTimeoutException as err:
+            self._timed_out(command, service_name, args, err,
+                            _clock() - start)
+            raise
+        except asyncio.CancelledError:
+            deadline.cancel()  # Kill the process, from any executor
+            raise
+        finally:
+            deadline.release()
+
+        return self._result(command, service_name, args, result,
+                            _clock() - start)
+
+    @classmethod
+    def _default_wrapper(cls):
+        return DEFAULT_ASYNC_WRAPPER
+
+
+# Default asynchronous NSSM command wrapper
+DEFAULT_ASYNC_WRAPPER = AsyncWrapper()
+
+
+class AsyncService(Service):
+    """
+    NSSM Service class with an asyncio interface
+
+    Same as :class:`.Service`, but every operation is a coroutine:
+
+        >>> svc = AsyncService("MyService", "C:\\\\my_service.exe")
+        >>> await svc.start()  # doctest: +SKIP
+    """
+
+    WRAPPER = DEFAULT_ASYNC_WRAPPER
+
+    @classmethod
+    async def discover(cls, patterns=None, wrapper=None, prefetch=(),
+                       max_workers=None, **kwargs):
+        """
+        Discover the services managed by NSSM. See :meth:`.Service.discover`.
+
+        The prefetch operations run concurrently on the event loop, at most
+        `max_workers` at a time.
+
+        :return: Discovered services, in `nssm list` order
+        :rtype: :class:`list` [ :class:`.AsyncService` ]
+        :raises NssmException: If `nssm list` is not supported (NSSM 2.24
+                               and older, like the bundled binary)
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        if isinstance(prefetch, str):
+            prefetch = [prefetch]
+
+        wrapper = wrapper or cls.WRAPPER
+        services = [cls(name, wrapper=wrapper, **kwargs)
+                    for name in await cls._list(wrapper)
+                    if not patterns or _match(name, patterns)]
+
+        if prefetch:
+            workers = max_workers or cls.MAX_WORKERS
+            services = await cls._prefetch(services, prefetch, workers)
+
+        return services
+
+    @staticmethod
+    async def _list(wrapper):
+        """
+        :param wrapper: Asynchronous NSSM command wrapper
+        :type wrapper: :class:`.AsyncWrapper`
+        :return: Names of the services managed by NSSM
+        :rtype: :class:`list` [ :class:`str` ]
+        :raises NssmException: If `nssm list` is not supported
+        """
+        try:
+            result = await wrapper.command("list", None)
+        except NssmException as err:
+            if type(err) is not NssmException:
+                raise  # e.g. timed out
+            raise _list_unsupported(err) from err
+
+        names = (line.strip() for line in result.lines())
+        return [name for name in names if name]
+
+    @staticmethod
+    async def _prefetch(services, prefetch, workers):
+        """
+        Read the services' data concurrently
+
+        :param services: Services
+        :type services: :class:`list` [ :class:`.AsyncService` ]
+        :param prefetch: Data to read ahead (see :meth:`discover`)
+        :type prefetch: :class:`list` [ :class:`str` ]
+        :param workers: Maximum number of concurrent prefetch operations
+        :type workers: :class:`int`
+        :return: Services, without the ones removed in the meantime
+        :rtype: :class:`list` [ :class:`.AsyncService` ]
+        """
+        semaphore = asyncio.Semaphore(workers)
+
+        async def fetch(service):
+            async with semaphore:
+                return await AsyncService._fetch(service, prefetch)
+
+        services = await asyncio.gather(*[fetch(s) for s in services])
+        return [service for service in services if service is not None]
+
+    @staticmethod
+    async def _fetch(service, prefetch):
+        """
+        :return: Service with its data read, `None` if removed since listed
+        :rtype: :class:`.AsyncService`
+        """
+        try:
+            if "configuration" in prefetch:
+                service.configuration = await service.fetch_configuration()
+                if "path" in service.configuration:
+                    service.SERVICE_PATH = service.configuration["path"]
+            if "status" in prefetch:
+                await service.status()
+        except ServiceDoesntExistException:
+            return None
+        return service
+
+    async def install(self):
+        """
+        Install the service
+        """
+        await self.WRAPPER.command("install", self.SERVICE_NAME,
+                                   self.SERVICE_PATH)
+
+        # A new service has the default configuration
+        if self.STATE_STORE is not None:
+            self.STATE_STORE.delete(self.SERVICE_NAME)
+
+        if self.configuration:
+            await self.configure(self.configuration)
+
+    async def remove(self):
+        """
+        Remove the service
+        """
+        await self.WRAPPER.command("remove", self.SERVICE_NAME, "confirm")
+
+        if self.STATE_STORE is not None:
+            self.STATE_STORE.delete(self.SERVICE_NAME)
+
+    async def start(self, wait=False, timeout=None):
+        """
+        Start the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        await self.WRAPPER.command("start", self.SERVICE_NAME)
+
+        if wait:
+            return await self.wait_for(ServiceStatus.RUNNING, timeout)
+
+    async def stop(self, wait=False, timeout=None):
+        """
+        Stop the service
+
+        :param wait: Wait for the service to be stopped
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        await self.WRAPPER.command("stop", self.SERVICE_NAME)
+
+        if wait:
+            return await self.wait_for(ServiceStatus.STOPPED, timeout)
+
+    async def restart(self, wait=False, timeout=None):
+        """
+        Restart the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        await self.WRAPPER.command("restart", self.SERVICE_NAME)
+
+        if wait:
+            return await self.wait_for(ServiceStatus.RUNNING, timeout)
+
+    async def pause(self, wait=False, timeout=None):
+        """
+        Pause the service
+
+        :param wait: Wait for the service to be paused
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        await self.WRAPPER.command("pause", self.SERVICE_NAME)
+
+        if wait:
+            return await self.wait_for(ServiceStatus.PAUSED, timeout)
+
+    async def resume(self, wait=False, timeout=None):
+        """
+        Resume the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        await self.WRAPPER.command("continue", self.SERVICE_NAME)
+
+        if wait:
+            return await self.wait_for(ServiceStatus.RUNNING, timeout)
+
+    async def rotate(self):
+        """
+        Triggers on-demand rotation for `nssm` services with I/O redirection
+        and online rotation enabled.
+        """
+        await self.WRAPPER.command("rotate", self.SERVICE_NAME)
+
+    async def status(self):
+        """
+        Query the service's status
+
+        :return: Service status
+        :rtype: :class:`.ServiceStatus`
+        """
+        rc, out = await self.WRAPPER.command("status", self.SERVICE_NAME)
+        self.last_status = ServiceStatus(out.strip())
+        return self.last_status
+
+    async def wait_for(self, state, timeout=None):
+        """
+        Wait for the service to reach a state. See :meth:`.Service.wait_for`.
+
+        Cancelling the awaiting task kills the in-flight `nssm status`
+        command.
+
+        :param state: Expected service status, or any of a list of them
+        :type state: :class:`.ServiceStatus` or :class:`list`
+        :param timeout: Timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        :return: Reached service status
+        :rtype: :class:`.ServiceStatus`
+        :raises ServiceTimeoutException: If the state is not reached in time
+        """
+        targets = _status_set(state)
+        if timeout is None:
+            timeout = self.WAIT_TIMEOUT
+
+        last = None
+
+        async def poll():
+            nonlocal last
+            backoff = self._backoff()
+            while True:
+                status = await self._poll_status()
+                if status in targets:
+                    return status
+
+                if status != last:
+                    backoff.reset()
+                    last = status
+                await asyncio.sleep(backoff.next())
+
+        try:
+            return await asyncio.wait_for(poll(), timeout)
+        except asyncio.TimeoutError:
+            raise ServiceTimeoutException(self.SERVICE_NAME,
+                                          _timeout_message(targets, last))
+
+    async def _poll_status(self):
+        """
+        Query the service's status, bypassing the wrapper cache (if any)
+
+        :return: Service status
+        :rtype: :class:`.ServiceStatus`
+        """
+        invalidate = getattr(self.WRAPPER, "invalidate", None)
+        if invalidate is not None:
+            invalidate(self.SERVICE_NAME)
+        return await self.status()
+
+    async def configure(self, config, diff=False, current=None,
+                        verify=False):
+        """
+        Configure the service. See :meth:`.Service.configure`.
+
+        The parameters are set one after the other, since `nssm` doesn't
+        support concurrent writes to the same service.
+
+        :param config: Service configuration
+        :type config: :class:`.ServiceConfiguration`
+        :param diff: Only set the parameters that differ from the current ones
+        :type diff: :class:`bool`
+        :param current: Known current configuration. If not provided, the
+                        current settings are read from the service.
+        :type current: :class:`.ServiceConfiguration`
+        :param verify: Check the last-applied configuration against the live
+                       settings
+        :type verify: :class:`bool`
+        :return: Number of issued and skipped commands
+        :rtype: :class:`tuple` [ :class:`int`, :class:`int` ]
+        """
+        msg = "Unknown configuration object: {}"
+        assert isinstance(config, ServiceConfiguration), msg.format(config)
+
+        # Update service configuration
+        if config is not self.configuration:
+            self.configuration.update(config)
+
+        desired = _encode_configuration(config)
+
+        record, recorded = None, False
+        if self.STATE_STORE is not None:
+            record, applied, recorded = self._check_store(config, verify)
+            if applied:
+                return 0, len(desired)
+            diff = diff or verify or recorded
+
+        if not diff:
+            current = {}
+        elif current is None:
+            current = await self._current_values(desired.keys())
+        else:
+            current = _encode_configuration(current)
+
+        # The password is not read back: only a changed record tells whether
+        # it is up to date
+        commands, skipped = _configuration_commands(
+            desired, current, _keyed_parameters(config) if diff else (),
+            password=record is not None and not recorded
+        )
+
+        await self._write_configuration(commands, record)
+        return len(commands), skipped
+
+    async def _write_configuration(self, commands, record=None):
+        """
+        Run the configuration commands, and record the applied configuration
+        in the state store. See :meth:`.Service._write_configuration`.
+        """
+        store = self.STATE_STORE if record is not None else None
+        try:
+            for command in commands:
+                await self.WRAPPER.command(command[0], self.SERVICE_NAME,
+                                           *command[1:])
+        except BaseException:
+            # The live configuration is no longer known (also if cancelled)
+            if store is not None:
+                store.delete(self.SERVICE_NAME)
+            raise
+
+        if store is not None:
+            store.put(self.SERVICE_NAME, *record)
+
+    async def fetch_configuration(self):
+        """
+        Read the service's current configuration. See
+        :meth:`.Service.fetch_configuration`.
+
+        :return: Service configuration
+        :rtype: :class:`.ServiceConfiguration`
+        """
+        return _decode_configuration(await self._current_values())
+
+    async def _dump_values(self):
+        """
+        :return: Parameter current values read with `nssm dump`, None if the
+                 NSSM version doesn't support it
+        :rtype: :class:`dict`
+        """
+        try:
+            rc, out = await self.WRAPPER.command("dump", self.SERVICE_NAME)
+        except ServiceConfigurationException as err:
+            if not _unsupported_command(err):
+                raise
+            self._dump_unsupported()
+            return None
+        return _parse_dump(out)
+
+    async def _current_values(self, keys=None):
+        """
+        Read the current value of the service parameters
+
+        :param keys: Parameter keys to read with `nssm get` if `nssm dump` is
+                     not available. All the parameters by default.
+        :return: Parameter current values
+        :rtype: :class:`dict`
+        """
+        if self._dump_supported():
+            values = await self._dump_values()
+            if values is not None:
+                return values
+
+        keys = list(_PARAMETER_KEYS if keys is None else keys)
+        if not keys:
+            return {}
+
+        # At most MAX_WORKERS `nssm` processes at a time, as the thread pool
+        # of the blocking service
+        semaphore = asyncio.Semaphore(min(self.MAX_WORKERS, len(keys)))
+
+        async def get(key):
+            async with semaphore:
+                return await self.WRAPPER.command("get", self.SERVICE_NAME,
+                                                  *key)
+
+        outputs = await asyncio.gather(*[get(key) for key in keys],
+                                       return_exceptions=True)
+
+        values = {}
+        for key, output in zip(keys, outputs):
+            if isinstance(output, ServiceConfigurationException):
+                continue  # Unknown value
+            elif isinstance(output, BaseException):
+                raise output
+
+            rc, out = output
+            values[key] = _decode_values(out)
+        return values
+
+
+class AsyncSubscription(object):
+    """
+    Asynchronous iterator over the state changes dispatched by a
+    :class:`.Watcher`:
+
+        >>> changes = AsyncSubscription(watcher, service)  # doctest: +SKIP
+        >>> async for change in changes:  # doctest: +SKIP
+        ...     print(change)
+
+    It must be created from the event loop thread. The iteration ends once
+    the subscription is cancelled.
+    """
+
+    # End of the state changes
+    _CANCELLED = object()
+
+    def __init__(self, watcher, services, from_state=None, to_state=None):
+        """
+        :param watcher: Watcher dispatching the changes
+        :type watcher: :class:`.Watcher`
+        :param services: Watched service, or services
+        :type services: :class:`.Service` or :class:`list`
+        :param from_state: Former status (or statuses) of the changes. Any by
+                           default.
+        :type from_state: :class:`.ServiceStatus` or :class:`list`
+        :param to_state: New status (or statuses) of the changes. Any by
+                         default.
+        :type to_state: :class:`.ServiceStatus` or :class:`list`
+        """
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue()
+        self.subscription = watcher.subscribe(services, self._dispatch,
+                                              from_state, to_state)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.subscription.cancelled and self._queue.empty():
+            raise StopAsyncIteration
+
+        event = await self._queue.get()
+        if event is self._CANCELLED:
+            raise StopAsyncIteration
+        return event
+
+    def _dispatch(self, event):
+        # Called from the watcher thread
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def cancel(self):
+        """
+        Stop receiving state changes, and end the iteration
+        """
+        if not self.subscription.cancelled:
+            self.subscription.cancel()
+            self._dispatch(self._CANCELLED)
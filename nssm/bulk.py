@@ -0,0 +1,204 @@
+"""
+ Parallel bulk install of services, resumable from a checkpoint
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .deadline import bind, _clock
+from .exceptions import ServiceAlreadyInstalledException
+from .group import GroupResult
+from .instrumentation import CommandStats
+from .parameters import PARAMETERS
+from .service import _configuration_record, _keyed_parameters, \
+                     _configuration_commands
+from .state import StateStore
+from .wrapper import _observable
+
+# Checkpoint digest of the services installed, but not configured yet
+INSTALLED = "installed"
+
+
+class BulkInstallResult(GroupResult):
+    """
+    Outcome of a bulk install
+
+    The result of each service is the action taken: ``"installed"``,
+    ``"resumed"`` (installed by an interrupted run, configured in place) or
+    ``"skipped"`` (checkpointed as installed and configured).
+    """
+
+    def __init__(self):
+        super(BulkInstallResult, self).__init__()
+
+        # Wall time, in seconds
+        self.seconds = 0.0
+
+        # Aggregated `nssm` commands run, per command
+        self.commands = {}
+
+    def __repr__(self):
+        msg = "<BulkInstallResult installed={} skipped={} failed={} " \
+              "spawns={} ({:.3f}s)>"
+        return msg.format(len(self.results) - len(self.skipped),
+                          len(self.skipped), len(self.errors), self.spawns,
+                          self.seconds)
+
+    @property
+    def spawns(self):
+        """
+        :return: Number of `nssm` processes spawned
+        :rtype: :class:`int`
+        """
+        return sum(stats["count"] for stats in self.commands.values())
+
+    @property
+    def skipped(self):
+        """
+        :return: Names of the services skipped by the checkpoint
+        :rtype: :class:`list` [ :class:`str` ]
+        """
+        return sorted(name for name, action in self.results.items()
+                      if action == "skipped")
+
+
+class BulkInstaller(object):
+    """
+    Install and configure many services concurrently
+
+    Each service is configured right after its own install completes,
+    without waiting for the other installs, with at most `MAX_WORKERS`
+    services in progress at the same time.
+
+    The progress is checkpointed in a :class:`.StateStore`: a service is
+    recorded once installed, and again once configured, so a rerun (e.g.
+    after a failure midway) skips it without running `nssm`. A service
+    installed by an interrupted run is configured in place, writing only the
+    parameters that differ; a service installed by other means fails with
+    :class:`.ServiceAlreadyInstalledException`. The checkpoint is only as
+    accurate as the changes made through it; services modified or removed
+    by other means since are not detected.
+
+        >>> installer = BulkInstaller(services, "install.db")  # doctest: +SKIP
+        >>> installer.run()  # doctest: +SKIP
+        <BulkInstallResult installed=200 skipped=0 failed=0 ...>
+    """
+
+    MAX_WORKERS = 8
+
+    def __init__(self, services, checkpoint=None, max_workers=None):
+        """
+        :param services: Services to install, with their configuration
+        :type services: :class:`list` [ :class:`.Service` ] or
+                        :class:`.ServiceGroup`
+        :param checkpoint: Checkpoint store, or the path of its SQLite file.
+                           The services' own state store by default.
+        :type checkpoint: :class:`.StateStore` or :class:`str`
+        :param max_workers: Maximum number of services installed at the same
+                            time
+        :type max_workers: :class:`int`
+        """
+        self.services = list(services)
+
+        if max_workers:
+            self.MAX_WORKERS = max_workers
+
+        if checkpoint is not None and not isinstance(checkpoint, StateStore):
+            checkpoint = StateStore(checkpoint)
+        self.checkpoint = checkpoint
+
+    def run(self):
+        """
+        Install and configure the services not checkpointed yet
+
+        :return: Per-service actions and exceptions, and the number of
+                 spawned `nssm` processes and wall time
+        :rtype: :class:`.BulkInstallResult`
+        """
+        result = BulkInstallResult()
+        if not self.services:
+            return result
+
+        # Count the commands where the processes are spawned (cache hits
+        # are not spawns)
+        stats = CommandStats()
+        wrappers = set(filter(None, (_observable(s.WRAPPER)
+                                     for s in self.services)))
+        for wrapper in wrappers:
+            wrapper.add_observer(stats)
+
+        start = _clock()
+        try:
+            workers = min(self.MAX_WORKERS, len(self.services))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                install = bind(self._install)
+                futures = dict((executor.submit(install, service), service)
+                               for service in self.services)
+
+                for future in as_completed(futures):
+                    name = futures[future].SERVICE_NAME
+                    try:
+                        result.results[name] = future.result()
+                    except Exception as err:
+                        result.errors[name] = err
+        finally:
+            for wrapper in wrappers:
+                wrapper.remove_observer(stats)
+
+        result.seconds = _clock() - start
+        result.commands = stats.dump()
+        return result
+
+    def _install(self, service):
+        """
+        Install and configure a service, unless checkpointed
+
+        :param service: NSSM service
+        :type service: :class:`.Service`
+        :return: Action taken
+        :rtype: :class:`str`
+        :raises ServiceAlreadyInstalledException: If the service was not
+                                                  installed through the
+                                                  checkpoint
+        """
+        store = self.checkpoint if self.checkpoint is not None else \
+            service.STATE_STORE
+        name = service.SERVICE_NAME
+
+        config = service.configuration
+        desired, digest = _configuration_record(config, service.SERVICE_PATH,
+                                                store)
+
+        if store is not None and \
+                store.is_applied(name, digest, service.VERIFY_INTERVAL):
+            return "skipped"
+
+        try:
+            service.WRAPPER.command("install", name, service.SERVICE_PATH)
+            action = "installed"
+        except ServiceAlreadyInstalledException:
+            # Only resume the services installed by an interrupted run, not
+            # the ones installed by other means
+            if store is None or store.get(name) is None:
+                raise
+            action = "resumed"
+
+        # Installed, but the configuration is not known until done
+        if store is not None:
+            store.put(name, {}, INSTALLED)
+
+        if action == "installed":
+            # A new service has the default configuration
+            current = {PARAMETERS["path"].key: (service.SERVICE_PATH,)}
+        else:
+            current = service._current_values(desired.keys())
+
+        # The password set by the interrupted run is not known
+        commands, _ = _configuration_commands(desired, current,
+                                              _keyed_parameters(config),
+                                              password=True)
+        for command in commands:
+            service.WRAPPER.command(command[0], name, *command[1:])
+
+        if store is not None:
+            store.put(name, desired, digest)
+
+        return action
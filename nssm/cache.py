@@ -0,0 +1,254 @@
+"""
+ Caching and coalescing NSSM command wrappers
+"""
+import threading
+from collections import OrderedDict
+
+from .deadline import current_deadline, _clock
+from .wrapper import DEFAULT_WRAPPER
+from .exceptions import CommandTimeoutException
+
+
+class CachedWrapper(object):
+    """
+    Read-through cache for the NSSM read commands
+
+    The output of the read commands (``status``, ``get`` and ``dump``) is
+    kept for a per-command time-to-live, with a bounded number of entries
+    evicted in least recently used order. Any other command invalidates the
+    cached entries of its service.
+
+        >>> wrapper = CachedWrapper(ttl={"status": 2, "get": 60})
+        >>> service = Service("MyService", wrapper=wrapper)  # doctest: +SKIP
+    """
+
+    READ_COMMANDS = ("status", "get", "dump")
+
+    # Default time-to-live, in seconds
+    TTL = 1.0
+
+    # Maximum number of cached entries
+    MAX_SIZE = 1024
+
+    def __init__(self, wrapper=None, ttl=None, max_size=None):
+        """
+        :param wrapper: Wrapped NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        :param ttl: Entries time-to-live, in seconds. Either a value for all
+                    the read commands or a value per command.
+        :type ttl: :class:`float` or :class:`dict`
+        :param max_size: Maximum number of cached entries
+        :type max_size: :class:`int`
+        """
+        self.wrapper = wrapper or DEFAULT_WRAPPER
+
+        if ttl is not None:
+            self.TTL = ttl
+
+        if max_size:
+            self.MAX_SIZE = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def command(self, command, service_name, *args):
+        """
+        NSSM command. See :meth:`.Wrapper.command`.
+        """
+        # Commands not bound to a service (e.g. ``list``) are passed through
+        if service_name is None:
+            return self.wrapper.command(command, service_name, *args)
+
+        if command not in self.READ_COMMANDS:
+            self.invalidate(service_name)
+            try:
+                return self.wrapper.command(command, service_name, *args)
+            finally:
+                self.invalidate(service_name)
+
+        key = (command, service_name) + args
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] > _clock():
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            generation = self._service_generation(service_name)
+
+        result = self.wrapper.command(command, service_name, *args)
+
+        with self._lock:
+            # Don't store results invalidated while in flight
+            if self._service_generation(service_name) == generation:
+                self._entries[key] = (_clock() + self._ttl(command), result)
+
+                while len(self._entries) > self.MAX_SIZE:
+                    self._entries.popitem(last=False)
+
+        return result
+
+    def invalidate(self, service_name=None):
+        """
+        Drop the cached entries of a service, or all the entries if no
+        service is given.
+
+        :param service_name: Service name
+        :type service_name: :class:`str`
+        """
+        with self._lock:
+            if service_name is None:
+                self._entries.clear()
+                self._generation += 1
+                return
+
+            generation = self._generations.get(service_name, 0)
+            self._generations[service_name] = generation + 1
+
+            for key in [k for k in self._entries if k[1] == service_name]:
+                del self._entries[key]
+
+    def reset_stats(self):
+        """
+        Reset the hit/miss counters
+        """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self):
+        """
+        :return: Cache hits, misses and current size
+        :rtype: :class:`dict`
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries)
+        }
+
+    def _service_generation(self, service_name):
+        return self._generation, self._generations.get(service_name, 0)
+
+    def _ttl(self, command):
+        if isinstance(self.TTL, dict):
+            return self.TTL.get(command, CachedWrapper.TTL)
+        return self.TTL
+
+
+class _InFlightCommand(object):
+    """
+    NSSM command shared by concurrent identical invocations
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CoalescingWrapper(object):
+    """
+    Single-flight NSSM read commands
+
+    Concurrent identical read commands (same command, service and arguments)
+    share one in-flight `nssm` process, and all of them receive its result
+    or exception. If the leader's own deadline ends the command (timed out
+    or cancelled), a waiting caller runs it again as the new leader.
+
+    It can be combined with a :class:`.CachedWrapper` so that concurrent
+    cache misses spawn a single process:
+
+        >>> wrapper = CachedWrapper(CoalescingWrapper())
+    """
+
+    READ_COMMANDS = ("status", "get", "dump")
+
+    # Interval to check the caller's deadline while waiting for the leader
+    # command, in seconds
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, wrapper=None):
+        """
+        :param wrapper: Wrapped NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        """
+        self.wrapper = wrapper or DEFAULT_WRAPPER
+
+        # Number of invocations served by another in-flight command
+        self.coalesced = 0
+
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def command(self, command, service_name, *args):
+        """
+        NSSM command. See :meth:`.Wrapper.command`.
+        """
+        # Commands not bound to a service (e.g. ``list``) are passed through
+        if service_name is None:
+            return self.wrapper.command(command, service_name, *args)
+
+        if command not in self.READ_COMMANDS:
+            return self.wrapper.command(command, service_name, *args)
+
+        key = (command, service_name) + args
+
+        while True:
+            with self._lock:
+                call = self._in_flight.get(key)
+                if call is None:
+                    call = self._in_flight[key] = _InFlightCommand()
+                    break
+                self.coalesced += 1
+
+            # Otherwise the leader's own deadline ended its command: run it
+            # again, as the leader, within this caller's deadline
+            if self._follow(call, service_name):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+        try:
+            call.result = self.wrapper.command(command, service_name, *args)
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+        return call.result
+
+    def _follow(self, call, service_name):
+        """
+        Wait for the in-flight command of another caller
+
+        The leader command is bounded by its own deadline, but this caller's
+        one may be shorter, or cancelled.
+
+        :return: Whether the leader command completed, rather than timed out
+                 or cancelled by the leader's deadline
+        :rtype: :class:`bool`
+        :raises CommandTimeoutException: If this caller's deadline expires
+        :raises CommandCancelledException: If this caller's deadline is
+                                           cancelled
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            call.done.wait()
+        else:
+            while not call.done.wait(
+                    deadline.timeout_for(self.POLL_INTERVAL)):
+                deadline.check(service_name)
+
+        return not isinstance(call.error, CommandTimeoutException)
@@ -7,6 +7,7 @@ from voluptuous import Schema, Required, Optional, Or, Coerce, REMOVE_EXTRA, \
 from voluptuous.humanize import validate_with_humanized_errors
 
 from nssm.abstract.collections import AbstractDict
+from nssm.abstract.validation import compile_schema, InvalidData
 from nssm.parameters import StartupType, PriorityLevel, ServiceType, ExitAction
 
 
@@ -14,6 +15,7 @@ class ServiceConfiguration(AbstractDict):
     """
     Service configuration object
     """
+    __slots__ = ()
 
     VALIDATION_SCHEMA = Schema({
             # Application
@@ -76,6 +78,61 @@ class ServiceConfiguration(AbstractDict):
         """
         super(ServiceConfiguration, self).__init__()
 
-        self.dictionary = validate_with_humanized_errors(
-            kwargs, self.VALIDATION_SCHEMA
-        )
+        self.dictionary = self.validate(kwargs)
+
+    def derive(self, **kwargs):
+        """
+        Build a configuration that uses this one as template
+
+        Only the given parameters are validated and stored by the derived
+        configuration, the rest are resolved through the template, so
+        similar services share the template memory. Changes to the derived
+        configuration are copied on write and never reach the template.
+
+        :return: Derived service configuration
+        :rtype: :class:`.ServiceConfiguration`
+        :raises voluptuous.Invalid: If the parameters are not valid
+        """
+        return super(ServiceConfiguration, self).derive(self.validate(kwargs))
+
+    @classmethod
+    def validate(cls, data):
+        """
+        Validate and normalize the configuration parameters
+
+        Valid data goes through the precompiled `VALIDATION_SCHEMA`
+        validator. Invalid data is validated again with voluptuous to build
+        the humanized error message.
+
+        :param data: Configuration parameters
+        :type data: :class:`dict`
+        :return: Normalized configuration parameters
+        :rtype: :class:`dict`
+        :raises voluptuous.Invalid: If the parameters are not valid
+        """
+        validator = cls._compiled_validator()
+        if validator is not None:
+            try:
+                return validator(data)
+            except InvalidData:
+                pass  # Build the error message
+
+        return validate_with_humanized_errors(data, cls.VALIDATION_SCHEMA)
+
+    @classmethod
+    def _compiled_validator(cls):
+        """
+        :return: Precompiled validator for the class `VALIDATION_SCHEMA`, or
+                 `None` if the schema can not be compiled
+        :rtype: :class:`callable`
+        """
+        compiled = cls.__dict__.get("_compiled")
+        if compiled is None or compiled[0] is not cls.VALIDATION_SCHEMA:
+            try:
+                validator = compile_schema(cls.VALIDATION_SCHEMA)
+            except NotImplementedError:
+                validator = None
+            compiled = (cls.VALIDATION_SCHEMA, validator)
+            cls._compiled = compiled
+
+        return compiled[1]
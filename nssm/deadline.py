@@ -0,0 +1,223 @@
+"""
+ Deadlines and cancellation of NSSM commands
+
+ A deadline bounds the time of all the `nssm` commands run in its scope,
+ in the current thread and in the worker threads of the package fleet
+ operations:
+
+    >>> with Deadline(30):  # doctest: +SKIP
+    ...     service.configure(config)
+    ...     group.restart(wait=True)
+
+ Cancelling a deadline from another thread kills the running `nssm`
+ processes of its scope, and the commands raise
+ :class:`.CommandCancelledException`.
+"""
+import time
+import threading
+
+from .exceptions import CommandTimeoutException, CommandCancelledException
+
+# Monotonic clock of the package durations and time limits
+_clock = time.perf_counter
+
+# Deadline scopes entered by each thread
+_local = threading.local()
+
+
+def current_deadline():
+    """
+    :return: Innermost deadline of the current thread, if any
+    :rtype: :class:`.Deadline`
+    """
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def bind(func):
+    """
+    Bind a function to the current deadline, so that it applies when the
+    function is called from another thread (e.g. a thread pool worker)
+
+    :param func: Function
+    :type func: :class:`callable`
+    :return: Bound function
+    :rtype: :class:`callable`
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return func
+
+    def bound(*args, **kwargs):
+        with deadline:
+            return func(*args, **kwargs)
+
+    return bound
+
+
+class Deadline(object):
+    """
+    Time limit and cancellation scope of NSSM commands
+
+    Deadlines nest: a deadline created inside the scope of another one
+    expires no later than it, and is cancelled with it.
+    """
+
+    def __init__(self, timeout=None, parent=None):
+        """
+        :param timeout: Time limit in seconds, none by default
+        :type timeout: :class:`float`
+        :param parent: Enclosing deadline, the current one by default
+        :type parent: :class:`.Deadline`
+        """
+        self.parent = parent if parent is not None else current_deadline()
+        self.timeout = timeout
+        self.expires = None if timeout is None else _clock() + timeout
+
+        self._cancelled = threading.Event()
+        self._callbacks = set()
+        self._lock = threading.Lock()
+
+        # Number of threads in the deadline scope
+        self._entered = 0
+
+        if self.parent is not None:
+            self.parent.on_cancel(self.cancel)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        with self._lock:
+            self._entered += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.stack.pop()
+        with self._lock:
+            self._entered -= 1
+            done = not self._entered
+
+        # Stop following the parent cancellation once the last thread leaves
+        if done:
+            self.release()
+
+    def __repr__(self):
+        remaining = self.remaining()
+        remaining = "-" if remaining is None else "{:.3f}s".format(remaining)
+        return "<Deadline remaining={}{}>".format(
+            remaining, " cancelled" if self.cancelled else "")
+
+    @property
+    def cancelled(self):
+        """
+        :return: Whether the deadline was cancelled
+        :rtype: :class:`bool`
+        """
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """
+        :return: Seconds left, `None` if unlimited. Never negative.
+        :rtype: :class:`float`
+        """
+        remaining = None
+        deadline = self
+        while deadline is not None:
+            if deadline.expires is not None:
+                left = max(0.0, deadline.expires - _clock())
+                remaining = left if remaining is None else min(remaining, left)
+            deadline = deadline.parent
+        return remaining
+
+    def expired(self):
+        """
+        :return: Whether the deadline is over (or cancelled)
+        :rtype: :class:`bool`
+        """
+        return self.cancelled or self.remaining() == 0.0
+
+    def check(self, service=None):
+        """
+        Raise if the deadline is over
+
+        :param service: Service name, for the exception
+        :type service: :class:`str`
+        :raises CommandCancelledException: If cancelled
+        :raises CommandTimeoutException: If expired
+        """
+        if self.cancelled:
+            raise CommandCancelledException(service)
+        if self.remaining() == 0.0:
+            raise CommandTimeoutException(service)
+
+    def timeout_for(self, timeout=None):
+        """
+        :param timeout: Own time limit of an operation, in seconds
+        :type timeout: :class:`float`
+        :return: Time limit of the operation within the deadline, `None` if
+                 unlimited
+        :rtype: :class:`float`
+        """
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        if remaining is None:
+            return timeout
+        return min(timeout, remaining)
+
+    def sleep(self, seconds):
+        """
+        Sleep, waking up early if the deadline is cancelled
+
+        :param seconds: Sleep time
+        :type seconds: :class:`float`
+        :return: Whether the whole time was slept
+        :rtype: :class:`bool`
+        """
+        return not self._cancelled.wait(seconds)
+
+    def cancel(self):
+        """
+        Cancel the deadline, and the deadlines nested in it. Running
+        commands in their scopes are killed.
+        """
+        self._cancelled.set()
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """
+        Register a function called on cancellation (e.g. to kill a process).
+        It is called right away if the deadline is already cancelled.
+
+        :param callback: Function without arguments
+        :type callback: :class:`callable`
+        """
+        with self._lock:
+            self._callbacks.add(callback)
+        if self.cancelled:
+            callback()
+
+    def release(self):
+        """
+        Stop following the parent deadline cancellation. Done when leaving
+        the deadline scope; deadlines used without entering their scope
+        (e.g. in coroutines, which share the thread) must be released once
+        done.
+        """
+        if self.parent is not None:
+            self.parent.remove_on_cancel(self.cancel)
+
+    def remove_on_cancel(self, callback):
+        """
+        Unregister a cancellation function
+
+        :param callback: Function without arguments
+        :type callback: :class:`callable`
+        """
+        with self._lock:
+            self._callbacks.discard(callback)
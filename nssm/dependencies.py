@@ -0,0 +1,253 @@
+"""
+ Dependency-aware ordering of service group operations
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .deadline import bind
+from .exceptions import ServiceDependencyException
+from .group import GroupResult
+
+
+def service_dependencies(service):
+    """
+    Names of the services a service depends on, as configured with the
+    `dependencies` parameter. Service load order groups (``+group``) are
+    not included.
+
+    :param service: NSSM service
+    :type service: :class:`.Service`
+    :return: Dependency names
+    :rtype: :class:`list` [ :class:`str` ]
+    """
+    try:
+        dependencies = service.configuration["dependencies"]
+    except KeyError:
+        return []
+
+    if not isinstance(dependencies, list):
+        dependencies = [dependencies]
+    return [d for d in dependencies if d and not d.startswith("+")]
+
+
+class DependencyGraph(object):
+    """
+    Dependency graph of a set of services
+
+    The graph is validated when built: dependencies on services outside the
+    set and dependency cycles raise :class:`.ServiceDependencyException`.
+
+    Operations run each service as soon as the services it waits for are
+    done, so independent branches of the graph never wait for each other.
+    Services start after their dependencies, and stop before them.
+    """
+
+    MAX_WORKERS = 8
+
+    def __init__(self, services, ignore_missing=False, max_workers=None):
+        """
+        :param services: Services
+        :type services: :class:`list` [ :class:`.Service` ]
+        :param ignore_missing: Ignore the dependencies on services outside
+                               the set (e.g. system services), instead of
+                               failing
+        :type ignore_missing: :class:`bool`
+        :param max_workers: Maximum number of concurrent operations
+        :type max_workers: :class:`int`
+        """
+        if max_workers:
+            self.MAX_WORKERS = max_workers
+
+        self.services = {}
+        for service in services:
+            self.services[service.SERVICE_NAME] = service
+
+        # Dependencies and dependents, indexed by service name
+        self.dependencies = {}
+        self.dependents = dict((name, []) for name in self.services)
+
+        for name, service in self.services.items():
+            dependencies = []
+            for dependency in service_dependencies(service):
+                if dependency in self.services:
+                    dependencies.append(dependency)
+                    self.dependents[dependency].append(name)
+                elif not ignore_missing:
+                    msg = "Dependency not found: {}".format(dependency)
+                    raise ServiceDependencyException(name, msg)
+            self.dependencies[name] = dependencies
+
+        self._levels = self._sort()
+
+    def _sort(self):
+        """
+        Topological sort (Kahn's algorithm)
+
+        :return: Service names by level, each level only depending on the
+                 previous ones
+        :rtype: :class:`list` [ :class:`list` [ :class:`str` ] ]
+        :raises ServiceDependencyException: If there is a dependency cycle
+        """
+        pending = dict((name, len(deps))
+                       for name, deps in self.dependencies.items())
+
+        levels = []
+        level = sorted(name for name, count in pending.items() if not count)
+        while level:
+            levels.append(level)
+            following = []
+            for name in level:
+                del pending[name]
+                for dependent in self.dependents[name]:
+                    pending[dependent] -= 1
+                    if not pending[dependent]:
+                        following.append(dependent)
+            level = sorted(following)
+
+        if pending:
+            name = min(pending)
+            cycle = self._cycle(name, pending)
+            msg = "Dependency cycle: {}".format(" -> ".join(cycle))
+            raise ServiceDependencyException(name, msg)
+
+        return levels
+
+    def _cycle(self, name, pending):
+        """
+        :param name: Service that couldn't be sorted
+        :type name: :class:`str`
+        :param pending: Services that couldn't be sorted. Each one depends on
+                        at least another one of them.
+        :type pending: :class:`dict`
+        :return: Names of a dependency cycle, reached from the service
+        :rtype: :class:`list` [ :class:`str` ]
+        """
+        path = []
+        while name not in path:
+            path.append(name)
+            name = min(d for d in self.dependencies[name] if d in pending)
+        return path[path.index(name):] + [name]
+
+    def levels(self):
+        """
+        :return: Service names by start order level. Each level only depends
+                 on the previous ones.
+        :rtype: :class:`list` [ :class:`list` [ :class:`str` ] ]
+        """
+        return [list(level) for level in self._levels]
+
+    def start(self, wait=True, timeout=None):
+        """
+        Start the services, each one once its dependencies are running
+
+        :param wait: Wait for each service to be running before starting its
+                     dependents
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout for each service, in seconds
+        :type timeout: :class:`float`
+        :return: Per-service results and exceptions. The services whose
+                 dependencies failed are not started.
+        :rtype: :class:`.GroupResult`
+        """
+        return self.execute("start", self.dependencies, wait=wait,
+                            timeout=timeout)
+
+    def stop(self, wait=True, timeout=None):
+        """
+        Stop the services, each one once its dependents are stopped
+
+        :param wait: Wait for each service to be stopped before stopping its
+                     dependencies
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout for each service, in seconds
+        :type timeout: :class:`float`
+        :return: Per-service results and exceptions. The services whose
+                 dependents failed to stop are not stopped.
+        :rtype: :class:`.GroupResult`
+        """
+        return self.execute("stop", self.dependents, wait=wait,
+                            timeout=timeout)
+
+    def execute(self, action, after, *args, **kwargs):
+        """
+        Run a service method over the services, each one after the services
+        it must wait for succeeded
+
+        :param action: :class:`.Service` method name
+        :type action: :class:`str`
+        :param after: Names of the services each service waits for, indexed
+                      by service name
+        :type after: :class:`dict`
+        :param args: Method positional arguments
+        :param kwargs: Method keyword arguments
+        :return: Per-service results and exceptions
+        :rtype: :class:`.GroupResult`
+        """
+        result = GroupResult()
+        if not self.services:
+            return result
+
+        waiting = dict((name, []) for name in self.services)
+        for name, names in after.items():
+            for other in names:
+                waiting[other].append(name)
+
+        def call(name):
+            return getattr(self.services[name], action)(*args, **kwargs)
+
+        workers = min(self.MAX_WORKERS, len(self.services))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            self._schedule(executor, bind(call), after, waiting, result)
+
+        return result
+
+    def _schedule(self, executor, call, after, waiting, result):
+        """
+        Run each service as soon as the services it waits for succeeded,
+        until all of them are done or skipped
+
+        :param executor: Executor running the services
+        :type executor: :class:`concurrent.futures.Executor`
+        :param call: Runs the operation of a service, given its name
+        :type call: :class:`callable`
+        :param after: Names of the services each service waits for, indexed
+                      by service name
+        :type after: :class:`dict`
+        :param waiting: Names of the services waiting for each service,
+                        indexed by service name
+        :type waiting: :class:`dict`
+        :param result: Per-service results and exceptions, filled in
+        :type result: :class:`.GroupResult`
+        """
+        pending = dict((name, len(after[name])) for name in self.services)
+        futures = dict((executor.submit(call, name), name)
+                       for name in sorted(self.services) if not pending[name])
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures.pop(future)
+                try:
+                    result.results[name] = future.result()
+                except Exception as err:
+                    result.errors[name] = err
+                    self._skip(name, waiting, result)
+                    continue
+
+                for other in waiting[name]:
+                    pending[other] -= 1
+                    if not pending[other] and other not in result.errors:
+                        futures[executor.submit(call, other)] = other
+
+    @staticmethod
+    def _skip(name, waiting, result):
+        """
+        Fail the services waiting, directly or not, for a failed one. They
+        are not run.
+        """
+        msg = "Not run, {} failed".format(name)
+        skipped = list(waiting[name])
+        while skipped:
+            other = skipped.pop()
+            if other not in result.errors:
+                result.errors[other] = ServiceDependencyException(other, msg)
+                skipped.extend(waiting[other])
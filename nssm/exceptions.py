@@ -8,7 +8,9 @@ __all__ = ["NssmException", "ServiceException", "ServiceDoesntExistException",
            "ServiceRemoveException", "ServiceStartException",
            "ServiceStopException", "ServiceResumeException",
            "ServicePauseException", "ServiceConfigurationException",
-           "ServiceNotStartedException"]
+           "ServiceNotStartedException", "ServiceTimeoutException",
+           "ServiceUnhealthyException", "ServiceDependencyException",
+           "CommandTimeoutException", "CommandCancelledException"]
 
 
 class NssmException(Exception):
@@ -32,6 +34,7 @@ class NssmException(Exception):
         """
         self.service = service
         self.output = output
+        self.rcode = rcode
 
         if message is None:
             message = self.DEFAULT_MESSAGE
@@ -41,6 +44,20 @@ class NssmException(Exception):
         super(Exception, self).__init__(message)
 
 
+class CommandTimeoutException(NssmException):
+    """
+    NSSM command timeout exception. The `nssm` process was killed.
+    """
+    DEFAULT_MESSAGE = "NSSM command timed out"
+
+
+class CommandCancelledException(CommandTimeoutException):
+    """
+    NSSM command cancellation exception. The `nssm` process was killed.
+    """
+    DEFAULT_MESSAGE = "NSSM command cancelled"
+
+
 class ServiceException(NssmException):
     """
     Service base exception
@@ -119,6 +136,43 @@ class ServiceConfigurationException(ServiceException):
     DEFAULT_MESSAGE = "Service configuration failed"
 
 
+class ServiceTimeoutException(ServiceException):
+    """
+    Service state wait timeout exception
+    """
+    DEFAULT_MESSAGE = "Timed out waiting for the service state"
+
+
+class ServiceUnhealthyException(ServiceException):
+    """
+    Service health check failure exception
+    """
+    DEFAULT_MESSAGE = "Service health check failed"
+
+
+class ServiceDependencyException(ServiceException):
+    """
+    Service dependencies exception (e.g. dependency cycles)
+    """
+    DEFAULT_MESSAGE = "Invalid service dependencies"
+
+
+# Return code of the NSSM usage message, e.g. for the commands not supported
+# by the NSSM version
+RC_USAGE = 2
+
+
+def _unsupported_command(error):
+    """
+    :param error: Failed command exception
+    :type error: :class:`.NssmException`
+    :return: Whether the command failed because the NSSM version doesn't
+             support it (as opposed to a failure of this invocation)
+    :rtype: :class:`bool`
+    """
+    return error.rcode == RC_USAGE
+
+
 def _map_exception(command, rcode):
     """
     Map command return codes to exceptions
@@ -157,6 +211,8 @@ def _map_exception(command, rcode):
         # Get/Set command
         ("set", "*"): ServiceConfigurationException,
         ("get", "*"): ServiceConfigurationException,
+        ("reset", "*"): ServiceConfigurationException,
+        ("dump", "*"): ServiceConfigurationException,
 
         # Any command
         ("*", 3): ServiceDoesntExistException,
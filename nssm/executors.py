@@ -0,0 +1,205 @@
+"""
+ NSSM command executors
+"""
+import os
+import codecs
+import subprocess as sp
+
+from .deadline import _clock
+from .exceptions import CommandCancelledException
+
+
+def nssm_exe():
+    """
+    Build full path to the NSSM binary executable depending on processor
+    architecture
+
+    :return: Path to the bundled executable
+    :rtype: str
+    """
+    # A 32-bit Python process on a 64-bit Windows reports its own
+    # architecture, the machine one is in PROCESSOR_ARCHITEW6432
+    arch = os.environ.get("PROCESSOR_ARCHITEW6432") or \
+        os.environ.get("PROCESSOR_ARCHITECTURE", "")
+    arch = "win64" if "64" in arch else "win32"
+    return os.path.join(os.path.dirname(__file__), "bin", arch, "nssm.exe")
+
+
+class CommandResult(object):
+    """
+    Result of a NSSM command
+
+    The console output is kept as the raw bytes written by `nssm` (UTF-16),
+    and only decoded when its text is requested.
+
+    For compatibility, the result unpacks as a `(rcode, text)` tuple.
+    """
+
+    __slots__ = ("rcode", "output", "duration", "_text")
+
+    # Console output encoding of `nssm`
+    ENCODING = "utf-16"
+
+    # Bytes decoded at once when iterating the output lines
+    CHUNK_SIZE = 4096
+
+    def __init__(self, rcode, output=b"", duration=None):
+        """
+        :param rcode: Process return code
+        :type rcode: :class:`int`
+        :param output: Raw console output
+        :type output: :class:`bytes`
+        :param duration: Process wall time, in seconds. Unknown by default
+                         (e.g. no process run), the wrapper measures it.
+        :type duration: :class:`float`
+        """
+        self.rcode = rcode
+        self.output = output
+        self.duration = duration
+        self._text = None
+
+    def __iter__(self):
+        return iter((self.rcode, self.text))
+
+    def __repr__(self):
+        return "<CommandResult rc={} {}B ({:.3f}s)>".format(
+            self.rcode, len(self.output), self.duration or 0.0)
+
+    @property
+    def text(self):
+        """
+        :return: Decoded console output
+        :rtype: :class:`str`
+        """
+        if self._text is None:
+            output = self.output
+            if isinstance(output, bytes):
+                output = output.decode(self.ENCODING)
+            self._text = output
+        return self._text
+
+    def lines(self, chunk_size=None):
+        """
+        Decode the console output line by line, without decoding it all
+        upfront
+
+        :param chunk_size: Bytes decoded at once, `CHUNK_SIZE` by default
+        :type chunk_size: :class:`int`
+        :return: Output lines, without line endings
+        :rtype: :class:`generator` [ :class:`str` ]
+        """
+        if self._text is not None or not isinstance(self.output, bytes):
+            for line in self.text.splitlines():
+                yield line
+            return
+
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        decoder = codecs.getincrementaldecoder(self.ENCODING)()
+        pending = ""
+        for i in range(0, len(self.output), chunk_size):
+            chunk = self.output[i:i + chunk_size]
+            lines = (pending + decoder.decode(chunk)).splitlines(True)
+            pending = ""
+            # The last line may continue in the next chunk
+            if lines and not lines[-1].endswith("\n"):
+                pending = lines.pop()
+            for line in lines:
+                yield line.rstrip("\r\n")
+
+        pending += decoder.decode(b"", True)
+        for line in pending.splitlines():
+            yield line
+
+
+class Executor(object):
+    """
+    NSSM command executor interface
+
+    Executors run the `nssm` command line arguments and return the process
+    return code and raw console output, as a :class:`.CommandResult`. They
+    don't interpret the result; that is done by the :class:`.Wrapper`.
+    """
+
+    def execute(self, args, deadline=None):
+        """
+        Execute a NSSM command
+
+        :param args: NSSM arguments (i.e. command, service name and command
+                     arguments)
+        :type args: :class:`list` [ :class:`str` ]
+        :param deadline: Command time limit and cancellation scope. The
+                         command process must be terminated once it is over.
+        :type deadline: :class:`.Deadline`
+        :return: Return code and raw console output of the command
+        :rtype: :class:`.CommandResult`
+        :raises CommandTimeoutException: If the deadline expires
+        :raises CommandCancelledException: If the deadline is cancelled
+        """
+        raise NotImplementedError
+
+
+class SubprocessExecutor(Executor):
+    """
+    Executor running the NSSM binary in a subprocess
+
+    The arguments are passed to the process as an argument vector, never
+    through a shell, so they need no quoting. The process is killed (and
+    reaped) once its deadline expires or is cancelled.
+    """
+
+    # Interval to check the deadline cancellation while waiting for the
+    # process, in seconds
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, executable=None):
+        """
+        :param executable: Path to the NSSM executable. The bundled one by
+                           default.
+        :type executable: :class:`str`
+        """
+        self._executable = executable
+
+    @property
+    def executable(self):
+        """
+        :return: Path to the NSSM executable
+        :rtype: :class:`str`
+        """
+        if self._executable is None:
+            self._executable = nssm_exe()
+        return self._executable
+
+    def execute(self, args, deadline=None):
+        argv = [self.executable] + list(args)
+
+        service = args[1] if len(args) > 1 else None
+
+        start = _clock()
+        process = sp.Popen(argv, stdout=sp.PIPE, stderr=sp.STDOUT)
+        if deadline is None:
+            out, _ = process.communicate()
+            return CommandResult(process.returncode, out, _clock() - start)
+
+        deadline.on_cancel(process.kill)
+        try:
+            while True:
+                try:
+                    out, _ = process.communicate(
+                        timeout=deadline.timeout_for(self.POLL_INTERVAL))
+                    break
+                except sp.TimeoutExpired:
+                    deadline.check(service)
+
+        finally:
+            deadline.remove_on_cancel(process.kill)
+
+            # Never leave a running or unreaped process behind
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+        if deadline.cancelled:
+            raise CommandCancelledException(service)
+
+        return CommandResult(process.returncode, out, _clock() - start)
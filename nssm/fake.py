@@ -0,0 +1,270 @@
+"""
+ In-memory NSSM stand-in, for testing and benchmarking without Windows
+"""
+import ntpath
+import time
+import threading
+from subprocess import list2cmdline
+
+from .executors import Executor, CommandResult
+from .exceptions import CommandTimeoutException, CommandCancelledException
+from .parameters import PARAM_MAP, split_key
+
+
+# Return codes
+RC_OK = 0
+RC_ERROR = 1
+RC_USAGE = 2  # Also for the commands unknown to the NSSM version
+RC_NOT_INSTALLED = 3
+RC_ALREADY_INSTALLED = 5
+
+# Service states
+STOPPED = "SERVICE_STOPPED"
+RUNNING = "SERVICE_RUNNING"
+PAUSED = "SERVICE_PAUSED"
+START_PENDING = "SERVICE_START_PENDING"
+STOP_PENDING = "SERVICE_STOP_PENDING"
+PAUSE_PENDING = "SERVICE_PAUSE_PENDING"
+CONTINUE_PENDING = "SERVICE_CONTINUE_PENDING"
+
+
+class FakeService(object):
+    """
+    Fake NSSM service state
+    """
+
+    def __init__(self, name, path):
+        self.name = name
+        self.state = STOPPED
+
+        # Pending state reported by the next `status` commands, and how many
+        # times it is still reported
+        self.pending_state = None
+        self.pending = 0
+
+        # Parameter values indexed by parameter key (i.e. parameter name and
+        # sub-parameter)
+        self.parameters = {
+            (PARAM_MAP["path"],): (path,),
+            (PARAM_MAP["startup_dir"],): (ntpath.dirname(path),),
+            (PARAM_MAP["display_name"],): (name,),
+            (PARAM_MAP["startup"],): ("SERVICE_AUTO_START",),
+            (PARAM_MAP["user_account"],): ("LocalSystem",),
+            (PARAM_MAP["type"],): ("SERVICE_WIN32_OWN_PROCESS",),
+            (PARAM_MAP["action_on_exit"], "Default"): ("Restart",),
+        }
+
+
+class FakeNssm(Executor):
+    """
+    Executor modelling NSSM in memory
+
+    It keeps the installed services, their state and parameters, and
+    answers the commands with the same return codes and UTF-16 console
+    output as the NSSM binary:
+
+        >>> from nssm import Service, Wrapper
+        >>> fake = FakeNssm()
+        >>> service = Service("MyService", "C:\\\\my_service.exe",
+        ...                   wrapper=Wrapper(fake))
+        >>> service.install()
+        >>> service.start()
+        >>> service.status()
+        <ServiceStatus.RUNNING: 'SERVICE_RUNNING'>
+        >>> fake.spawns
+        3
+    """
+
+    def __init__(self, latency=0.0, pending=0):
+        """
+        :param latency: Simulated process duration, in seconds
+        :type latency: :class:`float`
+        :param pending: Number of `status` commands reporting a pending state
+                        (e.g. `SERVICE_START_PENDING`) after a state change
+        :type pending: :class:`int`
+        """
+        self.latency = latency
+        self.pending = pending
+
+        # Installed services indexed by service name
+        self.services = {}
+
+        # Number of executed commands, in total and per command
+        self.spawns = 0
+        self.counts = {}
+
+        self._lock = threading.Lock()
+
+    def execute(self, args, deadline=None):
+        if self.latency:
+            if deadline is None:
+                time.sleep(self.latency)
+            else:
+                timeout = deadline.timeout_for(self.latency)
+                service = args[1] if len(args) > 1 else None
+                if not deadline.sleep(timeout):
+                    raise CommandCancelledException(service)
+                if timeout < self.latency:
+                    raise CommandTimeoutException(service)
+
+        command = args[0] if args else ""
+
+        with self._lock:
+            self.spawns += 1
+            self.counts[command] = self.counts.get(command, 0) + 1
+
+            handler = getattr(self, "_" + command, None)
+            if handler is None or (len(args) < 2 and command != "list"):
+                rcode, out = RC_USAGE, "Usage: nssm <command> <service>"
+            else:
+                rcode, out = handler(*args[1:])
+
+        if out and not out.endswith("\n"):
+            out += "\r\n"
+
+        return CommandResult(rcode, out.encode("utf-16"))
+
+    def reset_counters(self):
+        """
+        Reset the executed command counters
+        """
+        with self._lock:
+            self.spawns = 0
+            self.counts = {}
+
+    def _service(self, name):
+        service = self.services.get(name)
+        if service is None:
+            msg = "The specified service does not exist as an installed " \
+                  "service."
+            return None, (RC_NOT_INSTALLED, msg)
+        return service, None
+
+    def _install(self, name, path=None, *args):
+        if name in self.services:
+            msg = "The specified service already exists."
+            return RC_ALREADY_INSTALLED, msg
+        if not path:
+            return RC_USAGE, "Usage: nssm install <service> <path>"
+
+        self.services[name] = FakeService(name, path)
+        return RC_OK, "Service \"{}\" installed successfully!".format(name)
+
+    def _remove(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+
+        del self.services[name]
+        return RC_OK, "Service \"{}\" removed successfully!".format(name)
+
+    def _transition(self, name, control, states, target):
+        service, error = self._service(name)
+        if error:
+            return error
+        if service.state not in states:
+            return RC_ERROR, "{}: {}: Unexpected status {}".format(
+                name, control, service.state)
+
+        if self.pending and service.state != target:
+            service.pending = self.pending
+            if target == STOPPED:
+                service.pending_state = STOP_PENDING
+            elif target == PAUSED:
+                service.pending_state = PAUSE_PENDING
+            elif service.state == PAUSED:
+                service.pending_state = CONTINUE_PENDING
+            else:
+                service.pending_state = START_PENDING
+
+        service.state = target
+        return RC_OK, "{}: {}: The operation completed successfully.".format(
+            name, control)
+
+    def _start(self, name, *args):
+        return self._transition(name, "START", (STOPPED,), RUNNING)
+
+    def _stop(self, name, *args):
+        return self._transition(name, "STOP", (RUNNING, PAUSED), STOPPED)
+
+    def _restart(self, name, *args):
+        return self._transition(name, "START", (STOPPED, RUNNING, PAUSED),
+                                RUNNING)
+
+    def _pause(self, name, *args):
+        return self._transition(name, "PAUSE", (RUNNING,), PAUSED)
+
+    def _continue(self, name, *args):
+        return self._transition(name, "CONTINUE", (PAUSED,), RUNNING)
+
+    def _rotate(self, name, *args):
+        return self._transition(name, "ROTATE", (RUNNING,), RUNNING)
+
+    def _status(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+        if service.pending:
+            service.pending -= 1
+            return RC_OK, service.pending_state
+        return RC_OK, service.state
+
+    def _edit(self, name, *args):
+        service, error = self._service(name)
+        return error or (RC_OK, "")
+
+    def _get(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+        if not args:
+            return RC_USAGE, "Usage: nssm get <service> <parameter>"
+
+        key, _ = split_key(args)
+        return RC_OK, "\r\n".join(service.parameters.get(key, ()))
+
+    def _set(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+
+        key, values = split_key(args)
+        if not values:
+            return RC_USAGE, "Usage: nssm set <service> <parameter> <value>"
+
+        # The service account password is never read back
+        if key[0] == PARAM_MAP["user_account"]:
+            values = values[:1]
+
+        service.parameters[key] = values
+        return RC_OK, "Set parameter \"{}\" for service \"{}\".".format(
+            key[0], name)
+
+    def _reset(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+        if not args:
+            return RC_USAGE, "Usage: nssm reset <service> <parameter>"
+
+        key, _ = split_key(args)
+        service.parameters.pop(key, None)
+        return RC_OK, "Reset parameter \"{}\" for service \"{}\".".format(
+            key[0], name)
+
+    def _list(self, *args):
+        return RC_OK, "\r\n".join(sorted(self.services))
+
+    def _dump(self, name, *args):
+        service, error = self._service(name)
+        if error:
+            return error
+
+        exe = "nssm.exe"
+        path = service.parameters.get((PARAM_MAP["path"],), ("",))
+        lines = [list2cmdline([exe, "install", name] + list(path))]
+        for key, values in sorted(service.parameters.items()):
+            if key[0] != PARAM_MAP["path"]:
+                args = [exe, "set", name] + list(key) + list(values)
+                lines.append(list2cmdline(args))
+        return RC_OK, "\r\n".join(lines)
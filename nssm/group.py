@@ -0,0 +1,425 @@
+"""
+ Concurrent operations over groups of services
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .deadline import bind
+from .exceptions import ServiceTimeoutException, CommandTimeoutException, \
+                        CommandCancelledException
+from .service import Service, ServiceStatus, _StatusPolling, _status_set, \
+                     _timeout_message
+
+
+class GroupResult(object):
+    """
+    Per-service results of a service group operation
+    """
+
+    def __init__(self):
+        # Operation return values indexed by service name
+        self.results = {}
+
+        # Raised exceptions indexed by service name
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.results) + len(self.errors)
+
+    def __repr__(self):
+        msg = "<GroupResult succeeded={} failed={}>"
+        return msg.format(len(self.results), len(self.errors))
+
+    @property
+    def succeeded(self):
+        """
+        :return: Names of the services where the operation succeeded
+        :rtype: :class:`list` [ :class:`str` ]
+        """
+        return sorted(self.results)
+
+    @property
+    def failed(self):
+        """
+        :return: Names of the services where the operation failed
+        :rtype: :class:`list` [ :class:`str` ]
+        """
+        return sorted(self.errors)
+
+    def raise_for_errors(self):
+        """
+        Raise the first (by service name) exception, if any.
+        """
+        if self.errors:
+            raise self.errors[min(self.errors)]
+
+
+class ServiceGroup(_StatusPolling):
+    """
+    Group of NSSM services operated concurrently
+
+    Every operation runs the corresponding :class:`.Service` method over all
+    the services of the group on a thread pool, with at most `MAX_WORKERS`
+    `nssm` processes running at the same time. A failing service doesn't
+    abort the operation; its exception is collected in the result instead.
+    """
+
+    MAX_WORKERS = 8
+
+    def __init__(self, services=None, max_workers=None):
+        """
+        :param services: Group services
+        :type services: :class:`list` [ :class:`.Service` ]
+        :param max_workers: Maximum number of concurrent operations
+        :type max_workers: :class:`int`
+        """
+        self.services = list(services or [])
+
+        if max_workers:
+            self.MAX_WORKERS = max_workers
+
+    @classmethod
+    def discover(cls, patterns=None, wrapper=None, max_workers=None,
+                 **kwargs):
+        """
+        Group of the services managed by NSSM. See :meth:`.Service.discover`.
+
+        :param patterns: Service name glob patterns. All the services by
+                         default.
+        :type patterns: :class:`str` or :class:`list` [ :class:`str` ]
+        :param wrapper: NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        :param max_workers: Maximum number of concurrent operations
+        :type max_workers: :class:`int`
+        :param kwargs: :meth:`.Service.discover` keyword arguments
+        :return: Discovered services
+        :rtype: :class:`.ServiceGroup`
+        """
+        return cls(Service.discover(patterns, wrapper=wrapper,
+                                    max_workers=max_workers, **kwargs),
+                   max_workers)
+
+    def __iter__(self):
+        return iter(self.services)
+
+    def __len__(self):
+        return len(self.services)
+
+    def add(self, service):
+        """
+        Add a service to the group
+
+        :param service: NSSM service
+        :type service: :class:`.Service`
+        """
+        self.services.append(service)
+
+    def start(self, wait=False, timeout=None):
+        """
+        Start the services
+
+        :param wait: Wait for the services to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        return self._execute_and_wait("start", ServiceStatus.RUNNING, wait,
+                                      timeout)
+
+    def stop(self, wait=False, timeout=None):
+        """
+        Stop the services
+
+        :param wait: Wait for the services to be stopped
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        return self._execute_and_wait("stop", ServiceStatus.STOPPED, wait,
+                                      timeout)
+
+    def restart(self, wait=False, timeout=None):
+        """
+        Restart the services
+
+        :param wait: Wait for the services to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        return self._execute_and_wait("restart", ServiceStatus.RUNNING, wait,
+                                      timeout)
+
+    def ordered_start(self, wait=True, timeout=None, ignore_missing=False):
+        """
+        Start the services after their dependencies (see
+        :class:`.DependencyGraph`)
+
+        :param wait: Wait for each service to be running before starting its
+                     dependents
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout for each service, in seconds
+        :type timeout: :class:`float`
+        :param ignore_missing: Ignore the dependencies on services outside
+                               the group
+        :type ignore_missing: :class:`bool`
+        :raises ServiceDependencyException: On dependency cycles or missing
+                                            dependencies
+        """
+        return self.dependency_graph(ignore_missing).start(wait, timeout)
+
+    def ordered_stop(self, wait=True, timeout=None, ignore_missing=False):
+        """
+        Stop the services before their dependencies (see
+        :class:`.DependencyGraph`)
+
+        :param wait: Wait for each service to be stopped before stopping its
+                     dependencies
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout for each service, in seconds
+        :type timeout: :class:`float`
+        :param ignore_missing: Ignore the dependencies on services outside
+                               the group
+        :type ignore_missing: :class:`bool`
+        :raises ServiceDependencyException: On dependency cycles or missing
+                                            dependencies
+        """
+        return self.dependency_graph(ignore_missing).stop(wait, timeout)
+
+    def dependency_graph(self, ignore_missing=False):
+        """
+        :param ignore_missing: Ignore the dependencies on services outside
+                               the group
+        :type ignore_missing: :class:`bool`
+        :return: Dependency graph of the group services
+        :rtype: :class:`.DependencyGraph`
+        :raises ServiceDependencyException: On dependency cycles or missing
+                                            dependencies
+        """
+        from .dependencies import DependencyGraph
+
+        return DependencyGraph(self.services, ignore_missing,
+                               self.MAX_WORKERS)
+
+    def rolling_restart(self, wave_size=None, max_failures=None,
+                        timeout=None, health_check=None):
+        """
+        Restart the services in waves, waiting for each wave to be running
+        before the next one (see :class:`.RollingRestart`)
+
+        :param wave_size: Services per wave, a number or a fraction (0-1) of
+                          the group size
+        :type wave_size: :class:`int` or :class:`float`
+        :param max_failures: Failed services tolerated before stopping, a
+                             number or a fraction (0-1) of the group size
+        :type max_failures: :class:`int` or :class:`float`
+        :param timeout: Time for each wave to be running, in seconds
+        :type timeout: :class:`float`
+        :param health_check: Called with each running service, returns
+                             whether it is healthy
+        :type health_check: :class:`callable`
+        :return: Rolling restart, paused if the failure threshold was crossed
+        :rtype: :class:`.RollingRestart`
+        """
+        from .rolling import RollingRestart
+
+        rollout = RollingRestart(self, wave_size, max_failures, timeout,
+                                 health_check)
+        rollout.run()
+        return rollout
+
+    def install(self, checkpoint=None):
+        """
+        Install and configure the services concurrently, skipping the ones
+        already done according to the checkpoint (see :class:`.BulkInstaller`)
+
+        :param checkpoint: Checkpoint store, or the path of its SQLite file
+        :type checkpoint: :class:`.StateStore` or :class:`str`
+        :return: Per-service actions and exceptions, spawns and wall time
+        :rtype: :class:`.BulkInstallResult`
+        """
+        from .bulk import BulkInstaller
+
+        return BulkInstaller(self, checkpoint, self.MAX_WORKERS).run()
+
+    def pause(self, wait=False, timeout=None):
+        """
+        Pause the services
+
+        :param wait: Wait for the services to be paused
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        return self._execute_and_wait("pause", ServiceStatus.PAUSED, wait,
+                                      timeout)
+
+    def resume(self, wait=False, timeout=None):
+        """
+        Resume the services
+
+        :param wait: Wait for the services to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        """
+        return self._execute_and_wait("resume", ServiceStatus.RUNNING, wait,
+                                      timeout)
+
+    def rotate(self):
+        """
+        Trigger the on-demand output file rotation of the services
+        """
+        return self.execute("rotate")
+
+    def status(self):
+        """
+        Query the services' status
+
+        :return: Service status indexed by service name
+        :rtype: :class:`.GroupResult`
+        """
+        return self.execute("status")
+
+    def wait_for(self, state, timeout=None, services=None):
+        """
+        Wait for the services to reach a state
+
+        All the services are polled from a single loop, each round querying
+        the services not yet in the expected state on a thread pool of at
+        most `MAX_WORKERS` workers. The interval between rounds starts at
+        `POLL_INTERVAL` and grows up to `POLL_MAX_INTERVAL` while no status
+        changes.
+
+        :param state: Expected service status, or any of a list of them
+        :type state: :class:`.ServiceStatus` or :class:`list`
+        :param timeout: Timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        :param services: Services to wait for, all the group services by
+                         default
+        :type services: :class:`list` [ :class:`.Service` ]
+        :return: Reached status indexed by service name, and the
+                 :class:`.ServiceTimeoutException` of the services that
+                 didn't reach it
+        :rtype: :class:`.GroupResult`
+        """
+        targets = _status_set(state)
+        result = GroupResult()
+        pending = list(self.services if services is None else services)
+        if not pending:
+            return result
+
+        # Last polled status indexed by service name
+        last = {}
+
+        def poll(deadline):
+            nonlocal pending
+            pending, changed = self._poll_round(executor, pending, targets,
+                                                last, result, deadline)
+            return not pending, changed
+
+        workers = min(self.MAX_WORKERS, len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                self._poll(poll, timeout)
+            except CommandCancelledException:
+                for service in pending:
+                    name = service.SERVICE_NAME
+                    result.errors[name] = CommandCancelledException(name)
+                return result
+
+        for service in pending:
+            name = service.SERVICE_NAME
+            result.errors[name] = ServiceTimeoutException(
+                name, _timeout_message(targets, last.get(name)))
+        return result
+
+    @staticmethod
+    def _poll_round(executor, services, targets, last, result, deadline):
+        """
+        Query the status of the services concurrently, once
+
+        :param executor: Executor running the status commands
+        :type executor: :class:`concurrent.futures.Executor`
+        :param services: Services still waited for
+        :type services: :class:`list` [ :class:`.Service` ]
+        :param targets: Expected service statuses
+        :type targets: :class:`frozenset` [ :class:`.ServiceStatus` ]
+        :param last: Last polled status indexed by service name, updated
+        :type last: :class:`dict`
+        :param result: Reached statuses and exceptions, filled in
+        :type result: :class:`.GroupResult`
+        :param deadline: Wait deadline
+        :type deadline: :class:`.Deadline`
+        :return: Services still waited for, and whether any status changed
+        :rtype: :class:`tuple` [ :class:`list`, :class:`bool` ]
+        """
+        def poll(service):
+            try:
+                return service._poll_status()
+            except Exception as err:
+                return err
+
+        waiting = []
+        changed = False
+        for service, status in zip(services,
+                                   executor.map(bind(poll), services)):
+            name = service.SERVICE_NAME
+            if isinstance(status, CommandTimeoutException) and \
+                    not deadline.cancelled and deadline.expired():
+                waiting.append(service)  # The wait is over
+            elif isinstance(status, Exception):
+                result.errors[name] = status
+            elif status in targets:
+                result.results[name] = status
+            else:
+                waiting.append(service)
+                changed = changed or last.get(name) != status
+                last[name] = status
+
+        return waiting, changed
+
+    def _execute_and_wait(self, action, state, wait, timeout):
+        """
+        Run a service method over the group, then wait for the services
+        where it succeeded to reach a state
+        """
+        result = self.execute(action)
+        if not wait:
+            return result
+
+        services = [s for s in self.services
+                    if s.SERVICE_NAME in result.results]
+        waited = self.wait_for(state, timeout, services)
+        waited.errors.update(result.errors)
+        return waited
+
+    def execute(self, action, *args, **kwargs):
+        """
+        Run a service method over all the services of the group
+
+        :param action: :class:`.Service` method name
+        :type action: :class:`str`
+        :param args: Method positional arguments
+        :param kwargs: Method keyword arguments
+        :return: Per-service results and exceptions
+        :rtype: :class:`.GroupResult`
+        """
+        result = GroupResult()
+        if not self.services:
+            return result
+
+        workers = min(self.MAX_WORKERS, len(self.services))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for service in self.services:
+                method = bind(getattr(service, action))
+                futures[executor.submit(method, *args, **kwargs)] = service
+
+            for future in as_completed(futures):
+                name = futures[future].SERVICE_NAME
+                try:
+                    result.results[name] = future.result()
+                except Exception as err:
+                    result.errors[name] = err
+
+        return result
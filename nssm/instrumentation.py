@@ -0,0 +1,133 @@
+"""
+ NSSM command invocation instrumentation
+"""
+import threading
+
+
+class CommandEvent(object):
+    """
+    NSSM command invocation report, as notified to the wrapper observers
+    """
+
+    def __init__(self, command, service_name, args, rcode, exception,
+                 duration, output_size):
+        """
+        :param command: NSSM command
+        :type command: :class:`str`
+        :param service_name: Service name
+        :type service_name: :class:`str`
+        :param args: Command arguments
+        :type args: :class:`tuple` [ :class:`str` ]
+        :param rcode: Console process return code
+        :type rcode: :class:`int`
+        :param exception: Mapped exception class, if the command failed
+        :type exception: :class:`type`
+        :param duration: Time from process spawn to exit, in seconds
+        :type duration: :class:`float`
+        :param output_size: Console process output size, in bytes
+        :type output_size: :class:`int`
+        """
+        self.command = command
+        self.service_name = service_name
+        self.args = args
+        self.rcode = rcode
+        self.exception = exception
+        self.duration = duration
+        self.output_size = output_size
+
+    def __repr__(self):
+        msg = "<CommandEvent {} {} rc={} ({:.3f}s)>"
+        return msg.format(self.command, self.service_name, self.rcode,
+                          self.duration)
+
+
+class CommandStats(object):
+    """
+    In-memory aggregator of NSSM command invocations
+
+    Keeps, per command, the invocation and error counts and a latency
+    histogram. Register it as a wrapper observer:
+
+        >>> stats = CommandStats()
+        >>> DEFAULT_WRAPPER.add_observer(stats)  # doctest: +SKIP
+    """
+
+    # Latency histogram buckets upper bounds, in seconds
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+               float("inf"))
+
+    def __init__(self, buckets=None):
+        """
+        :param buckets: Latency histogram buckets upper bounds, in seconds
+        :type buckets: :class:`tuple` [ :class:`float` ]
+        """
+        if buckets:
+            self.BUCKETS = tuple(sorted(buckets))
+            if self.BUCKETS[-1] != float("inf"):
+                self.BUCKETS += (float("inf"),)
+
+        self._commands = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        """
+        Aggregate a command invocation
+
+        :param event: Command invocation report
+        :type event: :class:`.CommandEvent`
+        """
+        with self._lock:
+            stats = self._commands.get(event.command)
+            if stats is None:
+                stats = self._commands[event.command] = {
+                    "count": 0,
+                    "errors": {},
+                    "duration_sum": 0.0,
+                    "duration_min": None,
+                    "duration_max": None,
+                    "output_bytes": 0,
+                    "buckets": [0] * len(self.BUCKETS),
+                }
+
+            stats["count"] += 1
+            stats["duration_sum"] += event.duration
+            stats["output_bytes"] += event.output_size
+
+            if stats["duration_min"] is None or \
+                    event.duration < stats["duration_min"]:
+                stats["duration_min"] = event.duration
+            if stats["duration_max"] is None or \
+                    event.duration > stats["duration_max"]:
+                stats["duration_max"] = event.duration
+
+            if event.exception is not None:
+                name = event.exception.__name__
+                stats["errors"][name] = stats["errors"].get(name, 0) + 1
+
+            for i, bound in enumerate(self.BUCKETS):
+                if event.duration <= bound:
+                    stats["buckets"][i] += 1
+                    break
+
+    def dump(self):
+        """
+        Aggregated statistics per command. The histogram bucket counts are
+        not cumulative.
+
+        :return: Statistics indexed by command
+        :rtype: :class:`dict`
+        """
+        with self._lock:
+            result = {}
+            for command, stats in self._commands.items():
+                stats = dict(stats, errors=dict(stats["errors"]))
+                stats["buckets"] = list(zip(self.BUCKETS, stats["buckets"]))
+                result[command] = stats
+            return result
+
+    def reset(self):
+        """
+        Drop all the aggregated statistics
+        """
+        with self._lock:
+            self._commands = {}
@@ -0,0 +1,246 @@
+"""
+ Prometheus metrics of the NSSM services and commands
+
+ The service states are read from a :class:`.Watcher`, polled in the
+ background at a bounded rate, and the command latencies and errors from
+ a :class:`.CommandStats` observer. Rendering the metrics never runs
+ `nssm`, so scrapes cost no process spawns:
+
+    >>> exporter = MetricsExporter(group, wrapper)  # doctest: +SKIP
+    >>> exporter.serve(9638)  # doctest: +SKIP
+"""
+import os
+import threading
+
+from .instrumentation import CommandStats
+from .service import ServiceStatus
+from .watch import Watcher
+from .wrapper import _observable
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    """
+    :param value: Label value
+    :type value: :class:`str`
+    :return: Label value escaped for the text exposition format
+    :rtype: :class:`str`
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"") \
+        .replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join("{}=\"{}\"".format(name, _escape(value))
+                          for name, value in sorted(labels.items())) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsExporter(object):
+    """
+    Prometheus exporter of the service states and `nssm` command metrics
+
+    Metrics:
+
+    - ``nssm_service_state``: 1 for the current state of each service, 0 for
+      the others. All 0 if the service is removed or not polled yet.
+    - ``nssm_service_state_changes_total``: State changes per service.
+    - ``nssm_command_duration_seconds``: Command latency histogram.
+    - ``nssm_command_errors_total``: Failed commands per mapped exception.
+    - ``nssm_command_output_bytes_total``: Command console output size.
+
+    The services are polled every `INTERVAL` seconds (see :class:`.Watcher`).
+    """
+
+    INTERVAL = 15.0
+
+    def __init__(self, services, wrapper=None, interval=None, watcher=None,
+                 stats=None):
+        """
+        :param services: Exported services
+        :type services: :class:`list` [ :class:`.Service` ] or
+                        :class:`.ServiceGroup`
+        :param wrapper: NSSM command wrapper whose commands are measured. A
+                        caching wrapper is measured through the wrapper it
+                        wraps.
+        :type wrapper: :class:`.Wrapper`
+        :param interval: Services polling interval, in seconds
+        :type interval: :class:`float`
+        :param watcher: Watcher polling the services. A new one by default,
+                        closed with the exporter.
+        :type watcher: :class:`.Watcher`
+        :param stats: Command statistics. New ones by default, fed by the
+                      wrapper commands.
+        :type stats: :class:`.CommandStats`
+        """
+        if interval is not None:
+            self.INTERVAL = interval
+
+        self._own_watcher = watcher is None
+        self.watcher = watcher or Watcher(interval=self.INTERVAL)
+
+        # Observe the wrapper spawning the processes, not the cache hits
+        self.wrapper = _observable(wrapper)
+        self.stats = stats
+        self._observing = False
+        if stats is None:
+            self.stats = CommandStats()
+            if self.wrapper is not None:
+                self.wrapper.add_observer(self.stats)
+                self._observing = True
+
+        self._changes = {}
+        self._lock = threading.Lock()
+        self.subscription = self.watcher.subscribe(services, self._count)
+
+        self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count(self, event):
+        with self._lock:
+            name = event.service_name
+            self._changes[name] = self._changes.get(name, 0) + 1
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format
+
+        :return: Metrics
+        :rtype: :class:`str`
+        """
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, kind))
+
+        statuses = self.watcher.statuses()
+        names = sorted(n for n in statuses if n in self.subscription.names)
+
+        metric("nssm_service_state", "gauge",
+               "Current state of the service (1 for the current one)")
+        for name in names:
+            for state in ServiceStatus:
+                value = 1 if statuses[name] == state else 0
+                lines.append("nssm_service_state{} {}".format(
+                    _labels(service=name, state=state.value), value))
+
+        with self._lock:
+            changes = dict(self._changes)
+
+        metric("nssm_service_state_changes_total", "counter",
+               "Service state changes observed")
+        for name in names:
+            lines.append("nssm_service_state_changes_total{} {}".format(
+                _labels(service=name), changes.get(name, 0)))
+
+        stats = self.stats.dump()
+        commands = sorted(stats)
+
+        metric("nssm_command_duration_seconds", "histogram",
+               "NSSM command duration")
+        for command in commands:
+            count = 0
+            for bound, bucket in stats[command]["buckets"]:
+                count += bucket
+                lines.append("nssm_command_duration_seconds_bucket{} {}"
+                             .format(_labels(command=command,
+                                             le=_number(bound)), count))
+            labels = _labels(command=command)
+            lines.append("nssm_command_duration_seconds_sum{} {}".format(
+                labels, _number(stats[command]["duration_sum"])))
+            lines.append("nssm_command_duration_seconds_count{} {}".format(
+                labels, stats[command]["count"]))
+
+        metric("nssm_command_errors_total", "counter",
+               "Failed NSSM commands by exception")
+        for command in commands:
+            for exception, count in sorted(stats[command]["errors"].items()):
+                lines.append("nssm_command_errors_total{} {}".format(
+                    _labels(command=command, exception=exception), count))
+
+        metric("nssm_command_output_bytes_total", "counter",
+               "NSSM command console output size")
+        for command in commands:
+            lines.append("nssm_command_output_bytes_total{} {}".format(
+                _labels(command=command), stats[command]["output_bytes"]))
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Write the metrics to a file, e.g. for the node exporter textfile
+        collector. The file is replaced atomically.
+
+        :param path: File path, usually with a ``.prom`` extension
+        :type path: :class:`str`
+        """
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as stream:
+            stream.write(self.render().encode("utf-8"))
+        os.replace(tmp, path)
+
+    def serve(self, port, address=""):
+        """
+        Serve the metrics over HTTP, from a background thread
+
+        :param port: TCP port
+        :type port: :class:`int`
+        :param address: Listening address, all the interfaces by default
+        :type address: :class:`str`
+        :return: HTTP server
+        :rtype: :class:`http.server.HTTPServer`
+        """
+        # Only needed when serving, keep it out of the import time
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Don't log every scrape
+
+        self._server = HTTPServer((address, port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever,
+                                  name="nssm-metrics")
+        thread.daemon = True
+        thread.start()
+        return self._server
+
+    def close(self):
+        """
+        Stop serving and polling the services
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        self.subscription.cancel()
+        if self._own_watcher:
+            self.watcher.close()
+
+        if self._observing:
+            self.wrapper.remove_observer(self.stats)
+            self._observing = False
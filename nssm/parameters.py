@@ -2,6 +2,8 @@
  Created on May 19, 2018
  @author: Lorenzo Delgado <lorenzo.delgado@lnsd.es>
 """
+from collections import OrderedDict
+
 from .abstract.collections import AbstractEnum
 
 
@@ -59,52 +61,266 @@ class ExitAction(AbstractEnum):
     SUICIDE = "Suicide"
 
 
-PARAM_MAP = {
+def _encode_string(value):
+    return (str(value),)
+
+
+def _decode_string(values):
+    return values[0]
+
+
+def _encode_joined(value):
+    if isinstance(value, list):
+        return (" ".join(value),)
+    return (value,)
+
+
+def _decode_joined(values):
+    return " ".join(values)
+
+
+def _encode_multi(value):
+    if isinstance(value, list):
+        return tuple(value)
+    return (value,)
+
+
+def _decode_multi(values):
+    return list(values) if len(values) > 1 else values[0]
+
+
+def _encode_bool(value):
+    return ("1" if value else "0",)
+
+
+def _decode_bool(values):
+    return values[0] not in ("", "0")
+
+
+def _decode_int(values):
+    return int(values[0])
+
+
+def _decode_affinity(values):
+    return values[0] if values[0] == "All" else int(values[0])
+
+
+def _encode_account(value):
+    if isinstance(value, dict):
+        return value["username"], value["password"]
+    return (value,)
+
+
+def _encode_env(value):
+    if isinstance(value, dict):
+        return tuple(k + "=" + v for k, v in value.items())
+    return (value,)
+
+
+def _decode_env(values):
+    return dict(v.split("=", 1) for v in values if "=" in v)
+
+
+def _enum_codec(enum):
+    """
+    Build the encoder and decoder of an enumeration parameter
+
+    :param enum: Enumeration class
+    :type enum: :class:`.AbstractEnum`
+    :return: Encoder and decoder functions
+    :rtype: :class:`tuple`
+    """
+    index = enum.get_index()
+
+    def encode(value):
+        try:
+            return (index[value].value,)
+        except (KeyError, TypeError):
+            return (enum.coerce(value).value,)  # Raises the error
+
+    def decode(values):
+        return enum.coerce(values[0])
+
+    return encode, decode
+
+
+class Parameter(object):
+    """
+    Service configuration parameter
+
+    Binds a configuration parameter to its `nssm` parameter, with the
+    functions encoding the configuration value as `nssm` values and
+    decoding them back.
+    """
+
+    __slots__ = ("name", "nssm_name", "key", "keys", "_encode", "_decode")
+
+    def __init__(self, name, nssm_name, encode=_encode_string,
+                 decode=_decode_string):
+        """
+        :param name: Configuration parameter name
+        :type name: :class:`str`
+        :param nssm_name: `nssm` parameter name
+        :type nssm_name: :class:`str`
+        :param encode: Value to `nssm` values function
+        :param decode: `nssm` values to value function
+        """
+        self.name = name
+        self.nssm_name = nssm_name
+        self.key = (nssm_name,)
+
+        # Parameter keys to read with `nssm get`
+        self.keys = (self.key,)
+
+        self._encode = encode
+        self._decode = decode
+
+    def __repr__(self):
+        return "<Parameter {} ({})>".format(self.name, self.nssm_name)
+
+    def encode(self, value):
+        """
+        Encode a configuration value as `nssm` values
+
+        :param value: Configuration value
+        :return: Pairs of parameter key (name and sub-parameter) and values
+        :rtype: :class:`list` [ :class:`tuple` ]
+        """
+        return [(self.key, self._encode(value))]
+
+    def decode(self, entries):
+        """
+        Decode the `nssm` values of the parameter
+
+        :param entries: Values indexed by sub-parameter (an empty tuple for
+                        parameters without sub-parameters)
+        :type entries: :class:`dict`
+        :return: Configuration value
+        :raises ValueError: If the value is unset or can not be represented
+        """
+        values = entries.get(())
+        if not values:
+            raise ValueError("Unset parameter: " + self.nssm_name)
+        return self._decode(values)
+
+
+class KeyedParameter(Parameter):
+    """
+    Service configuration parameter with a value per sub-parameter (e.g.
+    the exit actions per exit code)
+    """
+
+    __slots__ = ("default",)
+
+    def __init__(self, name, nssm_name, default, encode=_encode_string,
+                 decode=_decode_string):
+        """
+        :param default: Required sub-parameter
+        :type default: :class:`str`
+        """
+        super(KeyedParameter, self).__init__(name, nssm_name, encode, decode)
+        self.default = default
+        self.keys = ((nssm_name, default),)
+
+    def encode(self, value):
+        return [((self.nssm_name, str(k)), self._encode(v))
+                for k, v in value.items()]
+
+    def decode(self, entries):
+        value = dict((sub[0], self._decode(values))
+                     for sub, values in entries.items() if sub and values)
+        if self.default not in value:
+            raise ValueError("Unset parameter: " + self.nssm_name)
+        return value
+
+
+_encode_startup, _decode_startup = _enum_codec(StartupType)
+_encode_priority, _decode_priority = _enum_codec(PriorityLevel)
+_encode_type, _decode_type = _enum_codec(ServiceType)
+_encode_exit, _decode_exit = _enum_codec(ExitAction)
+
+PARAMETERS = OrderedDict((p.name, p) for p in [
     # Application
-    "path": "Application",
-    "startup_dir": "AppDirectory",
-    "arguments": "AppParameters",
+    Parameter("path", "Application"),
+    Parameter("startup_dir", "AppDirectory"),
+    Parameter("arguments", "AppParameters", _encode_joined, _decode_joined),
 
     # Details
-    "display_name": "DisplayName",
-    "description": "Description",
-    "startup": "Start",
+    Parameter("display_name", "DisplayName"),
+    Parameter("description", "Description"),
+    Parameter("startup", "Start", _encode_startup, _decode_startup),
 
     # Log on
-    "user_account": "ObjectName",
-    "type": "Type",
+    Parameter("user_account", "ObjectName", _encode_account),
+    Parameter("type", "Type", _encode_type, _decode_type),
 
     # Dependencies
-    "dependencies": "DependsOnService",
+    Parameter("dependencies", "DependsOnService", _encode_multi,
+              _decode_multi),
 
     # Process
-    "process_priority": "AppPriority",
-    "console_window": "AppNoConsole",
-    "cpu_affinity": "AppAffinity",
+    Parameter("process_priority", "AppPriority", _encode_priority,
+              _decode_priority),
+    Parameter("console_window", "AppNoConsole", _encode_bool, _decode_bool),
+    Parameter("cpu_affinity", "AppAffinity", _encode_string,
+              _decode_affinity),
 
     # Shutdown
-    "terminate_process": "AppStopMethodSkip",
-    "stop_console": "AppStopMethodConsole",
-    "stop_window": "AppStopMethodWindow",
-    "stop_threads": "AppStopMethodThreads",
+    Parameter("terminate_process", "AppStopMethodSkip", _encode_bool,
+              _decode_bool),
+    Parameter("stop_console", "AppStopMethodConsole", _encode_string,
+              _decode_int),
+    Parameter("stop_window", "AppStopMethodWindow", _encode_string,
+              _decode_int),
+    Parameter("stop_threads", "AppStopMethodThreads", _encode_string,
+              _decode_int),
 
     # Exit action
-    "restart_throttling": "AppThrottle",
-    "restart_delay": "AppRestartDelay",
-    "action_on_exit": "AppExit",
+    Parameter("restart_throttling", "AppThrottle", _encode_string,
+              _decode_int),
+    Parameter("restart_delay", "AppRestartDelay", _encode_string,
+              _decode_int),
+    KeyedParameter("action_on_exit", "AppExit", "Default", _encode_exit,
+                   _decode_exit),
 
     # I/O
-    "stdout": "AppStdout",
-    "stderr": "AppStderr",
+    Parameter("stdout", "AppStdout"),
+    Parameter("stderr", "AppStderr"),
 
     # File rotation
-    "rotate_files": "AppRotateFiles",
-    "rotate_online": "AppRotateOnline",
-    "stdout_creation_disposition": "AppStdoutCreationDisposition",
-    "stderr_creation_disposition": "AppStderrCreationDisposition",
-    "rotation_time": "AppRotateSeconds",
-    "rotation_size": "AppRotateBytes",
+    Parameter("rotate_files", "AppRotateFiles", _encode_bool, _decode_bool),
+    Parameter("rotate_online", "AppRotateOnline", _encode_bool,
+              _decode_bool),
+    Parameter("stdout_creation_disposition", "AppStdoutCreationDisposition",
+              _encode_string, _decode_int),
+    Parameter("stderr_creation_disposition", "AppStderrCreationDisposition",
+              _encode_string, _decode_int),
+    Parameter("rotation_time", "AppRotateSeconds", _encode_string,
+              _decode_int),
+    Parameter("rotation_size", "AppRotateBytes", _encode_string,
+              _decode_int),
 
     # Environment
-    "env": "AppEnvironmentExtra"
-}
+    Parameter("env", "AppEnvironmentExtra", _encode_env, _decode_env),
+])
+
+# Parameters indexed by `nssm` parameter name
+NSSM_PARAMETERS = dict((p.nssm_name, p) for p in PARAMETERS.values())
+
+# Configuration to `nssm` parameter names
+PARAM_MAP = dict((p.name, p.nssm_name) for p in PARAMETERS.values())
+
+
+def split_key(args):
+    """
+    Split the `nssm` parameter key (name and sub-parameter, if any) from the
+    values in the ``get``/``set``/``reset`` command arguments
+
+    :param args: Command arguments following the service name
+    :type args: :class:`tuple` [ :class:`str` ]
+    :return: Parameter key and values
+    :rtype: :class:`tuple` [ :class:`tuple`, :class:`tuple` ]
+    """
+    parameter = NSSM_PARAMETERS.get(args[0]) if args else None
+    size = len(parameter.keys[0]) if parameter is not None else 1
+    return tuple(args[:size]), tuple(args[size:])
@@ -0,0 +1,492 @@
+"""
+ Declarative fleet reconciliation
+
+ A manifest describes the desired state of a set of services. The
+ reconciler reads the current state of those services, computes the
+ minimal plan of `nssm` commands that brings them to the desired state, and
+ executes it.
+
+ Manifest format (JSON, or YAML if PyYAML is installed)::
+
+    {
+        "defaults": {"startup": "AUTOMATIC", "rotate_files": true},
+        "services": [
+            {"name": "web", "path": "C:\\\\web.exe", "state": "running",
+             "arguments": "--port 80"},
+            {"name": "legacy", "state": "absent"}
+        ]
+    }
+
+ Every service entry holds its name, executable path, desired state (see
+ `STATES`) and :class:`.ServiceConfiguration` parameters, which override the
+ manifest `defaults`. Unknown keys are rejected.
+"""
+from __future__ import print_function
+
+import sys
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .configuration import ServiceConfiguration
+from .deadline import bind
+from .exceptions import ServiceDoesntExistException
+from .group import GroupResult
+from .parameters import PARAMETERS
+from .service import Service, ServiceStatus, _configuration_record, \
+                     _keyed_parameters, _configuration_commands
+from .wrapper import DEFAULT_WRAPPER
+
+# Desired service states
+PRESENT = "present"  # Installed and configured, whatever its status
+RUNNING = "running"
+STOPPED = "stopped"
+ABSENT = "absent"
+
+STATES = (PRESENT, RUNNING, STOPPED, ABSENT)
+
+
+class ManifestEntry(object):
+    """
+    Desired state of a manifest service
+    """
+
+    def __init__(self, name, path=None, state=PRESENT, configuration=None):
+        """
+        :param name: Service name
+        :type name: :class:`str`
+        :param path: Executable path. Required unless the service is absent.
+        :type path: :class:`str`
+        :param state: Desired state (see `STATES`)
+        :type state: :class:`str`
+        :param configuration: Desired service configuration
+        :type configuration: :class:`.ServiceConfiguration`
+        """
+        if state not in STATES:
+            msg = "Invalid state for service {}: {!r} (expected one of {})"
+            raise ValueError(msg.format(name, state, ", ".join(STATES)))
+
+        if not path and state != ABSENT:
+            msg = "Missing executable path for service {}"
+            raise ValueError(msg.format(name))
+
+        self.name = name
+        self.path = path
+        self.state = state
+        self.configuration = configuration or ServiceConfiguration()
+
+    def __repr__(self):
+        return "<ManifestEntry {} ({})>".format(self.name, self.state)
+
+
+def parse_manifest(manifest):
+    """
+    Build the manifest entries of a manifest document
+
+    :param manifest: Manifest document
+    :type manifest: :class:`dict`
+    :return: Manifest entries
+    :rtype: :class:`list` [ :class:`.ManifestEntry` ]
+    :raises ValueError: If the manifest is not valid
+    """
+    _check_keys(manifest, ("defaults", "services"), "manifest")
+    defaults = manifest.get("defaults", {})
+    _check_keys(defaults, PARAMETERS, "defaults")
+    defaults = ServiceConfiguration(**defaults)
+
+    entries = []
+    names = set()
+    for service in manifest.get("services", []):
+        service = dict(service)
+        name = service.pop("name", None)
+        if not name:
+            raise ValueError("Missing service name: {!r}".format(service))
+        if name in names:
+            raise ValueError("Duplicated service: {}".format(name))
+        names.add(name)
+
+        path = service.pop("path", None)
+        state = service.pop("state", PRESENT)
+        _check_keys(service, PARAMETERS, "service " + name)
+        entries.append(ManifestEntry(name, path, state,
+                                     defaults.derive(**service)))
+
+    return entries
+
+
+def _check_keys(document, known, where):
+    """
+    :raises ValueError: If the document has unknown keys (e.g. misspelled
+                        parameters, which would be silently ignored)
+    """
+    unknown = sorted(set(document) - set(known))
+    if unknown:
+        msg = "Unknown keys in {}: {}"
+        raise ValueError(msg.format(where, ", ".join(map(str, unknown))))
+
+
+def load_manifest(path):
+    """
+    Load a JSON or YAML (`.yml`/`.yaml` files) manifest
+
+    :param path: Manifest file path
+    :type path: :class:`str`
+    :return: Manifest entries
+    :rtype: :class:`list` [ :class:`.ManifestEntry` ]
+    """
+    with open(path) as f:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                msg = "PyYAML is required to load YAML manifests: {}"
+                raise ImportError(msg.format(path))
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    return parse_manifest(manifest or {})
+
+
+class Plan(object):
+    """
+    Commands needed to reconcile a fleet, per service
+    """
+
+    def __init__(self):
+        # Command arguments (without the service name) indexed by service name
+        self.steps = OrderedDict()
+
+        # Services whose state could not be discovered, indexed by name
+        self.errors = {}
+
+        # Encoded configuration and content hash to record once each service
+        # is reconciled, indexed by service name. `None` for absent services.
+        self.records = OrderedDict()
+
+    def __len__(self):
+        return sum(len(commands) for commands in self.steps.values())
+
+    def __iter__(self):
+        for name, commands in self.steps.items():
+            for command in commands:
+                yield (command[0], name) + tuple(command[1:])
+
+    def __str__(self):
+        return "\n".join(self.lines())
+
+    def __repr__(self):
+        msg = "<Plan services={} commands={}>"
+        return msg.format(len(self.steps), len(self))
+
+    def add(self, name, commands):
+        """
+        Add a service's commands to the plan
+
+        :param name: Service name
+        :type name: :class:`str`
+        :param commands: Commands arguments, without the service name
+        :type commands: :class:`list` [ :class:`tuple` ]
+        """
+        if commands:
+            self.steps[name] = list(commands)
+
+    def lines(self):
+        """
+        Human readable plan, one `nssm` command line per command. The
+        service account passwords are masked.
+
+        :return: Command lines
+        :rtype: :class:`list` [ :class:`str` ]
+        """
+        return ["nssm " + " ".join(_quote(arg) for arg in _mask(command))
+                for command in self]
+
+
+# Service account parameter, whose password is never printed
+_ACCOUNT_PARAMETER = PARAMETERS["user_account"].nssm_name
+_MASK = "********"
+
+
+def _mask(command):
+    """
+    :param command: Command arguments, with the service name
+    :type command: :class:`tuple`
+    :return: Command arguments, with the service account password masked
+    :rtype: :class:`tuple`
+    """
+    if command[0] == "set" and len(command) > 4 and \
+            command[2] == _ACCOUNT_PARAMETER:
+        return command[:4] + (_MASK,) * len(command[4:])
+    return command
+
+
+def _quote(arg):
+    arg = str(arg)
+    if not arg or any(c in arg for c in ' \t"'):
+        return '"' + arg.replace('"', '\\"') + '"'
+    return arg
+
+
+class Reconciler(object):
+    """
+    Desired state reconciler for a fleet of services
+
+    Discovery, which reads every service configuration with a single `nssm
+    dump` (plus a `nssm status` only when the desired state depends on it),
+    and plan execution run concurrently over the services, with at most
+    `MAX_WORKERS` `nssm` processes at the same time. The commands of a
+    service always run in order.
+
+    With a state store, the configuration of the services whose desired
+    configuration is the last-applied one is not read: a no-op reconcile of
+    services in the `present` state runs no `nssm` command at all.
+    """
+
+    MAX_WORKERS = 8
+
+    def __init__(self, entries, wrapper=None, max_workers=None,
+                 state_store=None, verify=False):
+        """
+        :param entries: Manifest entries
+        :type entries: :class:`list` [ :class:`.ManifestEntry` ]
+        :param wrapper: NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        :param max_workers: Maximum number of concurrent services
+        :type max_workers: :class:`int`
+        :param state_store: Last-applied configuration store
+        :type state_store: :class:`.StateStore`
+        :param verify: Read the live configuration of all the services, even
+                       if known to be applied
+        :type verify: :class:`bool`
+        """
+        self.entries = list(entries)
+        self.wrapper = wrapper or DEFAULT_WRAPPER
+        self.state_store = state_store
+        self.verify = verify
+
+        if max_workers:
+            self.MAX_WORKERS = max_workers
+
+    def plan(self):
+        """
+        Discover the current state of the services and compute the commands
+        needed to reach the desired one
+
+        :return: Reconciliation plan
+        :rtype: :class:`.Plan`
+        """
+        plan = Plan()
+        for entry, result in zip(self.entries,
+                                 self._map(self._entry_plan, self.entries)):
+            if isinstance(result, Exception):
+                plan.errors[entry.name] = result
+            else:
+                plan.add(entry.name, result[0])
+                plan.records[entry.name] = result[1]
+        return plan
+
+    def apply(self, plan=None):
+        """
+        Execute a reconciliation plan
+
+        A failing command aborts the remaining commands of its service only.
+
+        :param plan: Reconciliation plan. Computed if not provided.
+        :type plan: :class:`.Plan`
+        :return: Number of executed commands per service, and the discovery
+                 or execution exceptions
+        :rtype: :class:`.GroupResult`
+        """
+        if plan is None:
+            plan = self.plan()
+
+        result = GroupResult()
+        result.errors.update(plan.errors)
+
+        steps = list(plan.steps.items())
+        for (name, _), outcome in zip(steps, self._map(self._run, steps)):
+            if isinstance(outcome, Exception):
+                result.errors[name] = outcome
+            else:
+                result.results[name] = outcome
+
+        # Services already in their desired state
+        for name in plan.records:
+            if name not in plan.steps:
+                result.results[name] = 0
+
+        if self.state_store is not None:
+            for name, record in plan.records.items():
+                if name in result.errors:
+                    self.state_store.delete(name)
+                elif record is None:
+                    self.state_store.delete(name)
+                else:
+                    self.state_store.put(name, *record)
+
+        return result
+
+    def _map(self, func, items):
+        """
+        Run a function over the items on a bounded thread pool. Exceptions
+        are returned instead of raised.
+        """
+        def call(item):
+            try:
+                return func(item)
+            except Exception as err:
+                return err
+
+        if not items:
+            return []
+
+        workers = min(self.MAX_WORKERS, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(bind(call), items))
+
+    def _run(self, step):
+        name, commands = step
+        for command in commands:
+            self.wrapper.command(command[0], name, *command[1:])
+        return len(commands)
+
+    def _entry_plan(self, entry):
+        """
+        :return: Commands that bring a service to its desired state, and its
+                 encoded configuration and content hash (`None` if absent)
+        :rtype: :class:`tuple` [ :class:`list`, :class:`tuple` ]
+        """
+        service = Service(entry.name, entry.path, wrapper=self.wrapper)
+
+        if entry.state == ABSENT:
+            return self._absent_plan(service), None
+
+        config = entry.configuration.derive(path=entry.path)
+        store = self.state_store
+        record = _configuration_record(config, entry.path, store)
+        desired = record[0]
+        if store is not None and not self.verify and \
+                store.is_applied(entry.name, record[1]):
+            if entry.state == PRESENT:
+                return [], record
+            try:
+                return self._state_plan(entry, service.status()), record
+            except ServiceDoesntExistException:
+                pass  # Removed by other means
+
+        try:
+            current = service._current_values(desired.keys())
+        except ServiceDoesntExistException:
+            current = None
+
+        commands = []
+        status = ServiceStatus.STOPPED
+        if current is None:
+            commands.append(("install", entry.path))
+            current = {PARAMETERS["path"].key: (entry.path,)}
+        elif entry.state in (RUNNING, STOPPED):
+            status = service.status()
+
+        configure, _ = _configuration_commands(
+            desired, current, _keyed_parameters(config),
+            password=self._password_changed(entry.name, record[1])
+        )
+        commands.extend(configure)
+        commands.extend(self._state_plan(entry, status))
+
+        return commands, record
+
+    def _password_changed(self, name, digest):
+        """
+        :return: Whether the service account password may differ from the
+                 live one, which `nssm` never reads back. Only known through
+                 the state store.
+        :rtype: :class:`bool`
+        """
+        if self.state_store is None:
+            return False
+        last = self.state_store.get(name)
+        return last is None or last.digest != digest
+
+    @staticmethod
+    def _absent_plan(service):
+        try:
+            status = service.status()
+        except ServiceDoesntExistException:
+            return []
+
+        commands = []
+        if status not in (ServiceStatus.STOPPED, ServiceStatus.STOP_PENDING):
+            commands.append(("stop",))
+        commands.append(("remove", "confirm"))
+        return commands
+
+    @staticmethod
+    def _state_plan(entry, status):
+        if entry.state == RUNNING:
+            if status == ServiceStatus.PAUSED:
+                return [("continue",)]
+            elif status in (ServiceStatus.STOPPED, ServiceStatus.STOP_PENDING):
+                return [("start",)]
+        elif entry.state == STOPPED and status not in (
+                ServiceStatus.STOPPED, ServiceStatus.STOP_PENDING):
+            return [("stop",)]
+        return []
+
+
+def main(argv=None):
+    """
+    Reconcile the services of a manifest file
+
+    :param argv: Command line arguments
+    :type argv: :class:`list` [ :class:`str` ]
+    :return: Exit code
+    :rtype: :class:`int`
+    """
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog="python -m nssm.reconcile")
+    parser.add_argument("manifest", help="JSON or YAML manifest file")
+    parser.add_argument("-n", "--dry-run", action="store_true",
+                        help="Print the plan without executing it")
+    parser.add_argument("-s", "--state", default=None,
+                        help="Last-applied configuration store (SQLite "
+                             "database file)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Read the live configuration of all the "
+                             "services, even if known to be applied")
+    parser.add_argument("-j", "--jobs", type=int,
+                        default=Reconciler.MAX_WORKERS,
+                        help="Maximum number of concurrent services "
+                             "(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = None
+    if args.state:
+        from .state import StateStore
+        store = StateStore(args.state)
+
+    reconciler = Reconciler(load_manifest(args.manifest),
+                            max_workers=args.jobs, state_store=store,
+                            verify=args.verify)
+    plan = reconciler.plan()
+
+    if args.dry_run:
+        for line in plan.lines():
+            print(line)
+        for name, err in sorted(plan.errors.items()):
+            print("ERROR: {}: {}".format(name, err), file=sys.stderr)
+        print("{} commands for {} services".format(len(plan), len(plan.steps)))
+        return 1 if plan.errors else 0
+
+    result = reconciler.apply(plan)
+    for name, err in sorted(result.errors.items()):
+        print("ERROR: {}: {}".format(name, err), file=sys.stderr)
+    print("{} commands executed for {} services".format(
+        sum(result.results.values()), len(result.results)))
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+ Rolling restart of a service group
+"""
+import math
+
+from .deadline import Deadline, _clock
+from .exceptions import ServiceUnhealthyException
+from .group import ServiceGroup
+
+
+class WaveResult(object):
+    """
+    Outcome of a rolling restart wave
+    """
+
+    def __init__(self, index, services, result, seconds):
+        """
+        :param index: Wave number, starting at 0
+        :type index: :class:`int`
+        :param services: Names of the wave services
+        :type services: :class:`list` [ :class:`str` ]
+        :param result: Reached status or exception per service
+        :type result: :class:`.GroupResult`
+        :param seconds: Wave wall time, restart and wait included
+        :type seconds: :class:`float`
+        """
+        self.index = index
+        self.services = services
+        self.result = result
+        self.seconds = seconds
+
+    def __repr__(self):
+        msg = "<WaveResult #{} services={} failed={} ({:.3f}s)>"
+        return msg.format(self.index, len(self.services),
+                          len(self.result.errors), self.seconds)
+
+
+class RollingRestart(object):
+    """
+    Restart a group of services in waves
+
+    Each wave restarts up to `WAVE_SIZE` services concurrently and waits for
+    them to be running (and healthy, if a health check is given) before the
+    next wave starts. Once the number of failed services crosses
+    `MAX_FAILURES`, the rollout pauses: :meth:`run` returns, and calling it
+    again resumes with the next wave (counting failures from zero). Not
+    calling it again aborts it.
+
+        >>> rollout = RollingRestart(group, wave_size=0.25)  # doctest: +SKIP
+        >>> rollout.run()  # doctest: +SKIP
+        >>> rollout.waves  # doctest: +SKIP
+    """
+
+    # Services per wave: a number, or a fraction of the group size
+    WAVE_SIZE = 1
+
+    # Failed services tolerated: a number, or a fraction of the group size
+    MAX_FAILURES = 0
+
+    def __init__(self, group, wave_size=None, max_failures=None,
+                 timeout=None, health_check=None):
+        """
+        :param group: Services to restart
+        :type group: :class:`.ServiceGroup`
+        :param wave_size: Services per wave, a number or a fraction (0-1) of
+                          the group size
+        :type wave_size: :class:`int` or :class:`float`
+        :param max_failures: Failed services tolerated before pausing, a
+                             number or a fraction (0-1) of the group size
+        :type max_failures: :class:`int` or :class:`float`
+        :param timeout: Time for each wave to be running, in seconds (the
+                        group `WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        :param health_check: Called with each running service, returns
+                             whether it is healthy. Each check runs within
+                             a deadline of `timeout` seconds, and a timed
+                             out check is unhealthy.
+        :type health_check: :class:`callable`
+        """
+        self.group = group
+
+        if wave_size is not None:
+            self.WAVE_SIZE = wave_size
+
+        if max_failures is not None:
+            self.MAX_FAILURES = max_failures
+
+        self.timeout = timeout
+        self.health_check = health_check
+
+        # Completed waves
+        self.waves = []
+
+        # Services not restarted yet
+        self.remaining = list(group.services)
+
+        # Whether the failure threshold was crossed
+        self.paused = False
+
+    @property
+    def wave_size(self):
+        """
+        :return: Number of services per wave
+        :rtype: :class:`int`
+        """
+        return max(1, self._count(self.WAVE_SIZE))
+
+    @property
+    def max_failures(self):
+        """
+        :return: Number of failed services tolerated
+        :rtype: :class:`int`
+        """
+        return self._count(self.MAX_FAILURES)
+
+    @property
+    def failures(self):
+        """
+        :return: Exceptions of the failed services, indexed by service name
+        :rtype: :class:`dict`
+        """
+        failures = {}
+        for wave in self.waves:
+            failures.update(wave.result.errors)
+        return failures
+
+    @property
+    def done(self):
+        """
+        :return: Whether all the services were restarted
+        :rtype: :class:`bool`
+        """
+        return not self.remaining
+
+    def _count(self, value):
+        if isinstance(value, float) and 0 < value <= 1:
+            return int(math.ceil(value * len(self.group)))
+        return int(value)
+
+    def run(self):
+        """
+        Run the remaining waves, until all the services are restarted or the
+        failure threshold is crossed
+
+        :return: Whether all the services were restarted
+        :rtype: :class:`bool`
+        """
+        self.paused = False
+
+        failures = 0
+        while self.remaining:
+            wave = self.remaining[:self.wave_size]
+            self.remaining = self.remaining[len(wave):]
+            self.waves.append(self._run_wave(wave))
+
+            failures += len(self.waves[-1].result.errors)
+            if failures > self.max_failures:
+                self.paused = True
+                return False
+
+        return True
+
+    def _run_wave(self, services):
+        start = _clock()
+
+        group = ServiceGroup(services, self.group.MAX_WORKERS)
+        for name in ("POLL_INTERVAL", "POLL_MAX_INTERVAL", "POLL_BACKOFF",
+                     "WAIT_TIMEOUT"):
+            setattr(group, name, getattr(self.group, name))
+
+        result = group.restart(wait=True, timeout=self.timeout)
+
+        if self.health_check is not None:
+            for service in services:
+                name = service.SERVICE_NAME
+                if name not in result.results:
+                    continue
+                healthy, output = self._check_health(service)
+                if not healthy:
+                    del result.results[name]
+                    result.errors[name] = ServiceUnhealthyException(
+                        name, output=output)
+
+        return WaveResult(len(self.waves),
+                          [s.SERVICE_NAME for s in services],
+                          result, _clock() - start)
+
+    def _check_health(self, service):
+        """
+        :return: Whether the service is healthy, and the health check
+                 failure message (if any)
+        :rtype: :class:`tuple` [ :class:`bool`, :class:`str` ]
+        """
+        timeout = self.timeout or self.group.WAIT_TIMEOUT
+        try:
+            with Deadline(timeout):
+                return bool(self.health_check(service)), None
+        except Exception as err:
+            return False, str(err)
@@ -2,33 +2,460 @@
  Created on May 19, 2018
  @author: Lorenzo Delgado <lorenzo.delgado@lnsd.es>
 """
+import weakref
+
 from .abstract.collections import AbstractEnum
 
-from .wrapper import Wrapper
-from .parameters import PARAM_MAP
+from .wrapper import DEFAULT_WRAPPER
+from .deadline import Deadline, bind
+from .parameters import PARAMETERS, NSSM_PARAMETERS, KeyedParameter, \
+                        split_key
 from .configuration import ServiceConfiguration
+from .exceptions import NssmException, ServiceConfigurationException, \
+                        ServiceDoesntExistException, \
+                        ServiceTimeoutException, CommandTimeoutException, \
+                        CommandCancelledException, _unsupported_command
+
+
+# Keys of all the configuration parameters, as read with `nssm get`
+_PARAMETER_KEYS = [key for p in PARAMETERS.values() for key in p.keys]
+
+# Wrappers whose `nssm` version doesn't support `nssm dump`, shared by all
+# the services using them
+_DUMPLESS_WRAPPERS = weakref.WeakSet()
 
 
 class ServiceStatus(AbstractEnum):
     STOPPED = "SERVICE_STOPPED"
+    START_PENDING = "SERVICE_START_PENDING"
+    STOP_PENDING = "SERVICE_STOP_PENDING"
     RUNNING = "SERVICE_RUNNING"
+    CONTINUE_PENDING = "SERVICE_CONTINUE_PENDING"
+    PAUSE_PENDING = "SERVICE_PAUSE_PENDING"
     PAUSED = "SERVICE_PAUSED"
 
+    @property
+    def pending(self):
+        """
+        :return: Whether the service is changing its state
+        :rtype: :class:`bool`
+        """
+        return self.name.endswith("_PENDING")
+
+
+def _status_set(state):
+    """
+    :param state: Service status, or a list of them
+    :type state: :class:`.ServiceStatus` or :class:`str` or :class:`list`
+    :return: Service status set
+    :rtype: :class:`frozenset` [ :class:`.ServiceStatus` ]
+    """
+    if isinstance(state, (list, tuple, set, frozenset)):
+        return frozenset(ServiceStatus.coerce(s) for s in state)
+    return frozenset((ServiceStatus.coerce(state),))
+
+
+class _Backoff(object):
+    """
+    Polling interval that grows geometrically while nothing changes
+    """
+
+    def __init__(self, initial, maximum, factor):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = initial
+
+    def next(self):
+        """
+        :return: Seconds to wait before the next poll
+        :rtype: :class:`float`
+        """
+        interval = self.interval
+        self.interval = min(self.interval * self.factor, self.maximum)
+        return interval
+
+    def reset(self):
+        """
+        Poll fast again, after a change
+        """
+        self.interval = self.initial
+
+
+def _timeout_message(targets, status):
+    """
+    :param targets: Expected service statuses
+    :type targets: :class:`frozenset` [ :class:`.ServiceStatus` ]
+    :param status: Last polled service status, if any
+    :type status: :class:`.ServiceStatus`
+    :return: Message of a state wait timeout
+    :rtype: :class:`str`
+    """
+    return "Timed out waiting for {} (status: {})".format(
+        "/".join(sorted(s.value for s in targets)),
+        status.value if status else "unknown")
+
+
+class _StatusPolling(object):
+    """
+    Status polling while waiting for a state, shared by the services and
+    the service groups
+    """
+
+    # First interval, maximum interval and growth factor (in seconds), and
+    # default timeout
+    POLL_INTERVAL = 0.05
+    POLL_MAX_INTERVAL = 1.0
+    POLL_BACKOFF = 1.5
+    WAIT_TIMEOUT = 60.0
+
+    def _backoff(self):
+        """
+        :return: Polling interval, from `POLL_INTERVAL` up to
+                 `POLL_MAX_INTERVAL`
+        :rtype: :class:`._Backoff`
+        """
+        return _Backoff(self.POLL_INTERVAL, self.POLL_MAX_INTERVAL,
+                        self.POLL_BACKOFF)
+
+    def _poll(self, poll, timeout=None, name=None):
+        """
+        Poll in rounds until done or timed out. The interval between rounds
+        grows while nothing changes.
+
+        :param poll: Polling round, called with the wait deadline. Returns
+                     whether the wait is done, and whether any status
+                     changed.
+        :type poll: :class:`callable`
+        :param timeout: Timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        :param name: Service name of the cancellation exception
+        :type name: :class:`str`
+        :return: Whether the wait is done, `False` if it timed out
+        :rtype: :class:`bool`
+        :raises CommandCancelledException: If the current deadline is
+                                           cancelled
+        """
+        if timeout is None:
+            timeout = self.WAIT_TIMEOUT
+
+        backoff = self._backoff()
+        with Deadline(timeout) as deadline:
+            while True:
+                done, changed = poll(deadline)
+                if done:
+                    return True
+
+                remaining = deadline.remaining()
+                if not remaining:
+                    return False
+
+                if changed:
+                    backoff.reset()
+                if not deadline.sleep(min(backoff.next(), remaining)):
+                    raise CommandCancelledException(name)
+
+
+def _encode_configuration(config):
+    """
+    Encode a service configuration as `nssm` ``set`` command arguments
+
+    :param config: Service configuration
+    :type config: :class:`.ServiceConfiguration`
+    :return: Parameter values indexed by parameter key
+    :rtype: :class:`dict`
+    """
+    encoded = {}
+    for param, value in config.items():
+        encoded.update(PARAMETERS[param].encode(value))
+    return encoded
+
+
+def _configuration_record(config, path, store=None):
+    """
+    Encode a service configuration as recorded in a state store
+
+    The record includes the executable path (the one of the configuration,
+    or else the installed one), so that installing or reconciling a service
+    and configuring it later agree on its content hash.
+
+    :param config: Service configuration
+    :type config: :class:`.ServiceConfiguration`
+    :param path: Executable path the service is installed with
+    :type path: :class:`str`
+    :param store: State store keying the content hash
+    :type store: :class:`.StateStore`
+    :return: Parameter values indexed by parameter key, and their content
+             hash (`None` without a store)
+    :rtype: :class:`tuple` [ :class:`dict`, :class:`str` ]
+    """
+    values = _encode_configuration(config)
+    if path is not None:
+        values.setdefault(PARAMETERS["path"].key, (path,))
+    return values, store.digest(values) if store is not None else None
+
+
+def _decode_configuration(values):
+    """
+    Decode the `nssm` parameter values as a service configuration
+
+    :param values: Parameter values indexed by parameter key
+    :type values: :class:`dict`
+    :return: Service configuration
+    :rtype: :class:`.ServiceConfiguration`
+    """
+    entries = {}
+    for key, value in values.items():
+        parameter = NSSM_PARAMETERS.get(key[0])
+        if parameter is not None:
+            entries.setdefault(parameter, {})[key[1:]] = value
+
+    config = {}
+    for parameter, parameter_entries in entries.items():
+        try:
+            config[parameter.name] = parameter.decode(parameter_entries)
+        except ValueError:
+            pass  # Unset or not representable as a configuration value
+
+    return ServiceConfiguration(**config)
+
+
+def _keyed_parameters(config):
+    """
+    :return: `nssm` names of the configuration parameters with a value per
+             sub-parameter
+    :rtype: :class:`list` [ :class:`str` ]
+    """
+    return [PARAMETERS[param].nssm_name for param in config
+            if isinstance(PARAMETERS[param], KeyedParameter)]
+
+
+def _split_command_line(line):
+    """
+    Split a Windows command line into arguments, following the Microsoft C
+    runtime rules (as quoted by `nssm dump`).
+
+    :param line: Command line
+    :type line: :class:`str`
+    :return: Command line arguments
+    :rtype: :class:`list` [ :class:`str` ]
+    """
+    args = []
+    arg = []
+    in_arg = False
+    quoted = False
+    backslashes = 0
+
+    for char in line:
+        if char == "\\":
+            backslashes += 1
+            continue
+
+        if char == '"':
+            # 2n backslashes and a quote: n backslashes and a delimiter
+            # 2n+1 backslashes and a quote: n backslashes and a literal quote
+            arg.append("\\" * (backslashes // 2))
+            if backslashes % 2:
+                arg.append('"')
+            else:
+                quoted = not quoted
+            backslashes = 0
+            in_arg = True
+            continue
+
+        if backslashes:
+            arg.append("\\" * backslashes)
+            backslashes = 0
+            in_arg = True
+
+        if char in " \t" and not quoted:
+            if in_arg:
+                args.append("".join(arg))
+                arg = []
+                in_arg = False
+            continue
+
+        arg.append(char)
+        in_arg = True
+
+    if backslashes:
+        arg.append("\\" * backslashes)
+        in_arg = True
+
+    if in_arg:
+        args.append("".join(arg))
+
+    return args
+
+
+def _parse_dump(output):
+    """
+    Parse the `nssm dump` command output
+
+    :param output: Command output
+    :type output: :class:`str`
+    :return: Parameter values indexed by parameter key
+    :rtype: :class:`dict`
+    """
+    values = {}
+    for line in output.splitlines():
+        # <nssm.exe> <command> <service> <arguments>...
+        args = _split_command_line(line)
+        if len(args) < 4:
+            continue
+
+        command, args = args[1], args[3:]
+        if command == "install":
+            values[PARAMETERS["path"].key] = (args[0],)
+
+        elif command == "set":
+            key, value = split_key(args)
+            values[key] = value
+
+    return values
+
+
+def _match(name, patterns):
+    """
+    :param name: Service name
+    :type name: :class:`str`
+    :param patterns: Glob patterns, matched case-insensitively (as Windows
+                     service names are)
+    :type patterns: :class:`list` [ :class:`str` ]
+    :return: Whether the name matches any of the patterns
+    :rtype: :class:`bool`
+    """
+    from fnmatch import fnmatchcase
+
+    name = name.lower()
+    return any(fnmatchcase(name, pattern.lower()) for pattern in patterns)
+
+
+def _list_unsupported(error):
+    """
+    :param error: Failed `nssm list` command exception
+    :type error: :class:`.NssmException`
+    :return: Exception to raise instead
+    :rtype: :class:`.NssmException`
+    """
+    msg = "Listing the services requires NSSM 2.25 or later"
+    return NssmException(None, msg, output=error.output, rcode=error.rcode)
+
 
-class Service(object):
+def _decode_values(output):
+    """
+    Split the `nssm` ``get`` command output into parameter values
+
+    :param output: Command output
+    :type output: :class:`str`
+    :return: Parameter values
+    :rtype: :class:`tuple` [ :class:`str` ]
+    """
+    return tuple(line.strip() for line in output.splitlines() if line.strip())
+
+
+# Service account parameter key. `nssm` never reads its password back.
+_ACCOUNT_KEY = PARAMETERS["user_account"].key
+
+
+def _unchanged(key, desired, current, password=False):
+    """
+    :param key: Parameter key
+    :type key: :class:`tuple`
+    :param desired: Desired parameter values
+    :type desired: :class:`tuple`
+    :param current: Current parameter values, if known
+    :type current: :class:`tuple`
+    :param password: Whether the desired service account password may
+                     differ from the current one
+    :type password: :class:`bool`
+    :return: Whether the parameter doesn't need to be set
+    :rtype: :class:`bool`
+    """
+    if key == _ACCOUNT_KEY and current is not None:
+        # Only the username can be compared
+        if password and len(desired) > 1:
+            return False
+        return desired[:1] == current[:1]
+    return desired == current
+
+
+def _configuration_commands(desired, current, reset=(), password=False):
+    """
+    Build the `nssm` commands needed to move from the current to the desired
+    parameter values
+
+    :param desired: Desired parameter values indexed by parameter key
+    :type desired: :class:`dict`
+    :param current: Current parameter values indexed by parameter key
+    :type current: :class:`dict`
+    :param reset: `nssm` parameters whose current sub-parameters not present
+                  in the desired ones are reset (e.g. exit actions)
+    :type reset: :class:`list` [ :class:`str` ]
+    :param password: Set the service account even if its username is the
+                     current one, since its password may have changed
+    :type password: :class:`bool`
+    :return: Commands arguments and number of skipped commands
+    :rtype: :class:`tuple` [ :class:`list`, :class:`int` ]
+    """
+    commands = []
+    skipped = 0
+    for key, values in desired.items():
+        if _unchanged(key, values, current.get(key), password):
+            skipped += 1
+        elif values:
+            commands.append(("set",) + key + values)
+        else:
+            commands.append(("reset",) + key)
+
+    if reset:
+        for key in current:
+            if key[0] in reset and key not in desired:
+                commands.append(("reset",) + key)
+
+    return commands, skipped
+
+
+class Service(_StatusPolling):
     """
     NSSM Service class
     """
 
     SERVICE_NAME = None
     SERVICE_PATH = None
+    WRAPPER = DEFAULT_WRAPPER
+
+    # Whether to read the service configuration with `nssm dump`, if the
+    # wrapper's `nssm` version supports it
+    DUMP = True
+
+    # Maximum number of concurrent `nssm get` commands
+    MAX_WORKERS = 8
+
+    # Last-applied configuration store (see :class:`.StateStore`)
+    STATE_STORE = None
+
+    # Seconds after which a configuration known to be applied is verified
+    # again against the live configuration. Never by default.
+    VERIFY_INTERVAL = None
 
-    def __init__(self, name=None, path=None, **kwargs):
+    # Last status read with :meth:`status`
+    last_status = None
+
+    def __init__(self, name=None, path=None, wrapper=None, template=None,
+                 state_store=None, **kwargs):
         """
         :param name: Service name
         :type name: :class:`str`
         :param path: Executable path
         :type path: :class:`str`
+        :param wrapper: NSSM command wrapper (e.g. :class:`.CachedWrapper`)
+        :type wrapper: :class:`.Wrapper`
+        :param template: Configuration template, the keyword arguments
+                         override it
+        :type template: :class:`.ServiceConfiguration`
+        :param state_store: Last-applied configuration store
+        :type state_store: :class:`.StateStore`
         """
         if name:
             self.SERVICE_NAME = name
@@ -36,13 +463,159 @@ class Service(object):
         if path:
             self.SERVICE_PATH = path
 
-        self.configuration = ServiceConfiguration(**kwargs)
+        if wrapper:
+            self.WRAPPER = wrapper
+
+        if state_store is not None:
+            self.STATE_STORE = state_store
+
+        if template is not None:
+            self.configuration = template.derive(**kwargs)
+        else:
+            self.configuration = ServiceConfiguration(**kwargs)
+
+    @classmethod
+    def discover(cls, patterns=None, wrapper=None, prefetch=(),
+                 max_workers=None, **kwargs):
+        """
+        Discover the services managed by NSSM
+
+        The services are listed with a single `nssm list` command (NSSM 2.25
+        on), and built one at a time as the iteration goes, so a large fleet
+        is never held in memory at once:
+
+            >>> for service in Service.discover("web-*"):  # doctest: +SKIP
+            ...     print(service.SERVICE_NAME, service.status())
+
+        The service status and configuration can be read concurrently, a few
+        services ahead of the iteration. Services removed in the meantime are
+        skipped.
+
+        :param patterns: Service name glob patterns (e.g. ``"web-*"``),
+                         matched case-insensitively. All the services by
+                         default.
+        :type patterns: :class:`str` or :class:`list` [ :class:`str` ]
+        :param wrapper: NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        :param prefetch: Data to read ahead: ``"status"`` (kept in
+                         `last_status`) and/or ``"configuration"``
+        :type prefetch: :class:`str` or :class:`list` [ :class:`str` ]
+        :param max_workers: Maximum number of concurrent prefetch operations
+        :type max_workers: :class:`int`
+        :param kwargs: Service keyword arguments
+        :return: Discovered services, in `nssm list` order
+        :rtype: :class:`generator` [ :class:`.Service` ]
+        :raises NssmException: If `nssm list` is not supported (NSSM 2.24
+                               and older, like the bundled binary)
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        if isinstance(prefetch, str):
+            prefetch = [prefetch]
+
+        wrapper = wrapper or cls.WRAPPER
+        services = (cls(name, wrapper=wrapper, **kwargs)
+                    for name in cls._list(wrapper)
+                    if not patterns or _match(name, patterns))
+
+        if prefetch:
+            workers = max_workers or cls.MAX_WORKERS
+            services = cls._prefetch(services, prefetch, workers)
+
+        for service in services:
+            yield service
+
+    @staticmethod
+    def _list(wrapper):
+        """
+        :param wrapper: NSSM command wrapper
+        :type wrapper: :class:`.Wrapper`
+        :return: Names of the services managed by NSSM, decoded as the
+                 iteration goes
+        :rtype: :class:`generator` [ :class:`str` ]
+        :raises NssmException: If `nssm list` is not supported (NSSM 2.24
+                               and older, like the bundled binary)
+        """
+        try:
+            result = wrapper.command("list", None)
+        except NssmException as err:
+            if type(err) is not NssmException:
+                raise  # e.g. timed out
+            raise _list_unsupported(err) from err
+
+        names = (line.strip() for line in result.lines())
+        return (name for name in names if name)
+
+    @staticmethod
+    def _prefetch(services, prefetch, workers):
+        """
+        Read the services' data concurrently, a few services ahead of the
+        iteration
+
+        :param services: Services, built as the iteration goes
+        :type services: :class:`generator` [ :class:`.Service` ]
+        :param prefetch: Data to read ahead (see :meth:`discover`)
+        :type prefetch: :class:`list` [ :class:`str` ]
+        :param workers: Maximum number of concurrent prefetch operations
+        :type workers: :class:`int`
+        :return: Services, without the ones removed in the meantime
+        :rtype: :class:`generator` [ :class:`.Service` ]
+        """
+        # Prefetch path only, keep it out of the module import time
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+
+        fetch = bind(Service._fetch)
+
+        # Bounded read-ahead: enough to keep the workers busy
+        window = deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for service in services:
+                    window.append(executor.submit(fetch, service, prefetch))
+                    if len(window) < 2 * workers:
+                        continue
+                    service = window.popleft().result()
+                    if service is not None:
+                        yield service
+
+                while window:
+                    service = window.popleft().result()
+                    if service is not None:
+                        yield service
+
+            finally:
+                # Iteration stopped early
+                for future in window:
+                    future.cancel()
+
+    @staticmethod
+    def _fetch(service, prefetch):
+        """
+        :return: Service with its data read, `None` if removed since listed
+        :rtype: :class:`.Service`
+        """
+        try:
+            if "configuration" in prefetch:
+                service.configuration = service.fetch_configuration()
+                if "path" in service.configuration:
+                    service.SERVICE_PATH = service.configuration["path"]
+            if "status" in prefetch:
+                service.status()
+        except ServiceDoesntExistException:
+            return None
+        return service
 
     def install(self):
         """
         Install the service
         """
-        Wrapper.command("install", self.SERVICE_NAME, self.SERVICE_PATH)
+        self.WRAPPER.command("install", self.SERVICE_NAME, self.SERVICE_PATH)
+
+        # A new service has the default configuration
+        if self.STATE_STORE is not None:
+            self.STATE_STORE.delete(self.SERVICE_NAME)
 
         if self.configuration:
             self.configure(self.configuration)
@@ -51,37 +624,80 @@ class Service(object):
         """
         Remove the service
         """
-        Wrapper.command("remove", self.SERVICE_NAME, "confirm")
+        self.WRAPPER.command("remove", self.SERVICE_NAME, "confirm")
 
-    def start(self):
+        if self.STATE_STORE is not None:
+            self.STATE_STORE.delete(self.SERVICE_NAME)
+
+    def start(self, wait=False, timeout=None):
         """
         Start the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
         """
-        Wrapper.command("start", self.SERVICE_NAME)
+        self.WRAPPER.command("start", self.SERVICE_NAME)
 
-    def stop(self):
+        if wait:
+            return self.wait_for(ServiceStatus.RUNNING, timeout)
+
+    def stop(self, wait=False, timeout=None):
         """
         Stop the service
+
+        :param wait: Wait for the service to be stopped
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
         """
-        Wrapper.command("stop", self.SERVICE_NAME)
+        self.WRAPPER.command("stop", self.SERVICE_NAME)
+
+        if wait:
+            return self.wait_for(ServiceStatus.STOPPED, timeout)
 
-    def restart(self):
+    def restart(self, wait=False, timeout=None):
         """
         Restart the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
         """
-        Wrapper.command("restart", self.SERVICE_NAME)
+        self.WRAPPER.command("restart", self.SERVICE_NAME)
+
+        if wait:
+            return self.wait_for(ServiceStatus.RUNNING, timeout)
 
-    def pause(self):
+    def pause(self, wait=False, timeout=None):
         """
         Pause the service
+
+        :param wait: Wait for the service to be paused
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
         """
-        Wrapper.command("pause", self.SERVICE_NAME)
+        self.WRAPPER.command("pause", self.SERVICE_NAME)
+
+        if wait:
+            return self.wait_for(ServiceStatus.PAUSED, timeout)
 
-    def resume(self):
+    def resume(self, wait=False, timeout=None):
         """
         Resume the service
+
+        :param wait: Wait for the service to be running
+        :type wait: :class:`bool`
+        :param timeout: Wait timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
         """
-        Wrapper.command("continue", self.SERVICE_NAME)
+        self.WRAPPER.command("continue", self.SERVICE_NAME)
+
+        if wait:
+            return self.wait_for(ServiceStatus.RUNNING, timeout)
 
     def rotate(self):
         """
@@ -92,7 +708,7 @@ class Service(object):
         file rotation. Non-nssm services might respond to control 128 in
         their own way (or ignore it, or crash).
         """
-        Wrapper.command("rotate", self.SERVICE_NAME)
+        self.WRAPPER.command("rotate", self.SERVICE_NAME)
 
     def status(self):
         """
@@ -101,45 +717,252 @@ class Service(object):
         :return: Service status
         :rtype: :class:`.ServiceStatus`
         """
-        rc, out = Wrapper.command("status", self.SERVICE_NAME)
-        return ServiceStatus(out.strip())
+        rc, out = self.WRAPPER.command("status", self.SERVICE_NAME)
+        self.last_status = ServiceStatus(out.strip())
+        return self.last_status
+
+    def wait_for(self, state, timeout=None):
+        """
+        Wait for the service to reach a state
+
+        The service status is polled with an interval that starts at
+        `POLL_INTERVAL` and grows up to `POLL_MAX_INTERVAL` while the status
+        doesn't change.
+
+        :param state: Expected service status, or any of a list of them
+        :type state: :class:`.ServiceStatus` or :class:`list`
+        :param timeout: Timeout in seconds (`WAIT_TIMEOUT` by default)
+        :type timeout: :class:`float`
+        :return: Reached service status
+        :rtype: :class:`.ServiceStatus`
+        :raises ServiceTimeoutException: If the state is not reached in time
+        :raises CommandCancelledException: If the current deadline is
+                                           cancelled
+        """
+        targets = _status_set(state)
+        last = None
+
+        def poll(deadline):
+            nonlocal last
+            try:
+                status = self._poll_status()
+            except CommandCancelledException:
+                raise
+            except CommandTimeoutException:
+                if not deadline.expired():
+                    raise
+                return False, False  # The wait is over
+
+            changed, last = status != last, status
+            return status in targets, changed
+
+        if self._poll(poll, timeout, self.SERVICE_NAME):
+            return last
+        raise ServiceTimeoutException(self.SERVICE_NAME,
+                                      _timeout_message(targets, last))
+
+    def _poll_status(self):
+        """
+        Query the service's status, bypassing the wrapper cache (if any)
+
+        :return: Service status
+        :rtype: :class:`.ServiceStatus`
+        """
+        invalidate = getattr(self.WRAPPER, "invalidate", None)
+        if invalidate is not None:
+            invalidate(self.SERVICE_NAME)
+        return self.status()
 
-    def configure(self, config):
+    def configure(self, config, diff=False, current=None, verify=False):
         """
         Configure the service
 
+        In diff mode the desired configuration is compared against the
+        service's current settings and only the parameters that differ are
+        written.
+
+        With a state store, a configuration identical to the last-applied
+        one is not written again, without running any `nssm` command. In
+        verify mode (or once the `VERIFY_INTERVAL` has elapsed) it is
+        compared against the live settings instead, as in diff mode.
+
+        `nssm` never reads the service account password back. In diff mode
+        it is written along with a username change, or with a state store,
+        whenever the configuration differs from the last-applied one.
+
         :param config: Service configuration
         :type config: :class:`.ServiceConfiguration`
+        :param diff: Only set the parameters that differ from the current ones
+        :type diff: :class:`bool`
+        :param current: Known current configuration. If not provided, the
+                        current settings are read from the service.
+        :type current: :class:`.ServiceConfiguration`
+        :param verify: Check the last-applied configuration against the live
+                       settings
+        :type verify: :class:`bool`
+        :return: Number of issued and skipped commands
+        :rtype: :class:`tuple` [ :class:`int`, :class:`int` ]
         """
         msg = "Unknown configuration object: {}"
         assert isinstance(config, ServiceConfiguration), msg.format(config)
 
         # Update service configuration
-        self.configuration.update(config)
+        if config is not self.configuration:
+            self.configuration.update(config)
+
+        desired = _encode_configuration(config)
+
+        record, recorded = None, False
+        if self.STATE_STORE is not None:
+            record, applied, recorded = self._check_store(config, verify)
+            if applied:
+                return 0, len(desired)
+            diff = diff or verify or recorded
+
+        if not diff:
+            current = {}
+        elif current is None:
+            current = self._current_values(desired.keys())
+        else:
+            current = _encode_configuration(current)
+
+        # The password is not read back: only a changed record tells whether
+        # it is up to date
+        commands, skipped = _configuration_commands(
+            desired, current, _keyed_parameters(config) if diff else (),
+            password=record is not None and not recorded
+        )
+
+        self._write_configuration(commands, record)
+        return len(commands), skipped
+
+    def _write_configuration(self, commands, record=None):
+        """
+        Run the configuration commands, and record the applied configuration
+        in the state store
+
+        :param commands: `set` and `reset` command arguments
+        :type commands: :class:`list` [ :class:`tuple` ]
+        :param record: Desired configuration values and content hash, if
+                       stored (see :func:`_configuration_record`)
+        :type record: :class:`tuple` [ :class:`dict`, :class:`str` ]
+        """
+        store = self.STATE_STORE if record is not None else None
+        try:
+            for command in commands:
+                self.WRAPPER.command(command[0], self.SERVICE_NAME,
+                                     *command[1:])
+        except Exception:
+            # The live configuration is no longer known
+            if store is not None:
+                store.delete(self.SERVICE_NAME)
+            raise
+
+        if store is not None:
+            store.put(self.SERVICE_NAME, *record)
+
+    def _check_store(self, config, verify=False):
+        """
+        Look up the desired configuration in the state store
+
+        :param config: Desired service configuration
+        :type config: :class:`.ServiceConfiguration`
+        :param verify: Check the last-applied configuration against the live
+                       settings, even if known to be applied
+        :type verify: :class:`bool`
+        :return: Desired configuration record (see
+                 :func:`_configuration_record`), whether it is known to be
+                 applied, and whether it is the last-applied one (i.e. only
+                 to be verified)
+        :rtype: :class:`tuple` [ :class:`tuple`, :class:`bool`,
+                :class:`bool` ]
+        """
+        store = self.STATE_STORE
+        record = _configuration_record(config, self.SERVICE_PATH, store)
+        digest = record[1]
+        if not verify and store.is_applied(self.SERVICE_NAME, digest,
+                                           self.VERIFY_INTERVAL):
+            return record, True, True
+
+        last = store.get(self.SERVICE_NAME)
+        return record, False, last is not None and last.digest == digest
 
-        for param, value in config.items():
+    def fetch_configuration(self):
+        """
+        Read the service's current configuration
 
-            if param == "user_account" and isinstance(value, dict):
-                value = value["username"] + " " + value["password"]
+        The configuration is read with a single `nssm dump` command. If not
+        available, it falls back to concurrent `nssm get` commands.
 
-            elif param == "env" and isinstance(value, dict):
-                env = ""
-                for k, v in value.items():
-                    env += k + "=" + v
-                value = env
+        :return: Service configuration
+        :rtype: :class:`.ServiceConfiguration`
+        """
+        return _decode_configuration(self._current_values())
 
-            elif param == "action_on_exit":
-                for k, v in value.items():
-                    v = v.value
-                    Wrapper.command("set", self.SERVICE_NAME, PARAM_MAP[param], k, v)
-                continue
+    def _current_values(self, keys=None):
+        """
+        Read the current value of the service parameters
 
-            if isinstance(value, AbstractEnum):
-                value = value.value
-            elif isinstance(value, bool):
-                value = 1 if value else 0
+        :param keys: Parameter keys to read with `nssm get` if `nssm dump` is
+                     not available. All the parameters by default.
+        :return: Parameter current values
+        :rtype: :class:`dict`
+        """
+        if self._dump_supported():
+            values = self._dump_values()
+            if values is not None:
+                return values
+
+        keys = list(_PARAMETER_KEYS if keys is None else keys)
+        if not keys:
+            return {}
+
+        # Fallback path only, keep it out of the module import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        def get(key):
+            try:
+                rc, out = self.WRAPPER.command("get", self.SERVICE_NAME, *key)
+            except ServiceConfigurationException:
+                return None  # Unknown value
+            return _decode_values(out)
+
+        values = {}
+        workers = min(self.MAX_WORKERS, len(keys))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for key, value in zip(keys, executor.map(bind(get), keys)):
+                if value is not None:
+                    values[key] = value
+        return values
+
+    def _dump_values(self):
+        """
+        :return: Parameter current values read with `nssm dump`, None if the
+                 NSSM version doesn't support it
+        :rtype: :class:`dict`
+        """
+        try:
+            rc, out = self.WRAPPER.command("dump", self.SERVICE_NAME)
+        except ServiceConfigurationException as err:
+            if not _unsupported_command(err):
+                raise
+            self._dump_unsupported()
+            return None
+        return _parse_dump(out)
+
+    def _dump_supported(self):
+        """
+        :return: Whether to read the configuration with `nssm dump`
+        :rtype: :class:`bool`
+        """
+        return self.DUMP and self.WRAPPER not in _DUMPLESS_WRAPPERS
 
-            Wrapper.command("set", self.SERVICE_NAME, PARAM_MAP[param], value)
+    def _dump_unsupported(self):
+        """
+        Stop reading the configuration with `nssm dump` through the service
+        wrapper, for all the services
+        """
+        _DUMPLESS_WRAPPERS.add(self.WRAPPER)
 
     def _edit(self):
         """
@@ -149,4 +972,4 @@ class Service(object):
         :param name: Service name
         :type name: :class:`str`
         """
-        Wrapper.command("edit", self.SERVICE_NAME)
+        self.WRAPPER.command("edit", self.SERVICE_NAME)
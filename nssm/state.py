@@ -0,0 +1,231 @@
+"""
+ Persistent store of the last-applied service configurations
+"""
+import os
+import hmac
+import json
+import time
+import hashlib
+import threading
+
+
+# Parameter whose values after the first one (i.e. the service account
+# password) are never stored, only accounted for in the keyed content hash
+_SECRET_PARAMETER = "ObjectName"
+
+
+def _redact(values):
+    """
+    :param values: Parameter values indexed by parameter key
+    :type values: :class:`dict`
+    :return: Parameter values without the secret ones
+    :rtype: :class:`dict`
+    """
+    return dict((key, value[:1] if key[0] == _SECRET_PARAMETER else value)
+                for key, value in values.items())
+
+
+def _serialize(values):
+    return sorted([list(key), list(value)] for key, value in values.items())
+
+
+def _deserialize(content):
+    return dict((tuple(key), tuple(value)) for key, value in content)
+
+
+class StateRecord(object):
+    """
+    Last-applied configuration of a service
+    """
+
+    def __init__(self, name, digest, values, updated):
+        """
+        :param name: Service name
+        :type name: :class:`str`
+        :param digest: Configuration content hash
+        :type digest: :class:`str`
+        :param values: Applied parameter values indexed by parameter key,
+                       without the service account password
+        :type values: :class:`dict`
+        :param updated: Time the configuration was applied or verified, as
+                        seconds since the epoch
+        :type updated: :class:`float`
+        """
+        self.name = name
+        self.digest = digest
+        self.values = values
+        self.updated = updated
+
+    def __repr__(self):
+        return "<StateRecord {} {}>".format(self.name, self.digest[:12])
+
+
+class StateStore(object):
+    """
+    SQLite store of the last configuration applied to each service
+
+    A service whose desired configuration has the same content hash as the
+    last-applied one is known to be up to date without running `nssm`. The
+    store is only as accurate as the changes made through it: changes made
+    by other means are detected by verifying against the live configuration
+    (see :meth:`.Service.configure`).
+
+    The content hash accounts for the service account password, so it is
+    keyed (HMAC-SHA256) with a secret of the store: a guessed password can't
+    be checked against the stored digests without the key. The key of a
+    database file is kept next to it, in a ``.key`` file readable only by
+    its owner.
+
+    The store is safe to share between threads.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS services (
+            name TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            configuration TEXT NOT NULL,
+            updated REAL NOT NULL
+        )
+    """
+
+    # Content hash key size, in bytes
+    KEY_SIZE = 32
+
+    def __init__(self, path=":memory:", key=None):
+        """
+        :param path: SQLite database file path. An in-memory database by
+                     default.
+        :type path: :class:`str`
+        :param key: Content hash key. Read from (or created in) the key file
+                    of the database by default, random for an in-memory
+                    database.
+        :type key: :class:`bytes`
+        """
+        # Only needed once a store is used, keep it out of the import time
+        import sqlite3
+
+        self.path = path
+        self._key = key if key is not None else self._load_key()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(self._SCHEMA)
+
+    def _load_key(self):
+        """
+        :return: Content hash key of the database, created if missing
+        :rtype: :class:`bytes`
+        """
+        if self.path == ":memory:":
+            return os.urandom(self.KEY_SIZE)
+
+        path = self.path + ".key"
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(path, "rb") as key_file:
+                return key_file.read()
+
+        key = os.urandom(self.KEY_SIZE)
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(key)
+        return key
+
+    def digest(self, values):
+        """
+        Keyed content hash of encoded configuration parameter values
+
+        :param values: Parameter values indexed by parameter key
+        :type values: :class:`dict`
+        :return: Hexadecimal HMAC-SHA256 digest
+        :rtype: :class:`str`
+        """
+        content = json.dumps(_serialize(values), separators=(",", ":"))
+        return hmac.new(self._key, content.encode("utf-8"),
+                        hashlib.sha256).hexdigest()
+
+    def __len__(self):
+        with self._lock:
+            query = "SELECT COUNT(*) FROM services"
+            return self._connection.execute(query).fetchone()[0]
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        """
+        :param name: Service name
+        :type name: :class:`str`
+        :return: Last-applied configuration of the service, if known
+        :rtype: :class:`.StateRecord`
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest, configuration, updated FROM services "
+                "WHERE name = ?", (name,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        digest, content, updated = row
+        return StateRecord(name, digest, _deserialize(json.loads(content)),
+                           updated)
+
+    def put(self, name, values, digest=None):
+        """
+        Record the configuration applied to a service. The service account
+        password is not stored, only accounted for in the keyed content hash.
+
+        :param name: Service name
+        :type name: :class:`str`
+        :param values: Applied parameter values indexed by parameter key
+        :type values: :class:`dict`
+        :param digest: Configuration content hash, computed if not provided
+        :type digest: :class:`str`
+        """
+        if digest is None:
+            digest = self.digest(values)
+        content = json.dumps(_serialize(_redact(values)),
+                             separators=(",", ":"))
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO services "
+                "(name, digest, configuration, updated) VALUES (?, ?, ?, ?)",
+                (name, digest, content, time.time())
+            )
+
+    def delete(self, name):
+        """
+        Forget the configuration applied to a service
+
+        :param name: Service name
+        :type name: :class:`str`
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM services WHERE name = ?",
+                                     (name,))
+
+    def is_applied(self, name, digest, max_age=None):
+        """
+        :param name: Service name
+        :type name: :class:`str`
+        :param digest: Desired configuration content hash
+        :type digest: :class:`str`
+        :param max_age: Seconds after which the record must be verified
+                        against the live configuration
+        :type max_age: :class:`float`
+        :return: Whether the desired configuration is the last-applied one
+        :rtype: :class:`bool`
+        """
+        record = self.get(name)
+        if record is None or record.digest != digest:
+            return False
+        return max_age is None or time.time() - record.updated < max_age
+
+    def close(self):
+        """
+        Close the database connection
+        """
+        with self._lock:
+            self._connection.close()
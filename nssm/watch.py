@@ -0,0 +1,419 @@
+"""
+ Service state change subscriptions
+
+ A :class:`.Watcher` polls the status of the watched services from a
+ single background thread, once per interval however many subscribers
+ watch each service, and dispatches the state changes to them:
+
+    >>> watcher = Watcher()  # doctest: +SKIP
+    >>> watcher.subscribe(service, callback=print,
+    ...                   from_state="SERVICE_RUNNING",
+    ...                   to_state="SERVICE_STOPPED")  # doctest: +SKIP
+"""
+import time
+import queue
+import logging
+import threading
+
+from .deadline import _clock
+from .exceptions import ServiceDoesntExistException
+from .service import _status_set, _Backoff
+
+log = logging.getLogger(__name__)
+
+
+class StateChange(object):
+    """
+    State transition of a watched service
+    """
+
+    def __init__(self, service, previous, current, settled=None):
+        """
+        :param service: Service
+        :type service: :class:`.Service`
+        :param previous: Former status
+        :type previous: :class:`.ServiceStatus`
+        :param current: New status, `None` if the service was removed
+        :type current: :class:`.ServiceStatus`
+        :param settled: Last status before the pending ones, if the former
+                        status is pending (e.g. `SERVICE_RUNNING` when
+                        stopping)
+        :type settled: :class:`.ServiceStatus`
+        """
+        self.service = service
+        self.previous = previous
+        self.current = current
+        self.settled = settled if settled is not None else previous
+        self.time = time.time()
+
+    @property
+    def service_name(self):
+        """
+        :return: Service name
+        :rtype: :class:`str`
+        """
+        return self.service.SERVICE_NAME
+
+    def __repr__(self):
+        return "<StateChange {} {} -> {}>".format(
+            self.service_name, getattr(self.previous, "name", None),
+            getattr(self.current, "name", None))
+
+
+class Subscription(object):
+    """
+    Subscription to the state changes of a set of services
+
+    A change through pending states matches the former status it started
+    from: subscribing from `SERVICE_RUNNING` to `SERVICE_STOPPED` gets the
+    `SERVICE_STOP_PENDING` to `SERVICE_STOPPED` change of a stopped service.
+
+    The changes are passed to the subscription callback, from the watcher
+    thread. Without a callback, they are queued and read with :meth:`get`
+    or by iterating the subscription, until it is cancelled.
+    """
+
+    # End of the queued changes
+    _CANCELLED = object()
+
+    def __init__(self, watcher, names, callback=None, from_state=None,
+                 to_state=None):
+        """
+        :param watcher: Watcher dispatching the changes
+        :type watcher: :class:`.Watcher`
+        :param names: Names of the subscribed services
+        :type names: :class:`frozenset` [ :class:`str` ]
+        :param callback: Called with each :class:`.StateChange`
+        :type callback: :class:`callable`
+        :param from_state: Former status (or statuses) of the changes
+                           dispatched. Any by default.
+        :type from_state: :class:`.ServiceStatus` or :class:`list`
+        :param to_state: New status (or statuses) of the changes dispatched.
+                         Any by default.
+        :type to_state: :class:`.ServiceStatus` or :class:`list`
+        """
+        self.watcher = watcher
+        self.names = names
+        self.from_states = None if from_state is None else \
+            _status_set(from_state)
+        self.to_states = None if to_state is None else _status_set(to_state)
+
+        self.queue = None
+        if callback is None:
+            self.queue = queue.Queue()
+            callback = self.queue.put
+        self.callback = callback
+
+        self.cancelled = False
+
+    def __iter__(self):
+        self._check_queued()
+        return self._iterate()
+
+    def _iterate(self):
+        while True:
+            event = self.queue.get()
+            if event is self._CANCELLED:
+                return
+            yield event
+
+    def _check_queued(self):
+        if self.queue is None:
+            raise RuntimeError("The state changes of a subscription with a "
+                               "callback are not queued")
+
+    def __repr__(self):
+        return "<Subscription services={}{}>".format(
+            len(self.names), " cancelled" if self.cancelled else "")
+
+    def matches(self, event):
+        """
+        :param event: State change
+        :type event: :class:`.StateChange`
+        :return: Whether the change is dispatched to the subscription
+        :rtype: :class:`bool`
+        """
+        if event.service_name not in self.names:
+            return False
+        if self.to_states is not None and event.current not in self.to_states:
+            return False
+        return self.from_states is None or \
+            event.previous in self.from_states or \
+            event.settled in self.from_states
+
+    def get(self, timeout=None):
+        """
+        Next queued state change (subscriptions without a callback)
+
+        :param timeout: Seconds to wait for a change, forever by default
+        :type timeout: :class:`float`
+        :return: State change, `None` on timeout or once cancelled
+        :rtype: :class:`.StateChange`
+        :raises RuntimeError: If the subscription has a callback
+        """
+        self._check_queued()
+        try:
+            event = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        if event is self._CANCELLED:
+            self.queue.put(event)  # Keep the subscription ended
+            return None
+        return event
+
+    def cancel(self):
+        """
+        Stop receiving state changes
+        """
+        if not self.cancelled:
+            self.cancelled = True
+            self.watcher.unsubscribe(self)
+            if self.queue is not None:
+                self.queue.put(self._CANCELLED)
+
+
+class _WatchedService(object):
+    """
+    Polling state of a watched service
+    """
+
+    def __init__(self, service, backoff):
+        self.service = service
+        self.backoff = backoff
+        self.subscribers = 0
+        self.status = None
+        self.settled = None
+        self.next_poll = 0.0
+
+
+class Watcher(object):
+    """
+    Shared status poller of the watched services
+
+    Each watched service is polled every `INTERVAL` seconds. While it is in
+    a pending state (e.g. `SERVICE_START_PENDING`) it is polled faster,
+    from every `PENDING_INTERVAL` seconds, backing off by `POLL_BACKOFF` up
+    to `INTERVAL` while the state doesn't change. At most `MAX_WORKERS`
+    `nssm status` commands run at the same time.
+
+    The first status of a service is its baseline, not a change. A service
+    removed while watched is reported as a change to `None`.
+
+    The polling thread starts with the first subscription, and stops when
+    the watcher is closed.
+    """
+
+    INTERVAL = 5.0
+    PENDING_INTERVAL = 0.05
+    POLL_BACKOFF = 1.5
+
+    MAX_WORKERS = 8
+
+    def __init__(self, interval=None, pending_interval=None,
+                 max_workers=None):
+        """
+        :param interval: Polling interval of the services, in seconds
+        :type interval: :class:`float`
+        :param pending_interval: First polling interval of the services in a
+                                 pending state, in seconds
+        :type pending_interval: :class:`float`
+        :param max_workers: Maximum number of concurrent status commands
+        :type max_workers: :class:`int`
+        """
+        if interval is not None:
+            self.INTERVAL = interval
+
+        if pending_interval is not None:
+            self.PENDING_INTERVAL = pending_interval
+
+        if max_workers:
+            self.MAX_WORKERS = max_workers
+
+        # Watched services and subscriptions
+        self._services = {}
+        self._subscriptions = []
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<Watcher services={} subscriptions={}>".format(
+            len(self._services), len(self._subscriptions))
+
+    def subscribe(self, services, callback=None, from_state=None,
+                  to_state=None):
+        """
+        Subscribe to the state changes of a set of services
+
+        :param services: Watched service, or services
+        :type services: :class:`.Service` or :class:`list`
+        :param callback: Called with each :class:`.StateChange`, from the
+                         watcher thread. Queued in the subscription by
+                         default.
+        :type callback: :class:`callable`
+        :param from_state: Former status (or statuses) of the changes
+                           dispatched. Any by default.
+        :type from_state: :class:`.ServiceStatus` or :class:`list`
+        :param to_state: New status (or statuses) of the changes dispatched.
+                         Any by default.
+        :type to_state: :class:`.ServiceStatus` or :class:`list`
+        :return: Subscription
+        :rtype: :class:`.Subscription`
+        """
+        if not isinstance(services, (list, tuple, set, frozenset)):
+            services = list(getattr(services, "services", [services]))
+
+        services = dict((s.SERVICE_NAME, s) for s in services)
+        names = frozenset(services)
+        subscription = Subscription(self, names, callback, from_state,
+                                    to_state)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Watcher closed")
+
+            for service in services.values():
+                watched = self._services.get(service.SERVICE_NAME)
+                if watched is None:
+                    watched = _WatchedService(service, _Backoff(
+                        self.PENDING_INTERVAL, self.INTERVAL,
+                        self.POLL_BACKOFF))
+                    self._services[service.SERVICE_NAME] = watched
+                watched.subscribers += 1
+
+            self._subscriptions.append(subscription)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="nssm-watcher")
+                self._thread.daemon = True
+                self._thread.start()
+
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Cancel a subscription. The services without subscribers are not
+        polled anymore.
+
+        :param subscription: Subscription
+        :type subscription: :class:`.Subscription`
+        """
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.remove(subscription)
+
+            for name in subscription.names:
+                watched = self._services[name]
+                watched.subscribers -= 1
+                if not watched.subscribers:
+                    del self._services[name]
+
+        if not subscription.cancelled:
+            subscription.cancel()
+
+    def statuses(self):
+        """
+        Last polled status of the watched services. Reading them never runs
+        `nssm`.
+
+        :return: Statuses indexed by service name, `None` if not polled yet
+                 or removed
+        :rtype: :class:`dict`
+        """
+        with self._lock:
+            return dict((name, watched.status)
+                        for name, watched in self._services.items())
+
+    def close(self):
+        """
+        Cancel all the subscriptions and stop the polling thread
+        """
+        with self._lock:
+            self._closed = True
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            subscription.cancel()
+
+        self._wakeup.set()
+        if self._thread is not None and \
+                self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        # Polling thread only, keep it out of the module import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            while not self._closed:
+                now = _clock()
+                with self._lock:
+                    due = [w for w in self._services.values()
+                           if w.next_poll <= now]
+                    waiting = [w.next_poll for w in self._services.values()
+                               if w.next_poll > now]
+
+                if due:
+                    for watched, status in zip(due,
+                                               executor.map(self._poll, due)):
+                        self._update(watched, status)
+                    continue
+
+                self._wakeup.wait(min(waiting) - now if waiting else None)
+                self._wakeup.clear()
+
+    @staticmethod
+    def _poll(watched):
+        try:
+            return watched.service._poll_status()
+        except ServiceDoesntExistException:
+            return None
+        except Exception:
+            log.exception("Service status poll failed: %s",
+                          watched.service.SERVICE_NAME)
+            return watched.status
+
+    def _update(self, watched, status):
+        previous = watched.status
+        first = watched.next_poll == 0.0
+        watched.status = status
+
+        settled = watched.settled
+        if previous is None or not previous.pending:
+            settled = previous
+        watched.settled = settled
+
+        if status is not None and status.pending:
+            if status != previous:
+                watched.backoff.reset()
+            interval = watched.backoff.next()
+        else:
+            interval = self.INTERVAL
+        watched.next_poll = _clock() + interval
+
+        if first or status == previous:
+            return
+
+        event = StateChange(watched.service, previous, status, settled)
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions
+                             if s.matches(event)]
+
+        for subscription in subscriptions:
+            try:
+                subscription.callback(event)
+            except Exception:
+                log.exception("State change callback failed: %r",
+                              subscription.callback)
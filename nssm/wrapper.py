@@ -2,84 +2,260 @@
  Created on May 19, 2018
  @author: Lorenzo Delgado <lorenzo.delgado@lnsd.es>
 """
-import os
 import re
-import subprocess as sp
+import sys
 import logging
 
-from .exceptions import NssmException, _map_exception
+from .deadline import Deadline, _clock
+from .exceptions import NssmException, CommandTimeoutException, \
+                        _map_exception
+from .executors import SubprocessExecutor, CommandResult, nssm_exe
+from .instrumentation import CommandEvent
 
 log = logging.getLogger(__name__)
 
 
+class _defaultmethod(object):
+    """
+    Instance method that, called on the class, runs on the class default
+    instance. It keeps the former static ``Wrapper.command("status", name)``
+    calls working.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            instance = owner._default_wrapper()
+        return self.func.__get__(instance, owner)
+
+
 class Wrapper(object):
+    """
+    NSSM command wrapper
 
-    @staticmethod
-    def command(command, service_name, *args):
+    Every command runs within the current :class:`.Deadline` (if any), and
+    at most `TIMEOUT` seconds.
+    """
+
+    # Time limit of every `nssm` command, in seconds
+    TIMEOUT = 300.0
+
+    def __init__(self, executor=None, timeout=None):
+        """
+        :param executor: NSSM command executor. A subprocess running the
+                         bundled NSSM binary by default.
+        :type executor: :class:`.Executor`
+        :param timeout: Time limit of every `nssm` command, in seconds
+        :type timeout: :class:`float`
         """
-        NSSM command
+        self.executor = executor or SubprocessExecutor()
+
+        if timeout is not None:
+            self.TIMEOUT = timeout
+
+        # Command invocation observers
+        self.observers = []
+
+    @_defaultmethod
+    def command(self, command, service_name, *args):
+        """
+        NSSM command. Called on the class, it runs on the default wrapper.
 
         :param command: NSSM command
         :type command: :class:`str`
-        :param service_name: Service name
+        :param service_name: Service name, `None` for the commands not bound
+                             to a service (i.e. ``list``)
         :type service_name: :class:`str`
         :param args: Program arguments
         :type args: :class:`str` or :class:`tuple`
-        :return: Return code and output of the command
-        :rtype: :class:`tuple` [ :class:`int`, :class:`str`: ]
+        :return: Result of the command. It unpacks as a `(0, output)`
+                 tuple.
+        :rtype: :class:`.CommandResult`
+        :raises CommandTimeoutException: If the command doesn't finish in
+                                         time, or the deadline is over
         """
 
-        # Build de command string
-        cmd = [Wrapper.nssm_exe(), command, service_name]
-        cmd += args if len(args) == 1 else list(args)
-
-        # Format in an unique command string
-        cmd = " ".join(cmd)
+        # Build de command arguments
+        cmd = [command] + list(args) if service_name is None else \
+            [command, service_name] + list(args)
 
         # Print command string for debugging purpose
-        log.debug(cmd)
+        log.debug(" ".join(cmd))
 
         # Run the command
-        try:
-            out = sp.check_output(cmd,
-                                  stderr=sp.STDOUT,
-                                  universal_newlines=True)
-            return 0, out.decode("utf-16")
-
-        except sp.CalledProcessError as err:
-            # Tidy up the command error output
-            err.output = err.output.decode("utf-16")
-            err.output = re.sub(r"\n+", " ", err.output)
-
-            # Map the error output code to an exception
-            exception = _map_exception(command, err.returncode)
-
-            if exception != NssmException:
-                message = None
-
-            else:
-                message = "{msg} ({rc}): {out}"
-                message = message.format(
-                    msg=exception.DEFAULT_MESSAGE,
-                    rc=err.returncode,
-                    out=err.output
-                )
-
-            raise exception(service_name, message,
-                            output=err.output,
-                            rcode=err.returncode)
+        start = _clock()
+        with Deadline(self.TIMEOUT) as deadline:
+            try:
+                deadline.check(service_name)
+                result = self.executor.execute(cmd, deadline)
+            except CommandTimeoutException as err:
+                self._timed_out(command, service_name, args, err,
+                                _clock() - start)
+                raise
+
+        return self._result(command, service_name, args, result,
+                            _clock() - start)
+
+    def _timed_out(self, command, service_name, args, error, duration):
+        """
+        Notify the observers of a timed out or cancelled command
+        """
+        if self.observers:
+            self._notify(CommandEvent(command, service_name, tuple(args),
+                                      None, type(error), duration, 0))
+
+    def _result(self, command, service_name, args, result, duration):
+        """
+        Notify the observers of a completed command, and map its failure to
+        an exception
+
+        :return: Result of the command
+        :rtype: :class:`.CommandResult`
+        :raises NssmException: If the command failed
+        """
+        # Executors of the former interface return a (rcode, output) tuple
+        if not isinstance(result, CommandResult):
+            result = CommandResult(result[0], result[1])
+
+        # The process wall time if measured by the executor, without the
+        # wrapper overhead
+        if result.duration is None:
+            result.duration = duration
+
+        exception = Wrapper._exception(command, service_name, result.rcode,
+                                       result.output) if result.rcode else None
+
+        if self.observers:
+            self._notify(CommandEvent(
+                command, service_name, tuple(args), result.rcode,
+                type(exception) if exception else None,
+                result.duration, len(result.output or b"")
+            ))
+
+        if exception:
+            raise exception
+
+        return result
+
+    @classmethod
+    def _default_wrapper(cls):
+        """
+        :return: Wrapper running the commands called on the class
+        :rtype: :class:`.Wrapper`
+        """
+        return DEFAULT_WRAPPER
+
+    def add_observer(self, observer):
+        """
+        Register a command invocation observer. Observers are called with a
+        :class:`.CommandEvent` after every command.
+
+        :param observer: Observer callable
+        :type observer: :class:`callable`
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        """
+        Unregister a command invocation observer
+
+        :param observer: Observer callable
+        :type observer: :class:`callable`
+        """
+        self.observers.remove(observer)
+
+    def _notify(self, event):
+        for observer in list(self.observers):
+            try:
+                observer(event)
+            except Exception:
+                log.exception("Command observer failed: %r", observer)
 
     @staticmethod
-    def nssm_exe():
+    def _decode(output):
+        """
+        Decode the NSSM console output
+
+        :param output: Console process output
+        :type output: :class:`bytes` or :class:`str`
+        :return: Decoded output
+        :rtype: :class:`str`
         """
-        Build full path to the NSSM binary executable depending on processor
-        architecture
+        if isinstance(output, bytes):
+            output = output.decode("utf-16")
+        return output
 
-        :return: Path to the bundled executable
-        :rtype: str
+    @staticmethod
+    def _exception(command, service_name, rcode, output):
+        """
+        Build the exception for a failed NSSM command
+
+        :param command: NSSM command
+        :type command: :class:`str`
+        :param service_name: Service name
+        :type service_name: :class:`str`
+        :param rcode: Console process return code
+        :type rcode: :class:`int`
+        :param output: Console process output
+        :type output: :class:`bytes` or :class:`str`
+        :return: Mapped exception
+        :rtype: :class:`.NssmException`
         """
-        arch = "win64" if os.environ['PROCESSOR_ARCHITECTURE'] else "win32"
-        return os.path.join(os.path.dirname(__file__), "bin", arch, "nssm.exe")
+        # Tidy up the command error output
+        output = Wrapper._decode(output)
+        output = re.sub(r"\n+", " ", output)
+
+        # Map the error output code to an exception
+        exception = _map_exception(command, rcode)
+
+        if exception != NssmException:
+            message = None
+
+        else:
+            message = "{msg} ({rc}): {out}"
+            message = message.format(
+                msg=exception.DEFAULT_MESSAGE,
+                rc=rcode,
+                out=output
+            )
+
+        return exception(service_name, message, output=output, rcode=rcode)
+
+    # Path to the bundled NSSM binary executable
+    nssm_exe = staticmethod(nssm_exe)
+
+
+# Default NSSM command wrapper
+DEFAULT_WRAPPER = Wrapper()
+
+
+def _observable(wrapper):
+    """
+    :param wrapper: NSSM command wrapper, possibly wrapping another one (e.g.
+                    a :class:`.CachedWrapper`)
+    :return: Innermost wrapper accepting command observers (i.e. the one
+             spawning the `nssm` processes), if any
+    :rtype: :class:`.Wrapper`
+    """
+    while wrapper is not None and not hasattr(wrapper, "add_observer"):
+        wrapper = getattr(wrapper, "wrapper", None)
+    return wrapper
+
+
+def __getattr__(name):
+    # NSSM executable path, resolved on first use
+    if name == "executable":
+        global executable
+        executable = DEFAULT_WRAPPER.executor.executable
+        return executable
+
+    msg = "module {!r} has no attribute {!r}"
+    raise AttributeError(msg.format(__name__, name))
 
 
-executable = Wrapper.nssm_exe()
+# Module __getattr__ (PEP 562) is only supported from Python 3.7 on
+if sys.version_info < (3, 7):
+    executable = Wrapper.nssm_exe()
@@ -11,7 +11,7 @@ import subprocess
 sys.path.append('.')
 from setup import (  # noqa
     setup_dict, get_project_files, print_success_message,
-    print_failure_message, _lint, _test, _test_all,
+    print_failure_message, _lint, _test, _test_all, _bench,
     CODE_DIRECTORY, DOCS_DIRECTORY, TESTS_DIRECTORY, PYTEST_FLAGS)
 
 from paver.easy import options, task, needs, consume_args  # noqa
@@ -100,6 +100,13 @@ def test(args):
     raise SystemExit(_test(args))
 
 
+@task
+@consume_args
+def bench(args):
+    """Run the benchmarks and write the results to a JSON file."""
+    raise SystemExit(_bench(args))
+
+
 @task
 def lint():
     # This refuses to format properly when running `paver help' unless
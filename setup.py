@@ -38,6 +38,7 @@ sys.path.insert(0, os.path.abspath('.'))
 CODE_DIRECTORY = 'nssm'
 DOCS_DIRECTORY = 'docs'
 TESTS_DIRECTORY = 'tests'
+BENCHMARKS_DIRECTORY = 'benchmarks'
 PYTEST_FLAGS = ['--doctest-modules']
 
 # Import metadata. Normally this would just be:
@@ -196,6 +197,15 @@ def _test_all():
     return _lint() + _test([])
 
 
+def _bench(args):
+    """Run the benchmarks.
+
+    :return: exit code
+    """
+    from benchmarks.run import main
+    return main(args)
+
+
 def convert_md_to_rst(filename):
     """Convert MarkDown files to reStructuredText
 
@@ -279,17 +289,20 @@ setup_dict = dict(
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.3',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: Implementation :: PyPy',
         'Topic :: Documentation',
         'Topic :: Software Development :: Libraries :: Python Modules',
         'Topic :: System :: Installation/Setup',
         'Topic :: System :: Software Distribution',
     ],
-    packages=find_packages(exclude=(TESTS_DIRECTORY,)),
+    packages=find_packages(exclude=(TESTS_DIRECTORY, BENCHMARKS_DIRECTORY,
+                                    BENCHMARKS_DIRECTORY + '.*')),
     install_requires=get_package_dependencies(),
+    python_requires='>=3.5',
     include_package_data=True,
     # Allow tests to be run with `python setup.py test'.
     tests_require=[
@@ -0,0 +1,26 @@
+"""
+ Shared fixtures: the tests run against the in-memory NSSM stand-in
+"""
+import pytest
+
+from nssm import Wrapper
+from nssm.fake import FakeNssm
+
+
+class DumplessNssm(FakeNssm):
+    """
+    NSSM 2.24 (the bundled binary), without the ``dump`` and ``list``
+    commands
+    """
+    _dump = None
+    _list = None
+
+
+@pytest.fixture
+def fake():
+    return FakeNssm()
+
+
+@pytest.fixture
+def wrapper(fake):
+    return Wrapper(fake)
@@ -0,0 +1,153 @@
+"""
+ Asyncio interface
+"""
+import asyncio
+
+import pytest
+
+from nssm.aio import AsyncService, AsyncWrapper, AsyncExecutor, \
+                     ThreadedExecutor, DEFAULT_ASYNC_WRAPPER
+from nssm.exceptions import NssmException, ServiceTimeoutException
+from nssm.fake import FakeNssm
+from nssm.instrumentation import CommandStats
+from nssm.service import ServiceStatus
+from nssm.state import StateStore
+
+from .conftest import DumplessNssm
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class ConcurrencyExecutor(AsyncExecutor):
+    """
+    Asynchronous executor recording the peak number of in-flight commands
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.active = self.peak = 0
+
+    async def execute(self, args, deadline=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            return self.executor.execute(args, deadline)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def fake():
+    return FakeNssm(pending=2)
+
+
+@pytest.fixture
+def service(fake):
+    return AsyncService("web", "C:\\web.exe", wrapper=AsyncWrapper(fake),
+                        description="Web server")
+
+
+def test_install_and_start(fake, service):
+    async def scenario():
+        await service.install()
+        return await service.start(wait=True)
+
+    assert _run(scenario()) == ServiceStatus.RUNNING
+    assert service.last_status == ServiceStatus.RUNNING
+    assert fake.services["web"].parameters[("Description",)] == \
+        ("Web server",)
+
+
+def test_wait_timeout(service):
+    async def scenario():
+        await service.install()
+        await service.wait_for(ServiceStatus.RUNNING, timeout=0.1)
+
+    with pytest.raises(ServiceTimeoutException):
+        _run(scenario())
+
+
+def test_observers(service):
+    stats = CommandStats()
+    service.WRAPPER.add_observer(stats)
+
+    _run(service.install())
+    assert sorted(stats.dump()) == ["install", "set"]
+
+
+def test_task_cancellation(fake, service):
+    async def scenario():
+        await service.install()
+        fake.latency = 5.0
+        task = asyncio.ensure_future(service.status())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    _run(scenario())
+
+
+def test_static_command(fake, monkeypatch):
+    monkeypatch.setattr(DEFAULT_ASYNC_WRAPPER, "executor",
+                        ThreadedExecutor(fake))
+
+    with pytest.raises(NssmException):
+        _run(AsyncWrapper.command("status", "web"))
+    assert fake.counts == {"status": 1}
+
+
+def test_discover():
+    wrapper = AsyncWrapper(FakeNssm())
+    for name in ("web-1", "web-2", "db"):
+        _run(AsyncService(name, "C:\\app.exe", wrapper=wrapper).install())
+
+    prefetch = ["status", "configuration"]
+    services = _run(AsyncService.discover("WEB-*", wrapper=wrapper,
+                                          prefetch=prefetch))
+    assert [(s.SERVICE_NAME, s.last_status) for s in services] == [
+        ("web-1", ServiceStatus.STOPPED), ("web-2", ServiceStatus.STOPPED)]
+    assert services[0].SERVICE_PATH == "C:\\app.exe"
+
+
+def test_discover_requires_list():
+    wrapper = AsyncWrapper(DumplessNssm())
+    with pytest.raises(NssmException, match="2.25"):
+        _run(AsyncService.discover(wrapper=wrapper))
+
+
+def test_state_store(fake, service):
+    service.STATE_STORE = StateStore()
+    _run(service.install())
+    assert "web" in service.STATE_STORE
+
+    fake.reset_counters()
+    assert _run(service.configure(service.configuration)) == (0, 1)
+    assert fake.spawns == 0
+
+    # Verified against the live settings, still up to date
+    assert _run(service.configure(service.configuration, verify=True)) == \
+        (0, 1)
+    assert fake.counts == {"dump": 1}
+
+    _run(service.remove())
+    assert "web" not in service.STATE_STORE
+
+
+def test_get_concurrency():
+    executor = ConcurrencyExecutor(DumplessNssm())
+    service = AsyncService("web", "C:\\web.exe",
+                           wrapper=AsyncWrapper(executor))
+    service.MAX_WORKERS = 2
+    _run(service.install())
+
+    config = _run(service.fetch_configuration())
+    assert config["path"] == "C:\\web.exe"
+    assert executor.peak == 2
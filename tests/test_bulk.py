@@ -0,0 +1,87 @@
+"""
+ Bulk install checkpoints
+"""
+import pytest
+
+from nssm import Service, StateStore
+from nssm.bulk import BulkInstaller, INSTALLED
+from nssm.exceptions import ServiceAlreadyInstalledException
+
+
+@pytest.fixture
+def services(wrapper):
+    return [Service(name, "C:\\{}.exe".format(name), wrapper=wrapper,
+                    description="Worker", startup="AUTOMATIC")
+            for name in ("a", "b", "c")]
+
+
+def test_install(fake, services):
+    result = BulkInstaller(services, StateStore()).run()
+
+    assert result.results == dict.fromkeys(["a", "b", "c"], "installed")
+    assert fake.counts == {"install": 3, "set": 6}
+    assert result.spawns == 9
+
+
+def test_rerun_skips_checkpointed_services(fake, services):
+    checkpoint = StateStore()
+    BulkInstaller(services, checkpoint).run()
+    fake.reset_counters()
+
+    result = BulkInstaller(services, checkpoint).run()
+    assert result.skipped == ["a", "b", "c"]
+    assert fake.spawns == 0
+
+
+def test_resume_interrupted_install(fake, wrapper, services):
+    checkpoint = StateStore()
+    wrapper.command("install", "a", "C:\\a.exe")
+    checkpoint.put("a", {}, INSTALLED)
+    fake.reset_counters()
+
+    result = BulkInstaller(services, checkpoint).run()
+    assert result.results["a"] == "resumed"
+    assert fake.services["a"].parameters[("Description",)] == ("Worker",)
+    assert checkpoint.get("a").digest != INSTALLED
+
+
+def test_foreign_service_is_not_resumed(fake, wrapper, services):
+    wrapper.command("install", "a", "C:\\other\\foreign.exe")
+
+    result = BulkInstaller(services, StateStore()).run()
+    assert isinstance(result.errors["a"], ServiceAlreadyInstalledException)
+    assert fake.services["a"].parameters[("Application",)] == \
+        ("C:\\other\\foreign.exe",)
+
+
+def test_resume_fixes_the_path(fake, wrapper, services):
+    checkpoint = StateStore()
+    wrapper.command("install", "a", "C:\\old\\a.exe")
+    checkpoint.put("a", {}, INSTALLED)
+
+    BulkInstaller(services, checkpoint).run()
+    assert fake.services["a"].parameters[("Application",)] == ("C:\\a.exe",)
+
+
+def test_checkpoint_keeps_no_password(tmpdir, services):
+    path = str(tmpdir.join("install.db"))
+    services[0].configuration.update({"user_account": {
+        "username": ".\\worker", "password": "s3cr3t"}})
+
+    checkpoint = StateStore(path)
+    BulkInstaller(services, checkpoint).run()
+    checkpoint.close()
+
+    with open(path, "rb") as f:
+        assert b"s3cr3t" not in f.read()
+
+
+def test_configure_after_install_runs_no_command(fake, services):
+    checkpoint = StateStore()
+    BulkInstaller(services, checkpoint).run()
+    fake.reset_counters()
+
+    for service in services:
+        service.STATE_STORE = checkpoint
+        assert service.configure(service.configuration) == (0, 2)
+    assert fake.spawns == 0
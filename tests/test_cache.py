@@ -0,0 +1,82 @@
+"""
+ Read-through cache wrapper
+"""
+import time
+
+import pytest
+
+from nssm import Service
+from nssm.cache import CachedWrapper
+
+
+@pytest.fixture
+def service(wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper)
+    service.install()
+    return service
+
+
+def test_cached_reads(fake, service):
+    cached = CachedWrapper(service.WRAPPER, ttl=60)
+    service.WRAPPER = cached
+    fake.reset_counters()
+
+    service.status()
+    service.status()
+    assert fake.counts == {"status": 1}
+    assert cached.stats["hits"] == 1
+
+
+def test_writes_invalidate_the_service_entries(fake, service):
+    service.WRAPPER = CachedWrapper(service.WRAPPER, ttl=60)
+    other = Service("db", "C:\\db.exe", wrapper=service.WRAPPER)
+    other.install()
+    service.status()
+    other.status()
+    fake.reset_counters()
+
+    service.start()
+    assert service.status().value == "SERVICE_RUNNING"
+    other.status()
+    assert fake.counts == {"start": 1, "status": 1}
+
+
+def test_wait_bypasses_the_cache(fake, service):
+    service.WRAPPER = CachedWrapper(service.WRAPPER, ttl=60)
+    service.status()
+    fake.services["web"].state = "SERVICE_RUNNING"  # Changed by other means
+
+    assert service.wait_for("SERVICE_RUNNING", timeout=1).value == \
+        "SERVICE_RUNNING"
+
+
+def test_expired_entries(fake, service):
+    service.WRAPPER = CachedWrapper(service.WRAPPER, ttl=0.01)
+    service.status()
+    time.sleep(0.02)
+    fake.reset_counters()
+
+    service.status()
+    assert fake.counts == {"status": 1}
+
+
+def test_lru_eviction(fake, service):
+    cached = CachedWrapper(service.WRAPPER, ttl=60, max_size=2)
+    service.WRAPPER = cached
+    service.status()
+    service.fetch_configuration()
+    service.status()  # Most recently used
+    service.WRAPPER.command("get", "web", "Application")
+    fake.reset_counters()
+
+    service.status()
+    service.fetch_configuration()
+    assert fake.counts == {"dump": 1}
+    assert cached.stats["size"] == 2
+
+
+def test_list_is_not_cached(fake, service):
+    cached = CachedWrapper(service.WRAPPER, ttl=60)
+    cached.command("list", None)
+    cached.command("list", None)
+    assert fake.counts["list"] == 2
@@ -0,0 +1,95 @@
+"""
+ Single-flight coalescing wrapper
+"""
+import threading
+import time
+
+import pytest
+
+from nssm import Service, Deadline
+from nssm.cache import CachedWrapper, CoalescingWrapper
+from nssm.exceptions import CommandCancelledException, \
+                            CommandTimeoutException
+
+
+@pytest.fixture
+def service(wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper)
+    service.install()
+    return service
+
+
+def _concurrently(func, count):
+    threads = [threading.Thread(target=func) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_coalesced_reads(fake, service):
+    coalescing = CoalescingWrapper(service.WRAPPER)
+    service.WRAPPER = coalescing
+    fake.latency = 0.1
+    fake.reset_counters()
+
+    results = []
+    _concurrently(lambda: results.append(service.status()), 5)
+    assert fake.counts == {"status": 1}
+    assert len(set(results)) == 1
+    assert coalescing.coalesced == 4
+
+
+def test_coalesced_follower_cancellation(fake, service):
+    service.WRAPPER = CoalescingWrapper(service.WRAPPER)
+    fake.latency = 1.0
+
+    leader = threading.Thread(target=service.status)
+    leader.start()
+    time.sleep(0.05)
+
+    deadline = Deadline()
+    threading.Timer(0.1, deadline.cancel).start()
+    start = time.time()
+    with deadline, pytest.raises(CommandCancelledException):
+        service.status()
+    assert time.time() - start < 0.5
+
+    with Deadline(0.1), pytest.raises(CommandTimeoutException):
+        service.status()
+    leader.join()
+
+
+def test_follower_outlives_the_leader_deadline(fake, service):
+    service.WRAPPER = CoalescingWrapper(service.WRAPPER)
+    fake.latency = 0.3
+    fake.reset_counters()
+    errors = []
+
+    def lead():
+        try:
+            with Deadline(0.1):
+                service.status()
+        except CommandTimeoutException as err:
+            errors.append(err)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    time.sleep(0.02)
+
+    # Retried as the new leader, within its own (longer) deadline
+    with Deadline(5):
+        assert service.status().value == "SERVICE_STOPPED"
+    leader.join()
+    assert len(errors) == 1
+    assert service.WRAPPER.coalesced == 1
+    assert fake.counts == {"status": 1}  # The timed-out one didn't finish
+
+
+def test_behind_the_cache(fake, service):
+    service.WRAPPER = CachedWrapper(CoalescingWrapper(service.WRAPPER))
+    fake.latency = 0.1
+    fake.reset_counters()
+
+    _concurrently(service.status, 5)
+    assert fake.counts == {"status": 1}
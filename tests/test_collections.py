@@ -0,0 +1,53 @@
+"""
+ Dictionaries derived from a template
+"""
+from nssm.configuration import ServiceConfiguration
+
+
+def test_items_dont_reach_the_template():
+    template = ServiceConfiguration(env={"A": "1"})
+    derived = template.derive()
+
+    for key, value in derived.items():
+        value["B"] = "2"
+    for value in derived.values():
+        value["C"] = "3"
+
+    assert template["env"] == {"A": "1"}
+    assert derived["env"] == {"A": "1", "B": "2", "C": "3"}
+    assert dict(derived.items()) == {"env": derived["env"]}
+
+
+def test_slots():
+    config = ServiceConfiguration(description="Web")
+    assert not hasattr(config, "__dict__")
+    assert not hasattr(config.derive(), "__dict__")
+
+
+def test_derive_shares_the_base():
+    template = ServiceConfiguration(description="Web", startup="AUTOMATIC")
+    derived = template.derive(description="API")
+
+    assert derived.overrides() == {"description": "API"}
+    assert derived["startup"] == template["startup"]
+
+    # Later template changes are seen through the derived dictionary
+    template["display_name"] = "Web server"
+    assert derived["display_name"] == "Web server"
+
+
+def test_derived_writes_are_isolated():
+    template = ServiceConfiguration(description="Web",
+                                    action_on_exit={"Default": "Restart"})
+    derived = template.derive()
+
+    derived["description"] = "API"
+    derived.update({"action_on_exit": {"1": "Exit"}})
+    del derived["description"]
+    assert template["description"] == "Web"
+    assert list(template["action_on_exit"]) == ["Default"]
+    assert sorted(derived["action_on_exit"]) == ["1", "Default"]
+    assert "description" not in derived
+
+    derived.clear()
+    assert len(template) == 2
@@ -0,0 +1,54 @@
+"""
+ Differential service configuration
+"""
+from nssm import Service
+from nssm.configuration import ServiceConfiguration
+
+
+def test_configure_sets_all_parameters(fake, wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper)
+    service.install()
+    fake.reset_counters()
+
+    config = service.configuration.derive(description="Web server",
+                                          startup="AUTOMATIC")
+    assert service.configure(config) == (2, 0)
+    assert fake.counts == {"set": 2}
+    assert fake.services["web"].parameters[("Description",)] == \
+        ("Web server",)
+
+
+def test_configure_diff_only_sets_changes(fake, wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      description="Web server", startup="AUTOMATIC")
+    service.install()
+    fake.reset_counters()
+
+    config = service.configuration.derive(description="Web frontend")
+    assert service.configure(config, diff=True) == (1, 1)
+    assert fake.counts == {"dump": 1, "set": 1}
+
+
+def test_configure_diff_with_known_current(fake, wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      description="Web server")
+    service.install()
+    fake.reset_counters()
+
+    current = ServiceConfiguration(description="Web server")
+    assert service.configure(service.configuration, diff=True,
+                             current=current) == (0, 1)
+    assert fake.spawns == 0
+
+
+def test_configure_diff_resets_removed_sub_parameters(fake, wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      action_on_exit={"Default": "Restart", "1": "Exit"})
+    service.install()
+    assert ("AppExit", "1") in fake.services["web"].parameters
+
+    config = ServiceConfiguration(action_on_exit={"Default": "Restart"})
+    service.configure(config, diff=True)
+    assert ("AppExit", "1") not in fake.services["web"].parameters
+    assert fake.services["web"].parameters[("AppExit", "Default")] == \
+        ("Restart",)
@@ -0,0 +1,84 @@
+"""
+ Deadlines and cancellation
+"""
+import threading
+import time
+
+import pytest
+
+from nssm import Service, ServiceGroup, Deadline, exceptions
+from nssm.deadline import current_deadline
+from nssm.exceptions import NssmException, CommandCancelledException, \
+                            CommandTimeoutException
+
+
+@pytest.fixture
+def services(fake, wrapper):
+    services = [Service(name, "C:\\app.exe", wrapper=wrapper)
+                for name in ("a", "b", "c")]
+    for service in services:
+        service.install()
+    fake.latency = 1.0
+    return services
+
+
+def test_nested_scopes():
+    with Deadline(10) as outer:
+        with Deadline(1) as inner:
+            assert current_deadline() is inner
+            assert inner.remaining() <= 1
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_timeout(services):
+    start = time.time()
+    with Deadline(0.1), pytest.raises(CommandTimeoutException):
+        services[0].status()
+    assert time.time() - start < 0.5
+
+
+def test_cancellation_from_another_thread(services):
+    deadline = Deadline()
+    threading.Timer(0.1, deadline.cancel).start()
+
+    start = time.time()
+    with deadline, pytest.raises(CommandCancelledException):
+        services[0].status()
+    assert time.time() - start < 0.5
+
+
+def test_cancellation_reaches_nested_deadlines():
+    with Deadline() as outer:
+        inner = Deadline(10)
+        outer.cancel()
+        assert inner.cancelled
+        with pytest.raises(CommandCancelledException):
+            inner.check()
+
+
+def test_released_deadline_stops_following_its_parent():
+    with Deadline() as outer:
+        inner = Deadline()
+        inner.release()
+        outer.cancel()
+        assert not inner.cancelled
+
+
+def test_group_operation_cancellation(services):
+    deadline = Deadline()
+    threading.Timer(0.1, deadline.cancel).start()
+
+    start = time.time()
+    with deadline:
+        result = ServiceGroup(services).status()
+    assert time.time() - start < 0.5
+    assert sorted(result.errors) == ["a", "b", "c"]
+    assert all(isinstance(err, CommandCancelledException)
+               for err in result.errors.values())
+
+
+def test_exceptions_are_exported():
+    public = [name for name, value in vars(exceptions).items()
+              if isinstance(value, type) and issubclass(value, NssmException)]
+    assert sorted(exceptions.__all__) == sorted(public)
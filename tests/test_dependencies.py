@@ -0,0 +1,76 @@
+"""
+ Dependency-aware ordering
+"""
+import threading
+
+import pytest
+
+from nssm import Service
+from nssm.dependencies import DependencyGraph
+from nssm.exceptions import ServiceDependencyException
+
+
+def _services(wrapper, dependencies):
+    services = []
+    for name, depends_on in sorted(dependencies.items()):
+        kwargs = {"dependencies": depends_on} if depends_on else {}
+        services.append(Service(name, "C:\\app.exe", wrapper=wrapper,
+                                **kwargs))
+    return services
+
+
+def test_levels(wrapper):
+    graph = DependencyGraph(_services(wrapper, {
+        "db": None, "cache": None, "api": ["db", "cache"], "web": ["api"]
+    }))
+    assert graph.levels() == [["cache", "db"], ["api"], ["web"]]
+
+
+def test_start_after_dependencies(wrapper):
+    services = _services(wrapper, {"db": None, "api": ["db"],
+                                   "web": ["api"]})
+    for service in services:
+        service.install()
+
+    started = []
+    lock = threading.Lock()
+
+    def observer(event):
+        if event.command == "start":
+            with lock:
+                started.append(event.service_name)
+
+    wrapper.add_observer(observer)
+    result = DependencyGraph(services).start(wait=False)
+
+    assert not result.errors
+    assert started == ["db", "api", "web"]
+
+
+def test_failed_dependency_skips_dependents(wrapper):
+    services = _services(wrapper, {"db": None, "api": ["db"],
+                                   "web": ["api"], "other": None})
+    for service in services:
+        if service.SERVICE_NAME != "db":
+            service.install()
+
+    result = DependencyGraph(services).start(wait=False)
+    assert result.succeeded == ["other"]
+    assert isinstance(result.errors["web"], ServiceDependencyException)
+
+
+def test_missing_dependency(wrapper):
+    services = _services(wrapper, {"api": ["db"]})
+    with pytest.raises(ServiceDependencyException):
+        DependencyGraph(services)
+    assert DependencyGraph(services, ignore_missing=True).levels() == \
+        [["api"]]
+
+
+@pytest.mark.parametrize("dependencies, cycle", [
+    ({"a": ["b"], "b": ["a"]}, "a -> b -> a"),
+    ({"a": None, "b": ["c"], "c": ["a", "b"]}, "b -> c -> b"),
+])
+def test_cycle(wrapper, dependencies, cycle):
+    with pytest.raises(ServiceDependencyException, match=cycle):
+        DependencyGraph(_services(wrapper, dependencies))
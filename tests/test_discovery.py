@@ -0,0 +1,60 @@
+"""
+ Discovering the services managed by NSSM
+"""
+import pytest
+
+from nssm import Service, Wrapper
+from nssm.exceptions import NssmException
+from nssm.fake import FakeNssm
+from nssm.service import ServiceStatus
+
+from .conftest import DumplessNssm
+
+
+class StaleListNssm(FakeNssm):
+    """
+    NSSM listing a service removed in the meantime
+    """
+
+    def _list(self, *args):
+        rc, out = super(StaleListNssm, self)._list(*args)
+        return rc, out + "\r\nremoved"
+
+
+@pytest.fixture
+def services(wrapper):
+    for name in ("web-1", "web-2", "db"):
+        Service(name, "C:\\{}.exe".format(name), wrapper=wrapper).install()
+
+
+def test_discover(wrapper, services):
+    services = Service.discover("WEB-*", wrapper=wrapper, prefetch="status")
+    assert [(s.SERVICE_NAME, s.last_status) for s in services] == [
+        ("web-1", ServiceStatus.STOPPED), ("web-2", ServiceStatus.STOPPED)]
+
+
+def test_discover_configuration(wrapper, services):
+    services = Service.discover(["db"], wrapper=wrapper,
+                                prefetch="configuration")
+    assert [s.SERVICE_PATH for s in services] == ["C:\\db.exe"]
+
+
+def test_discover_is_lazy(fake, wrapper, services):
+    services = Service.discover(wrapper=wrapper)
+    assert fake.counts == {"install": 3}
+    assert next(services).SERVICE_NAME == "db"
+    assert fake.counts == {"install": 3, "list": 1}
+
+
+def test_removed_services_are_skipped():
+    wrapper = Wrapper(StaleListNssm())
+    for name in ("web-1", "web-2", "db"):
+        Service(name, "C:\\app.exe", wrapper=wrapper).install()
+
+    services = Service.discover(wrapper=wrapper, prefetch="status")
+    assert [s.SERVICE_NAME for s in services] == ["db", "web-1", "web-2"]
+
+
+def test_discover_requires_list():
+    with pytest.raises(NssmException, match="2.25"):
+        list(Service.discover(wrapper=Wrapper(DumplessNssm())))
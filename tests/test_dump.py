@@ -0,0 +1,109 @@
+"""
+ Reading the service configuration with `nssm dump`, or `nssm get`
+"""
+import pytest
+
+from nssm import Service, Wrapper
+from nssm.exceptions import ServiceConfigurationException
+from nssm.fake import FakeNssm, RC_ERROR
+from nssm.service import _parse_dump
+from nssm.state import StateStore
+
+from .conftest import DumplessNssm
+
+
+class FlakyDumpNssm(FakeNssm):
+    """
+    NSSM whose first `nssm dump` fails
+    """
+    failures = 1
+
+    def _dump(self, name, *args):
+        if self.failures:
+            self.failures -= 1
+            return RC_ERROR, "{}: Access is denied.".format(name)
+        return super(FlakyDumpNssm, self)._dump(name, *args)
+
+
+def test_parse_dump():
+    output = "\r\n".join([
+        'nssm.exe install web "C:\\Program Files\\web.exe"',
+        'nssm.exe set web AppParameters "--name \\"my web\\"" --port',
+        "nssm.exe set web AppExit Default Restart",
+    ])
+    assert _parse_dump(output) == {
+        ("Application",): ("C:\\Program Files\\web.exe",),
+        ("AppParameters",): ('--name "my web"', "--port"),
+        ("AppExit", "Default"): ("Restart",),
+    }
+
+
+def test_fetch_configuration_round_trip(wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      arguments="--port 80", description="Web server")
+    service.install()
+
+    config = service.fetch_configuration()
+    assert config["path"] == "C:\\web.exe"
+    assert config["description"] == "Web server"
+
+
+def test_get_fallback_without_dump():
+    fake = DumplessNssm()
+    wrapper = Wrapper(fake)
+    for name in ("a", "b"):
+        Service(name, "C:\\app.exe", wrapper=wrapper).install()
+    fake.reset_counters()
+
+    config = Service("a", wrapper=wrapper).fetch_configuration()
+    assert config["path"] == "C:\\app.exe"
+    assert fake.counts["dump"] == 1
+
+    # The missing `nssm dump` is remembered for the wrapper
+    fake.reset_counters()
+    service = Service("b", wrapper=wrapper, description="B")
+    service.configure(service.configuration, diff=True)
+    assert fake.counts == {"get": 1, "set": 1}
+
+
+def test_dump_failure_is_not_remembered():
+    fake = FlakyDumpNssm()
+    wrapper = Wrapper(fake)
+    service = Service("web", "C:\\web.exe", wrapper=wrapper)
+    service.install()
+
+    with pytest.raises(ServiceConfigurationException):
+        service.fetch_configuration()
+
+    fake.reset_counters()
+    assert service.fetch_configuration()["path"] == "C:\\web.exe"
+    assert fake.counts == {"dump": 1}
+
+
+def test_password_is_not_read_back(fake, wrapper):
+    account = {"username": ".\\web", "password": "secret"}
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      user_account=account)
+    service.install()
+
+    assert fake.services["web"].parameters[("ObjectName",)] == (".\\web",)
+    assert service.fetch_configuration()["user_account"] == ".\\web"
+
+
+def test_diff_compares_the_account_username(fake, wrapper):
+    account = {"username": ".\\web", "password": "secret"}
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      user_account=account)
+    service.install()
+    fake.reset_counters()
+
+    assert service.configure(service.configuration, diff=True) == (0, 1)
+
+    # A password change is only known through the state store
+    service.STATE_STORE = StateStore()
+    service.configure(service.configuration)
+    fake.reset_counters()
+    account["password"] = "changed"
+    config = service.configuration.derive(user_account=account)
+    assert service.configure(config, diff=True) == (1, 0)
+    assert fake.counts == {"dump": 1, "set": 1}
@@ -0,0 +1,83 @@
+"""
+ Command results and the subprocess executor
+"""
+import sys
+import threading
+import time
+
+import pytest
+
+from nssm import Deadline
+from nssm import executors
+from nssm.executors import CommandResult, SubprocessExecutor
+from nssm.exceptions import CommandCancelledException, \
+                            CommandTimeoutException
+
+TEXT = "web-1\r\nwéb-2\r\n\U0001F600 db\r\n" + "x" * 20
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_lines_across_chunk_boundaries(chunk_size):
+    result = CommandResult(0, TEXT.encode("utf-16"))
+    assert list(result.lines(chunk_size)) == TEXT.splitlines()
+
+
+def test_lines_are_decoded_lazily():
+    result = CommandResult(0, "\r\n".join(["web"] * 10000).encode("utf-16"))
+    lines = result.lines(chunk_size=64)
+    assert next(lines) == "web"
+    assert result._text is None
+
+    assert result.text.count("web") == 10000
+    assert list(result.lines()) == ["web"] * 10000
+
+
+def test_unpacks_as_tuple():
+    rc, out = CommandResult(3, "missing\r\n".encode("utf-16"))
+    assert (rc, out) == (3, "missing\r\n")
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    processes = []
+    popen = executors.sp.Popen
+
+    def record(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(executors.sp, "Popen", record)
+    return processes
+
+
+def _executor():
+    return SubprocessExecutor(executable=sys.executable)
+
+
+def test_execute():
+    result = _executor().execute(["-c", "print('ok')"])
+    assert result.rcode == 0
+    assert result.output.strip() == b"ok"
+    assert result.duration > 0
+
+
+def test_kill_on_deadline_expiry(processes):
+    start = time.time()
+    with pytest.raises(CommandTimeoutException):
+        _executor().execute(["-c", "import time; time.sleep(10)"],
+                            Deadline(0.2))
+    assert time.time() - start < 5
+
+    # Killed and reaped
+    assert processes[0].returncode is not None
+    assert processes[0].stdout.closed
+
+
+def test_kill_on_cancellation(processes):
+    deadline = Deadline()
+    threading.Timer(0.1, deadline.cancel).start()
+
+    with pytest.raises(CommandCancelledException):
+        _executor().execute(["-c", "import time; time.sleep(10)"],
+                            deadline)
+    assert processes[0].returncode is not None
@@ -0,0 +1,53 @@
+"""
+ Concurrent operations over groups of services
+"""
+import pytest
+
+from nssm import Service, ServiceGroup
+from nssm.exceptions import ServiceDoesntExistException, \
+                            ServiceTimeoutException
+from nssm.service import ServiceStatus
+
+
+@pytest.fixture
+def group(wrapper):
+    services = [Service(name, "C:\\app.exe", wrapper=wrapper)
+                for name in ("a", "b", "c")]
+    for service in services[:2]:
+        service.install()
+    return ServiceGroup(services, max_workers=2)
+
+
+def test_per_service_results_and_errors(group):
+    result = group.status()
+
+    assert result.results == dict.fromkeys(["a", "b"], ServiceStatus.STOPPED)
+    assert result.succeeded == ["a", "b"]
+    assert result.failed == ["c"]
+    assert isinstance(result.errors["c"], ServiceDoesntExistException)
+    assert len(result) == 3
+
+    with pytest.raises(ServiceDoesntExistException):
+        result.raise_for_errors()
+
+
+def test_start_and_wait(fake, group):
+    fake.pending = 2
+    result = group.start(wait=True, timeout=1)
+
+    assert result.results == dict.fromkeys(["a", "b"], ServiceStatus.RUNNING)
+    assert result.failed == ["c"]
+
+
+def test_wait_for_timeout_message(fake, group):
+    fake.services["b"].state = "SERVICE_RUNNING"
+    fake.pending = 1000
+    group.services[0].start()
+
+    result = group.wait_for(ServiceStatus.RUNNING, timeout=0.1,
+                            services=group.services[:2])
+    assert result.results == {"b": ServiceStatus.RUNNING}
+    error = result.errors["a"]
+    assert isinstance(error, ServiceTimeoutException)
+    assert "Timed out waiting for SERVICE_RUNNING " \
+        "(status: SERVICE_START_PENDING)" in str(error)
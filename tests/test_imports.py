@@ -0,0 +1,62 @@
+"""
+ Import side effects of the package
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that ``import nssm`` must not load
+LAZY_MODULES = [
+    "voluptuous",
+    "argparse",
+    "concurrent.futures",
+    "subprocess",
+    "nssm.service",
+    "nssm.configuration",
+    "nssm.cli",
+    "nssm.wrapper",
+]
+
+# Seconds, ten times the benchmark budget
+IMPORT_BUDGET = 0.1
+
+
+def _run(script):
+    """
+    :return: The JSON printed by a script, in a fresh interpreter
+    """
+    out = subprocess.check_output(
+        [sys.executable, "-c", script],
+        env=dict(os.environ, PYTHONPATH=ROOT), universal_newlines=True
+    )
+    return json.loads(out)
+
+
+def _loaded_modules(statement):
+    """
+    :return: Modules loaded by an import statement, in a fresh interpreter
+    :rtype: :class:`list` [ :class:`str` ]
+    """
+    script = "import sys, json\n{}\nprint(json.dumps(sorted(sys.modules)))"
+    return _run(script.format(statement))
+
+
+def test_import_is_lazy():
+    modules = _loaded_modules("import nssm")
+    assert [m for m in LAZY_MODULES if m in modules] == []
+
+
+def test_public_name_loads_its_module():
+    modules = _loaded_modules("from nssm import Service")
+    assert "nssm.service" in modules
+
+
+def test_import_time():
+    script = ("import json, time\n"
+              "start = time.perf_counter()\n"
+              "import nssm\n"
+              "print(json.dumps(time.perf_counter() - start))")
+    assert _run(script) < IMPORT_BUDGET
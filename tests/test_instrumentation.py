@@ -0,0 +1,76 @@
+"""
+ Command instrumentation
+"""
+import pytest
+
+from nssm import Wrapper, Deadline
+from nssm.executors import Executor, CommandResult
+from nssm.exceptions import ServiceDoesntExistException, \
+                            CommandTimeoutException
+from nssm.instrumentation import CommandStats
+
+
+class TimedExecutor(Executor):
+    """
+    Executor reporting a fixed process wall time
+    """
+
+    def __init__(self, duration):
+        self.duration = duration
+
+    def execute(self, args, deadline=None):
+        return CommandResult(0, "SERVICE_RUNNING".encode("utf-16"),
+                             self.duration)
+
+
+@pytest.fixture
+def stats(wrapper):
+    stats = CommandStats()
+    wrapper.add_observer(stats)
+    return stats
+
+
+def test_counts_and_errors(fake, wrapper, stats):
+    wrapper.command("install", "web", "C:\\web.exe")
+    wrapper.command("status", "web")
+    with pytest.raises(ServiceDoesntExistException):
+        wrapper.command("status", "db")
+
+    dump = stats.dump()
+    assert dump["install"]["count"] == 1
+    assert dump["status"]["count"] == 2
+    assert dump["status"]["errors"] == {"ServiceDoesntExistException": 1}
+    assert dump["status"]["output_bytes"] > 0
+
+
+def test_timeouts(fake, wrapper, stats):
+    fake.latency = 1.0
+    with Deadline(0.05), pytest.raises(CommandTimeoutException):
+        wrapper.command("status", "web")
+
+    status = stats.dump()["status"]
+    assert status["errors"] == {"CommandTimeoutException": 1}
+    assert status["output_bytes"] == 0
+
+
+def test_executor_duration():
+    wrapper = Wrapper(TimedExecutor(0.2))
+    stats = CommandStats(buckets=(0.1, 0.3))
+    wrapper.add_observer(stats)
+
+    assert wrapper.command("status", "web").duration == 0.2
+    status = stats.dump()["status"]
+    assert status["duration_sum"] == status["duration_max"] == 0.2
+    assert status["buckets"] == [(0.1, 0), (0.3, 1), (float("inf"), 0)]
+
+
+def test_measured_duration(wrapper, stats):
+    result = wrapper.command("list", None)
+    assert result.duration is not None
+    assert stats.dump()["list"]["duration_sum"] == result.duration
+
+
+def test_reset(wrapper, stats):
+    wrapper.command("list", None)
+    stats.reset()
+    assert stats.dump() == {}
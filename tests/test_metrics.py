@@ -0,0 +1,73 @@
+"""
+ Prometheus metrics exporter
+"""
+import time
+
+import pytest
+
+from nssm import Service, MetricsExporter
+from nssm.cache import CachedWrapper, CoalescingWrapper
+from nssm.exceptions import ServiceDoesntExistException
+from nssm.metrics import _labels
+
+
+@pytest.fixture
+def services(wrapper):
+    services = [Service(name, "C:\\app.exe", wrapper=wrapper)
+                for name in ("a", "b")]
+    for service in services:
+        service.install()
+    return services
+
+
+def _wait_polled(exporter, timeout=1.0):
+    limit = time.time() + timeout
+    while None in exporter.watcher.statuses().values():
+        assert time.time() < limit
+        time.sleep(0.01)
+
+
+def test_render(wrapper, services):
+    with MetricsExporter(services, wrapper, interval=60) as exporter:
+        _wait_polled(exporter)
+        with pytest.raises(ServiceDoesntExistException):
+            wrapper.command("status", "missing")
+        lines = exporter.render().splitlines()
+
+    assert "# TYPE nssm_service_state gauge" in lines
+    assert 'nssm_service_state{service="a",state="SERVICE_STOPPED"} 1' in \
+        lines
+    assert 'nssm_service_state{service="a",state="SERVICE_RUNNING"} 0' in \
+        lines
+    assert 'nssm_service_state_changes_total{service="b"} 0' in lines
+
+    # 2 polls and the failed command, in cumulative buckets
+    assert "# TYPE nssm_command_duration_seconds histogram" in lines
+    assert 'nssm_command_duration_seconds_bucket{command="status",' \
+        'le="+Inf"} 3' in lines
+    assert 'nssm_command_duration_seconds_count{command="status"} 3' in lines
+    assert 'nssm_command_errors_total{command="status",' \
+        'exception="ServiceDoesntExistException"} 1' in lines
+    assert any(line.startswith(
+        'nssm_command_output_bytes_total{command="status"} ')
+        for line in lines)
+
+
+def test_render_through_wrappers(wrapper, services):
+    cached = CachedWrapper(CoalescingWrapper(wrapper), ttl=60)
+    with MetricsExporter(services, cached, interval=60) as exporter:
+        assert exporter.wrapper is wrapper
+        cached.command("get", "a", "Application")
+        cached.command("get", "a", "Application")  # Cache hit
+
+        output = exporter.render()
+        assert 'nssm_command_duration_seconds_count{command="get"} 1' in \
+            output
+
+    # No longer observed once closed
+    assert not wrapper.observers
+
+
+def test_label_escaping():
+    assert _labels(service='a "b"\\c\nd') == \
+        '{service="a \\"b\\"\\\\c\\nd"}'
@@ -0,0 +1,97 @@
+"""
+ Parameter codecs
+"""
+import pytest
+
+from nssm.configuration import ServiceConfiguration
+from nssm.parameters import PARAMETERS, StartupType, ExitAction, split_key
+from nssm.service import _encode_configuration, _decode_configuration
+
+
+def _round_trip(name, value):
+    parameter = PARAMETERS[name]
+    entries = dict((key[1:], values)
+                   for key, values in parameter.encode(value))
+    return parameter.decode(entries)
+
+
+def test_startup_type():
+    assert PARAMETERS["startup"].encode("AUTOMATIC") == \
+        [(("Start",), ("SERVICE_AUTO_START",))]
+    assert PARAMETERS["startup"].encode(StartupType.DELAYED) == \
+        [(("Start",), ("SERVICE_DELAYED_AUTO_START",))]
+    assert _round_trip("startup", "MANUAL") == StartupType.MANUAL
+
+    with pytest.raises(ValueError):
+        PARAMETERS["startup"].encode("SOMETIMES")
+
+
+def test_object_name():
+    account = {"username": ".\\web", "password": "s3cret"}
+    assert PARAMETERS["user_account"].encode(account) == \
+        [(("ObjectName",), (".\\web", "s3cret"))]
+
+    # The password is never read back
+    assert _round_trip("user_account", account) == ".\\web"
+    assert _round_trip("user_account", "LocalSystem") == "LocalSystem"
+
+
+@pytest.mark.parametrize("value", [["db", "cache"], "db"])
+def test_dependencies(value):
+    assert _round_trip("dependencies", value) == value
+
+
+def test_env():
+    env = {"PATH": "C:\\bin", "OPTS": "a=b"}
+    values = PARAMETERS["env"].encode(env)[0][1]
+    assert sorted(values) == ["OPTS=a=b", "PATH=C:\\bin"]
+    assert _round_trip("env", env) == env
+
+
+def test_exit_actions():
+    actions = {"Default": "Restart", 1: "Exit"}
+    assert sorted(PARAMETERS["action_on_exit"].encode(actions)) == [
+        (("AppExit", "1"), ("Exit",)), (("AppExit", "Default"), ("Restart",))]
+    assert _round_trip("action_on_exit", actions) == \
+        {"Default": ExitAction.RESTART, "1": ExitAction.EXIT}
+
+    with pytest.raises(ValueError, match="AppExit"):
+        _round_trip("action_on_exit", {"1": "Exit"})
+
+
+@pytest.mark.parametrize("name, value", [
+    ("rotate_files", True),
+    ("rotate_online", False),
+    ("rotation_time", 86400),
+    ("rotation_size", 1048576),
+])
+def test_rotation(name, value):
+    assert _round_trip(name, value) == value
+
+
+@pytest.mark.parametrize("args, key, values", [
+    (("AppExit", "Default", "Restart"), ("AppExit", "Default"),
+     ("Restart",)),
+    (("AppExit", "1"), ("AppExit", "1"), ()),
+    (("AppRotateFiles", "1"), ("AppRotateFiles",), ("1",)),
+    (("DependsOnService", "db", "cache"), ("DependsOnService",),
+     ("db", "cache")),
+    (("Unknown", "x"), ("Unknown",), ("x",)),
+])
+def test_split_key(args, key, values):
+    assert split_key(args) == (key, values)
+
+
+def test_configuration_round_trip():
+    config = ServiceConfiguration(
+        path="C:\\web.exe", arguments=["--port", "80"], startup="AUTOMATIC",
+        dependencies=["db"], env={"A": "1"}, console_window=False,
+        action_on_exit={"Default": ExitAction.RESTART, "2": ExitAction.EXIT},
+        rotate_files=True, rotation_size=1024)
+
+    decoded = _decode_configuration(_encode_configuration(config))
+    assert decoded["arguments"] == "--port 80"
+    assert decoded["dependencies"] == "db"
+    for name in ("path", "startup", "env", "console_window",
+                 "action_on_exit", "rotate_files", "rotation_size"):
+        assert decoded[name] == config[name]
@@ -0,0 +1,84 @@
+"""
+ Manifest reconciliation
+"""
+import pytest
+
+from nssm import Service, StateStore, Wrapper
+from nssm.reconcile import Reconciler, parse_manifest
+
+from .conftest import DumplessNssm
+
+
+MANIFEST = {
+    "defaults": {"startup": "AUTOMATIC"},
+    "services": [
+        {"name": "web", "path": "C:\\web.exe", "state": "running",
+         "user_account": {"username": ".\\web", "password": "s3cr3t"}},
+        {"name": "legacy", "state": "absent"},
+    ]
+}
+
+
+def test_plan(wrapper):
+    wrapper.command("install", "legacy", "C:\\legacy.exe")
+
+    plan = Reconciler(parse_manifest(MANIFEST), wrapper=wrapper).plan()
+    assert [command[:2] for command in plan] == [
+        ("install", "web"), ("set", "web"), ("set", "web"), ("start", "web"),
+        ("remove", "legacy")]
+
+
+def test_plan_masks_passwords(wrapper):
+    plan = Reconciler(parse_manifest(MANIFEST), wrapper=wrapper).plan()
+    assert "s3cr3t" not in str(plan)
+    assert "nssm set web ObjectName .\\web ********" in plan.lines()
+
+
+def test_apply(fake, wrapper):
+    reconciler = Reconciler(parse_manifest(MANIFEST), wrapper=wrapper)
+    result = reconciler.apply()
+    assert not result.errors
+    assert fake.services["web"].state == "SERVICE_RUNNING"
+
+    fake.reset_counters()
+    assert len(reconciler.plan()) == 0
+
+
+def test_plan_reads_only_the_desired_keys():
+    fake = DumplessNssm()
+    wrapper = Wrapper(fake)
+    wrapper.command("install", "web", "C:\\web.exe")
+    fake.reset_counters()
+
+    Reconciler(parse_manifest(MANIFEST), wrapper=wrapper).plan()
+    assert fake.counts["get"] == 3
+
+
+def test_state_store_skips_applied_services(fake, wrapper):
+    store = StateStore()
+    entries = parse_manifest(MANIFEST)
+    Reconciler(entries, wrapper=wrapper, state_store=store).apply()
+    assert "web" in store and "legacy" not in store
+    fake.reset_counters()
+
+    # Only the service states are read
+    plan = Reconciler(entries, wrapper=wrapper, state_store=store).plan()
+    assert len(plan) == 0
+    assert fake.counts == {"status": 2}
+
+    # Same record as a later configure()
+    fake.reset_counters()
+    service = Service("web", "C:\\web.exe", wrapper=wrapper,
+                      state_store=store, template=entries[0].configuration)
+    assert service.configure(service.configuration)[0] == 0
+    assert fake.spawns == 0
+
+
+@pytest.mark.parametrize("manifest", [
+    {"service": []},
+    {"defaults": {"startup_typ": "AUTOMATIC"}},
+    {"services": [{"name": "web", "path": "C:\\web.exe", "descripton": ""}]},
+])
+def test_unknown_keys(manifest):
+    with pytest.raises(ValueError, match="Unknown keys"):
+        parse_manifest(manifest)
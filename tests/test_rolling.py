@@ -0,0 +1,77 @@
+"""
+ Rolling restart of a service group
+"""
+import time
+
+import pytest
+
+from nssm import Service, ServiceGroup, RollingRestart
+from nssm.exceptions import ServiceTimeoutException, \
+                            ServiceUnhealthyException
+from nssm.service import ServiceStatus
+
+
+@pytest.fixture
+def group(wrapper):
+    services = [Service(name, "C:\\app.exe", wrapper=wrapper)
+                for name in ("a", "b", "c", "d", "e")]
+    for service in services:
+        service.install()
+    return ServiceGroup(services)
+
+
+@pytest.mark.parametrize("wave_size, waves", [
+    (1, [["a"], ["b"], ["c"], ["d"], ["e"]]),
+    (2, [["a", "b"], ["c", "d"], ["e"]]),
+    (0.4, [["a", "b"], ["c", "d"], ["e"]]),
+    (0.01, [["a"], ["b"], ["c"], ["d"], ["e"]]),
+    (1.0, [["a", "b", "c", "d", "e"]]),
+])
+def test_wave_sizing(fake, group, wave_size, waves):
+    rollout = RollingRestart(group, wave_size=wave_size)
+    assert rollout.run()
+    assert rollout.done
+    assert [wave.services for wave in rollout.waves] == waves
+    assert fake.counts["restart"] == 5
+
+
+def test_pause_at_the_failure_threshold(fake, group):
+    def healthy(service):
+        return service.SERVICE_NAME not in ("b", "c")
+
+    rollout = RollingRestart(group, max_failures=1, health_check=healthy)
+    assert not rollout.run()
+    assert rollout.paused
+    assert sorted(rollout.failures) == ["b", "c"]
+    assert [s.SERVICE_NAME for s in rollout.remaining] == ["d", "e"]
+    assert fake.counts["restart"] == 3
+
+    # Resumed with the next wave
+    assert rollout.run()
+    assert rollout.done and not rollout.paused
+
+
+def test_wave_timeout(fake, group):
+    fake.pending = 1000
+    rollout = RollingRestart(group, wave_size=2, timeout=0.1)
+    assert not rollout.run()
+    assert len(rollout.waves) == 1
+    assert all(isinstance(err, ServiceTimeoutException)
+               for err in rollout.failures.values())
+
+
+def test_health_check_timeout(fake, group):
+    def slow_check(service):
+        fake.latency = 5.0
+        try:
+            return service.status() == ServiceStatus.RUNNING
+        finally:
+            fake.latency = 0.0
+
+    rollout = RollingRestart(group, timeout=0.1, health_check=slow_check)
+    start = time.time()
+    assert not rollout.run()
+    assert time.time() - start < 1
+
+    assert list(rollout.failures) == ["a"]
+    assert isinstance(rollout.failures["a"], ServiceUnhealthyException)
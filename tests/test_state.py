@@ -0,0 +1,67 @@
+"""
+ Last-applied configuration store
+"""
+import hashlib
+import hmac
+import json
+import os
+
+from nssm.state import StateStore
+
+VALUES = {
+    ("Application",): ("C:\\web.exe",),
+    ("ObjectName",): (".\\web", "s3cret"),
+}
+
+
+def _unkeyed_digests(record, password):
+    """
+    Digests an attacker could compute from a stolen record and a guessed
+    password
+    """
+    values = dict(record.values)
+    values[("ObjectName",)] = values[("ObjectName",)] + (password,)
+    content = json.dumps(sorted([list(k), list(v)] for k, v in values.items()),
+                         separators=(",", ":")).encode("utf-8")
+    return {hashlib.sha256(content).hexdigest(),
+            hmac.new(b"", content, hashlib.sha256).hexdigest()}
+
+
+def test_password_is_not_stored():
+    store = StateStore()
+    store.put("web", VALUES)
+
+    record = store.get("web")
+    assert record.values[("ObjectName",)] == (".\\web",)
+    assert store.is_applied("web", store.digest(VALUES))
+
+
+def test_guessed_password_does_not_reproduce_the_digest():
+    store = StateStore()
+    store.put("web", VALUES)
+
+    record = store.get("web")
+    assert record.digest not in _unkeyed_digests(record, "s3cret")
+
+
+def test_digest_is_keyed_per_store():
+    assert StateStore().digest(VALUES) != StateStore().digest(VALUES)
+    assert StateStore(key=b"k").digest(VALUES) == \
+        StateStore(key=b"k").digest(VALUES)
+
+
+def test_key_file(tmpdir):
+    path = str(tmpdir.join("state.db"))
+    store = StateStore(path)
+    store.put("web", VALUES)
+    store.close()
+
+    key_path = path + ".key"
+    assert os.path.getsize(key_path) == StateStore.KEY_SIZE
+    if os.name == "posix":
+        assert os.stat(key_path).st_mode & 0o077 == 0
+
+    # Reopened with the same key
+    store = StateStore(path)
+    assert store.is_applied("web", store.digest(VALUES))
+    store.close()
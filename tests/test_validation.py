@@ -0,0 +1,72 @@
+"""
+ Precompiled configuration validator
+"""
+import pytest
+from voluptuous import Error, Invalid
+
+from nssm.abstract.validation import compile_schema, InvalidData
+from nssm.configuration import ServiceConfiguration
+
+SCHEMA = ServiceConfiguration.VALIDATION_SCHEMA
+
+
+@pytest.fixture(scope="module")
+def compiled():
+    return compile_schema(SCHEMA)
+
+
+@pytest.mark.parametrize("data", [
+    {},
+    {"path": "C:\\web.exe", "arguments": ["--port", "80"]},
+    {"startup": "AUTOMATIC", "type": "SERVICE_WIN32_OWN_PROCESS"},
+    {"startup": "SERVICE_DEMAND_START", "process_priority": "HIGH"},
+    {"user_account": "LocalSystem", "cpu_affinity": "All"},
+    {"user_account": {"username": ".\\web", "password": "s3cret"}},
+    {"action_on_exit": {"Default": "Restart", "1": "Exit"}},
+    {"console_window": False, "stop_console": 1500, "env": {"A": "1"}},
+])
+def test_valid_input(compiled, data):
+    assert compiled(data) == SCHEMA(data)
+
+
+@pytest.mark.parametrize("data", [
+    {"path": 1},
+    {"console_window": "yes"},
+    {"cpu_affinity": "Some"},
+    {"user_account": {"username": ".\\web"}},
+    {"action_on_exit": {"1": "Exit"}},
+    "C:\\web.exe",
+])
+def test_invalid_input(compiled, data):
+    with pytest.raises(InvalidData):
+        compiled(data)
+    with pytest.raises(Invalid):
+        SCHEMA(data)
+
+
+@pytest.mark.parametrize("data", [
+    {"startup": "SOMETIMES"},
+    {"action_on_exit": {"Default": "Explode"}},
+])
+def test_invalid_enum(compiled, data):
+    # Not compared with voluptuous, whose enum coercion errors depend on
+    # its version
+    with pytest.raises(InvalidData):
+        compiled(data)
+
+
+def test_extra_keys(compiled):
+    # Removed at the top level and from the account, kept in the exit
+    # actions
+    data = {"descripton": "Web",
+            "user_account": {"username": "u", "password": "p", "x": 1},
+            "action_on_exit": {"Default": "Restart", "2": "Ignore"}}
+    assert compiled(data) == SCHEMA(data)
+    assert "descripton" not in compiled(data)
+    assert "x" not in compiled(data)["user_account"]
+    assert compiled(data)["action_on_exit"]["2"] == "Ignore"
+
+
+def test_humanized_errors():
+    with pytest.raises(Error, match="console_window"):
+        ServiceConfiguration(console_window="yes")
@@ -0,0 +1,39 @@
+"""
+ Waiting for a service state
+"""
+import pytest
+
+from nssm import Service
+from nssm.exceptions import ServiceTimeoutException
+from nssm.service import ServiceStatus
+
+
+@pytest.fixture
+def service(wrapper):
+    service = Service("web", "C:\\web.exe", wrapper=wrapper)
+    service.install()
+    return service
+
+
+def test_start_and_wait(fake, service):
+    fake.pending = 3
+    assert service.start(wait=True) == ServiceStatus.RUNNING
+    assert service.last_status == ServiceStatus.RUNNING
+    assert fake.counts["status"] == 4
+
+
+def test_wait_for_any_state(service):
+    assert service.wait_for([ServiceStatus.RUNNING, "SERVICE_STOPPED"],
+                            timeout=1) == ServiceStatus.STOPPED
+
+
+def test_wait_timeout(service):
+    with pytest.raises(ServiceTimeoutException,
+                       match="SERVICE_STOPPED") as info:
+        service.wait_for(ServiceStatus.RUNNING, timeout=0.1)
+    assert "SERVICE_RUNNING" in str(info.value)
+
+
+def test_pending_states():
+    assert ServiceStatus.START_PENDING.pending
+    assert not ServiceStatus.RUNNING.pending
@@ -0,0 +1,78 @@
+"""
+ Service state change subscriptions
+"""
+import time
+
+import pytest
+
+from nssm import Service, Watcher
+from nssm.service import ServiceStatus
+
+
+@pytest.fixture
+def services(wrapper):
+    services = [Service(name, "C:\\app.exe", wrapper=wrapper)
+                for name in ("a", "b")]
+    for service in services:
+        service.install()
+    return services
+
+
+def _wait_polled(watcher, timeout=1.0):
+    limit = time.time() + timeout
+    while None in watcher.statuses().values():
+        assert time.time() < limit
+        time.sleep(0.01)
+
+
+def test_one_poll_per_interval_across_subscribers(fake, services):
+    fake.reset_counters()
+    with Watcher(interval=60) as watcher:
+        for _ in range(3):
+            watcher.subscribe(services[0], callback=lambda event: None)
+        watcher.subscribe(services, callback=lambda event: None)
+        _wait_polled(watcher)
+        time.sleep(0.05)
+
+        assert fake.counts == {"status": 2}
+        assert watcher.statuses() == dict.fromkeys(["a", "b"],
+                                                   ServiceStatus.STOPPED)
+
+
+def test_fast_polling_while_pending(fake, services):
+    fake.pending = 3
+    services[0].start()
+
+    with Watcher(interval=60, pending_interval=0.01) as watcher:
+        subscription = watcher.subscribe(
+            services[0], to_state=ServiceStatus.RUNNING)
+
+        start = time.time()
+        change = subscription.get(timeout=2)
+        assert time.time() - start < 1
+
+    assert change.previous == ServiceStatus.START_PENDING
+    assert change.current == ServiceStatus.RUNNING
+    assert fake.counts["status"] == 4
+
+
+def test_removed_service(fake, services):
+    with Watcher(interval=0.05) as watcher:
+        subscription = watcher.subscribe(services[0])
+        _wait_polled(watcher)
+        del fake.services["a"]
+
+        change = subscription.get(timeout=2)
+        assert change.current is None
+
+        subscription.cancel()
+        assert list(subscription) == []
+
+
+def test_callback_subscriptions_are_not_queued(services):
+    with Watcher(interval=60) as watcher:
+        subscription = watcher.subscribe(services, callback=print)
+        with pytest.raises(RuntimeError, match="callback"):
+            iter(subscription)
+        with pytest.raises(RuntimeError, match="callback"):
+            subscription.get(timeout=0)
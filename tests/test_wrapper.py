@@ -0,0 +1,50 @@
+"""
+ Command wrapper and pluggable executors
+"""
+import pytest
+
+from nssm import Wrapper
+from nssm.executors import Executor, CommandResult
+from nssm.exceptions import ServiceDoesntExistException, \
+                            ServiceAlreadyInstalledException
+from nssm.wrapper import DEFAULT_WRAPPER
+
+
+def test_command_result(wrapper):
+    wrapper.command("install", "web", "C:\\web.exe")
+
+    result = wrapper.command("status", "web")
+    assert isinstance(result, CommandResult)
+    rc, out = result
+    assert (rc, out.strip()) == (0, "SERVICE_STOPPED")
+
+
+def test_commands_without_service_name(fake, wrapper):
+    wrapper.command("install", "web", "C:\\web.exe")
+
+    assert list(wrapper.command("list", None).lines()) == ["web"]
+
+
+def test_mapped_exceptions(wrapper):
+    with pytest.raises(ServiceDoesntExistException):
+        wrapper.command("status", "web")
+
+    wrapper.command("install", "web", "C:\\web.exe")
+    with pytest.raises(ServiceAlreadyInstalledException):
+        wrapper.command("install", "web", "C:\\web.exe")
+
+
+def test_former_executor_interface():
+    class TupleExecutor(Executor):
+        def execute(self, args, deadline=None):
+            return 0, "SERVICE_RUNNING\r\n".encode("utf-16")
+
+    rc, out = Wrapper(TupleExecutor()).command("status", "web")
+    assert out.strip() == "SERVICE_RUNNING"
+
+
+def test_static_command_runs_on_the_default_wrapper(monkeypatch, fake):
+    monkeypatch.setattr(DEFAULT_WRAPPER, "executor", fake)
+
+    Wrapper.command("install", "web", "C:\\web.exe")
+    assert "web" in fake.services